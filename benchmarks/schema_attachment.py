@@ -0,0 +1,45 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Microbenchmark of attaching schemas to pandas frames of growing width.
+
+For each column count, this times add_schema on a float DataFrame, which
+should not depend on the width, and the first read of json_schema, which
+infers the schema::
+
+    PYTHONPATH=. python benchmarks/schema_attachment.py
+    PYTHONPATH=. python benchmarks/schema_attachment.py --columns 10 100000
+"""
+
+import argparse
+import timeit
+import numpy as np
+import pandas as pd
+from lale.datasets.data_schemas import add_schema
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--columns', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--rows', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(f'{"columns":>8} {"attach":>12} {"infer":>12}')
+    for n_columns in args.columns:
+        df = pd.DataFrame(np.zeros((args.rows, n_columns)))
+        attach = min(timeit.repeat(lambda: add_schema(df), number=100, repeat=args.repeat)) / 100
+        infer = min(timeit.repeat(lambda: add_schema(df).json_schema, number=1, repeat=args.repeat))
+        print(f'{n_columns:>8} {attach * 1e6:>10.1f}us {infer * 1e3:>10.1f}ms')
+
+if __name__ == '__main__':
+    main()
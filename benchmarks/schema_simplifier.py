@@ -0,0 +1,74 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Microbenchmark of lale.schema_simplifier over whole operator libraries.
+
+For every operator in the given packages, this times the schema
+simplification that search space generation does (narrowing to the
+fields relevant to the optimizer, simplify, and filterForOptimizer),
+and prints the total and the slowest operators::
+
+    PYTHONPATH=. python benchmarks/schema_simplifier.py
+    PYTHONPATH=. python benchmarks/schema_simplifier.py --packages lale.lib.autogen --top 5
+"""
+
+import argparse
+import importlib
+import logging
+import time
+from typing import List, Tuple
+import lale.operators
+from lale.schema_simplifier import filterForOptimizer, findRelevantFields, narrowToGivenRelevantFields, simplify
+
+def library_operators(package:str)->List[Tuple[str, lale.operators.IndividualOp]]:
+    module = importlib.import_module(package)
+    return [(f'{package}.{name}', getattr(module, name)) for name in sorted(dir(module))
+            if isinstance(getattr(module, name), lale.operators.IndividualOp)]
+
+def optimizer_schema(op:lale.operators.IndividualOp):
+    schema = op.hyperparam_schema_with_hyperparams()
+    relevant_fields = findRelevantFields(schema)
+    if relevant_fields:
+        schema = narrowToGivenRelevantFields(schema, relevant_fields)
+    return schema
+
+def time_simplify(schema, float_any:bool, repeat:int)->float:
+    """Best time of repeat runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        filterForOptimizer(simplify(schema, float_any))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--packages', nargs='+', default=['lale.lib.sklearn', 'lale.lib.autogen'])
+    parser.add_argument('--float-any', choices=['true', 'false'], default='true',
+                        help='floatAny argument of simplify, true as in search space generation')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--top', type=int, default=10, help='number of slowest operators to list')
+    args = parser.parse_args()
+    logging.getLogger('lale.schema_simplifier').setLevel(logging.ERROR)
+    timings = []
+    for package in args.packages:
+        for name, op in library_operators(package):
+            timings.append((time_simplify(optimizer_schema(op), args.float_any == 'true', args.repeat), name))
+    total = sum(t for t, _ in timings)
+    print(f'simplified {len(timings)} operator schemas in {total:.3f}s')
+    for seconds, name in sorted(timings, reverse=True)[:args.top]:
+        print(f'{seconds:9.4f}s  {name}')
+
+if __name__ == '__main__':
+    main()
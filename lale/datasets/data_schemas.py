@@ -16,6 +16,7 @@ import lale.helpers
 import numpy as np
 import pandas as pd
 import scipy.sparse
+from typing import Any, Dict
 try:
     import torch
     torch_installed=True
@@ -38,22 +39,60 @@ class NDArrayWithSchema(np.ndarray):
 
 # See instructions for subclassing pandas DataFrame:
 # https://pandas.pydata.org/pandas-docs/stable/development/extending.html#extending-subclassing-pandas
+# Wrapping a frame or series shares its BlockManager, so no data is
+# copied, and the schema is only inferred on first access, so
+# attaching one takes constant time regardless of the number of columns.
 class DataFrameWithSchema(pd.DataFrame):
-    _internal_names = pd.DataFrame._internal_names + ['json_schema']
+    _internal_names = pd.DataFrame._internal_names + ['_json_schema']
     _internal_names_set = set(_internal_names)
+    _json_schema = None
 
     @property
     def _constructor(self):
         return DataFrameWithSchema
 
+    @property
+    def json_schema(self):
+        if self._json_schema is None:
+            self._json_schema = _dataframe_to_schema(self)
+        return self._json_schema
+
+    @json_schema.setter
+    def json_schema(self, value):
+        self._json_schema = value
+
 class SeriesWithSchema(pd.Series):
-    _internal_names = pd.Series._internal_names + ['json_schema']
+    _internal_names = pd.Series._internal_names + ['_json_schema']
     _internal_names_set = set(_internal_names)
+    _json_schema = None
 
     @property
     def _constructor(self):
         return SeriesWithSchema
 
+    @property
+    def json_schema(self):
+        if self._json_schema is None:
+            self._json_schema = _series_to_schema(self)
+        return self._json_schema
+
+    @json_schema.setter
+    def json_schema(self, value):
+        self._json_schema = value
+
+# Subclasses of scipy sparse matrices constructed from the arrays of an
+# existing matrix, so attaching a schema does not copy the data.
+class CSRMatrixWithSchema(scipy.sparse.csr_matrix):
+    json_schema = None
+
+class CSCMatrixWithSchema(scipy.sparse.csc_matrix):
+    json_schema = None
+
+def _sparse_with_schema(matrix):
+    cls = CSRMatrixWithSchema if matrix.format == 'csr' else CSCMatrixWithSchema
+    return cls((matrix.data, matrix.indices, matrix.indptr),
+               shape=matrix.shape, copy=False)
+
 def is_list_tensor(obj):
     def list_tensor_shape(ls):
         if isinstance(ls, int) or isinstance(ls, float) or isinstance(ls, str):
@@ -90,6 +129,10 @@ def add_schema(obj, schema=None, raise_on_failure=False, recalc=False):
         result = obj
     elif isinstance(obj, pd.DataFrame):
         result = DataFrameWithSchema(obj)
+    elif isinstance(obj, (CSRMatrixWithSchema, CSCMatrixWithSchema)):
+        result = obj
+    elif scipy.sparse.issparse(obj) and obj.format in ['csr', 'csc']:
+        result = _sparse_with_schema(obj)
     elif is_list_tensor(obj):
         obj = np.array(obj)
         result = obj.view(NDArrayWithSchema)
@@ -97,6 +140,13 @@ def add_schema(obj, schema=None, raise_on_failure=False, recalc=False):
         raise ValueError(f'unexpected type(obj) {type(obj)}')
     else:
         return obj
+    if isinstance(result, (DataFrameWithSchema, SeriesWithSchema)):
+        if recalc:
+            result._json_schema = None
+        if schema is not None and result._json_schema is None:
+            lale.helpers.validate_is_schema(schema)
+            result._json_schema = schema
+        return result
     if recalc:
         result.json_schema = None
     if not hasattr(result, 'json_schema') or result.json_schema is None:
@@ -151,19 +201,31 @@ def ndarray_to_schema(array):
         return array.json_schema
     return shape_and_dtype_to_schema(array.shape, array.dtype)
 
+def sparse_matrix_to_schema(matrix):
+    assert scipy.sparse.issparse(matrix)
+    if getattr(matrix, 'json_schema', None) is not None:
+        return matrix.json_schema
+    return shape_and_dtype_to_schema(matrix.shape, matrix.dtype)
+
 def csr_matrix_to_schema(matrix):
     assert isinstance(matrix, scipy.sparse.csr_matrix)
-    return shape_and_dtype_to_schema(matrix.shape, matrix.dtype)
+    return sparse_matrix_to_schema(matrix)
 
 def dataframe_to_schema(df):
     assert isinstance(df, pd.DataFrame)
-    if isinstance(df, DataFrameWithSchema) and hasattr(df, 'json_schema') and df.json_schema is not None:
+    if isinstance(df, DataFrameWithSchema):
         return df.json_schema
+    return _dataframe_to_schema(df)
+
+def _dataframe_to_schema(df):
     n_rows, n_columns = df.shape
     assert n_columns == len(df.columns) and n_columns == len(df.dtypes)
+    dtype_schemas:Dict[Any, Dict[str, Any]] = {}
+    for dtype in df.dtypes.unique():
+        dtype_schemas[dtype] = dtype_to_schema(dtype)
     items = [
-        {'description': str(col), **dtype_to_schema(df.dtypes[col])}
-        for col in df.columns]
+        {'description': str(col), **dtype_schemas[dtype]}
+        for col, dtype in zip(df.columns, df.dtypes)]
     result = {
         'type': 'array',
         'minItems': n_rows,
@@ -178,8 +240,11 @@ def dataframe_to_schema(df):
 
 def series_to_schema(series):
     assert isinstance(series, pd.Series)
-    if isinstance(series, SeriesWithSchema) and hasattr(series, 'json_schema') and series.json_schema is not None:
+    if isinstance(series, SeriesWithSchema):
         return series.json_schema
+    return _series_to_schema(series)
+
+def _series_to_schema(series):
     (n_rows, ) = series.shape
     result = {
         'type': 'array',
@@ -256,8 +321,8 @@ def to_schema(obj):
         result = {'enum': [None]}
     elif isinstance(obj, np.ndarray):
         result = ndarray_to_schema(obj)
-    elif isinstance(obj, scipy.sparse.csr_matrix):
-        result = csr_matrix_to_schema(obj)
+    elif scipy.sparse.issparse(obj):
+        result = sparse_matrix_to_schema(obj)
     elif isinstance(obj, pd.DataFrame):
         result = dataframe_to_schema(obj)
     elif isinstance(obj, pd.Series):
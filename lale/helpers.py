@@ -13,6 +13,10 @@
 # limitations under the License.
 
 import ast
+import collections
+import hashlib
+import json
+import threading
 import jsonschema
 import numpy as np
 import pandas as pd
@@ -32,6 +36,7 @@ import logging
 import h5py
 from typing import Any, Dict, List, Optional, Union
 import lale.datasets.data_schemas
+import lale.util.dag_executor
 
 try:
     import torch
@@ -39,6 +44,12 @@ try:
 except ImportError:
     torch_installed=False
 
+try:
+    import fastjsonschema
+    fastjsonschema_installed=True
+except ImportError:
+    fastjsonschema_installed=False
+
 logger = logging.getLogger(__name__)
 
 class NestedHyperoptSpace():
@@ -61,6 +72,8 @@ def assignee_name(level=1) -> Optional[str]:
             return lhs[0].id
     return None
 
+_NUM_SUBSAMPLE_ROWS = 10
+
 def data_to_json(data, subsample_array:bool=True) -> Union[list, dict]:
     if type(data) is tuple:
         # convert to list
@@ -71,14 +84,21 @@ def data_to_json(data, subsample_array:bool=True) -> Union[list, dict]:
         return {key: data_to_json(data[key], subsample_array) for key in data}
     elif isinstance(data, np.ndarray):
         return ndarray_to_json(data, subsample_array)
-    elif type(data) is scipy.sparse.csr_matrix:
-        return ndarray_to_json(data.toarray(), subsample_array)
+    elif scipy.sparse.issparse(data):
+        if data.format not in ['csr', 'csc']:
+            data = data.tocsr()
+        if subsample_array:
+            data = data[:_NUM_SUBSAMPLE_ROWS] #only densify the sampled rows
+        return ndarray_to_json(data.toarray(), subsample_array=False)
     elif isinstance(data, pd.DataFrame) or isinstance(data, pd.Series):
-        np_array = data.values
-        return ndarray_to_json(np_array, subsample_array)
+        if subsample_array:
+            data = data.iloc[:_NUM_SUBSAMPLE_ROWS]
+        return ndarray_to_json(data.values, subsample_array=False)
     elif torch_installed and isinstance(data, torch.Tensor):
-        np_array = data.detach().numpy()
-        return ndarray_to_json(np_array, subsample_array)
+        if subsample_array and data.dim() > 0:
+            data = data[:_NUM_SUBSAMPLE_ROWS]
+        np_array = data.detach().cpu().numpy()
+        return ndarray_to_json(np_array, subsample_array=False)
     else:
         return data
 
@@ -88,54 +108,190 @@ def is_empty_dict(val) -> bool:
 def dict_without(orig_dict: Dict[str, Any], key: str) -> Dict[str, Any]:
     return {k: orig_dict[k] for k in orig_dict if k != key}
 
+def _leaf_to_json(value):
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+def _map_nested_lists(fun, nested, depth:int):
+    if depth == 0:
+        return fun(nested)
+    return [_map_nested_lists(fun, elem, depth - 1) for elem in nested]
+
 def ndarray_to_json(arr, subsample_array:bool=True) -> Union[list, dict]:
     #sample 10 rows and no limit on columns
-    if subsample_array:
-        num_subsamples = [10, np.iinfo(np.int).max, np.iinfo(np.int).max]
+    if subsample_array and arr.ndim > 0:
+        arr = arr[:_NUM_SUBSAMPLE_ROWS]
+    kind = arr.dtype.kind
+    if kind in ['b', 'i', 'u', 'f', 'U']:
+        return arr.tolist() #converts elements to bool, int, float, or str
+    elif kind in ['S', 'O']:
+        return _map_nested_lists(_leaf_to_json, arr.tolist(), arr.ndim)
     else:
-        num_subsamples = [np.iinfo(np.int).max, np.iinfo(np.int).max, np.iinfo(np.int).max]
-    def subarray_to_json(indices):
-        if len(indices) == len(arr.shape):
-            if isinstance(arr[indices], bool) or \
-               isinstance(arr[indices], int) or \
-               isinstance(arr[indices], float) or \
-               isinstance(arr[indices], str):
-                return arr[indices]
-            elif np.issubdtype(arr.dtype, np.bool_):
-                return bool(arr[indices])
-            elif np.issubdtype(arr.dtype, np.integer):
-                return int(arr[indices])
-            elif np.issubdtype(arr.dtype, np.number):
-                return float(arr[indices])
-            elif arr.dtype.kind in ['U', 'S', 'O']:
-                return str(arr[indices])
-            else:
-                raise ValueError(f'Unexpected dtype {arr.dtype}, '
-                                 f'kind {arr.dtype.kind}, '
-                                 f'type {type(arr[indices])}.')
-        else:
-            assert len(indices) < len(arr.shape)
-            return [subarray_to_json(indices + (i,))
-                    for i in range(min(num_subsamples[len(indices)], arr.shape[len(indices)]))]
-    return subarray_to_json(())
+        raise ValueError(f'Unexpected dtype {arr.dtype}, kind {kind}.')
 
 _JSON_META_SCHEMA_URL = 'http://json-schema.org/draft-04/schema#'
 
 def _json_meta_schema() -> Dict[str, Any]:
     return jsonschema.Draft4Validator.META_SCHEMA
 
+def _json_scalar(value):
+    if isinstance(value, np.generic) and value.ndim == 0:
+        return value.item()
+    # no repr fallback, since that can be truncated (numpy arrays) or contain addresses
+    raise TypeError(f'{type(value)} is not a JSON value')
+
+def json_hash(value) -> Optional[str]:
+    """Hash of a JSON value that does not depend on the order of dictionary keys.
+
+    Returns None, meaning the value should not be cached, if it contains
+    anything besides JSON values and numpy scalars."""
+    try:
+        canonical = json.dumps(value, sort_keys=True, default=_json_scalar)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+class CachedValidator():
+    """Validator for one JSON schema, whose schema was checked once on creation.
+
+    If fastjsonschema is installed and code generation is enabled
+    (see ``clear_validator_cache``), values are first checked with
+    Python code generated for the schema. Since that code reports less
+    detailed errors, values it rejects are checked again with jsonschema.
+    """
+    def __init__(self, schema: Dict[str, Any], generate_code: bool=False):
+        jsonschema.Draft4Validator.check_schema(schema)
+        self._validator = jsonschema.Draft4Validator(schema)
+        self._generated = None
+        if generate_code and fastjsonschema_installed:
+            try:
+                # draft 4 like jsonschema above, and without filling
+                # defaults into the validated value
+                self._generated = fastjsonschema.compile(
+                    {**schema, '$schema': _JSON_META_SCHEMA_URL}, use_default=False)
+            except Exception as e:
+                logger.debug(f'falling back to jsonschema for schema {schema}: {e}')
+
+    def validate(self, value) -> None:
+        """Raises jsonschema.ValidationError if value is not an instance of the schema."""
+        if self._generated is not None:
+            try:
+                self._generated(value)
+                return
+            except Exception:
+                pass
+        error = jsonschema.exceptions.best_match(self._validator.iter_errors(value))
+        if error is not None:
+            raise error
+
+    def is_valid(self, value) -> bool:
+        if self._generated is not None:
+            try:
+                self._generated(value)
+                return True
+            except Exception:
+                pass
+        return self._validator.is_valid(value)
+
+ValidatorCacheInfo = collections.namedtuple(
+    'ValidatorCacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+class _ValidatorCache():
+    def __init__(self, maxsize: int, generate_code: bool):
+        self.maxsize = maxsize
+        self.generate_code = generate_code
+        self.validators:'collections.OrderedDict[str, CachedValidator]' = collections.OrderedDict()
+        self.valid_schemas:'collections.OrderedDict[str, bool]' = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _lookup(self, entries, key):
+        with self.lock:
+            if key in entries:
+                entries.move_to_end(key)
+                self.hits += 1
+                return entries[key]
+            self.misses += 1
+            return None
+
+    def _store(self, entries, key, value) -> None:
+        with self.lock:
+            entries[key] = value
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+
+    def get_validator(self, schema: Dict[str, Any]) -> CachedValidator:
+        key = json_hash(schema) if self.maxsize > 0 else None
+        if key is not None:
+            validator = self._lookup(self.validators, key)
+            if validator is not None:
+                return validator
+        validator = CachedValidator(schema, self.generate_code)
+        if key is not None:
+            self._store(self.validators, key, validator)
+        return validator
+
+    def is_schema(self, value: Dict[str, Any]) -> bool:
+        key = json_hash(value) if self.maxsize > 0 else None
+        if key is not None:
+            result = self._lookup(self.valid_schemas, key)
+            if result is not None:
+                return result
+        result = self.get_validator(_json_meta_schema()).is_valid(value)
+        if key is not None:
+            self._store(self.valid_schemas, key, result)
+        return result
+
+_validator_cache = _ValidatorCache(maxsize=1024, generate_code=False)
+
+def get_validator(schema: Dict[str, Any]) -> CachedValidator:
+    """Validator for schema, compiled on first use and then cached.
+
+    The cache is keyed by the ``json_hash`` of the schema, so equal
+    schemas share a validator even if they are different objects.
+
+    Raises
+    ------
+    jsonschema.SchemaError
+        The schema itself was invalid.
+    """
+    return _validator_cache.get_validator(schema)
+
+def validator_cache_info() -> ValidatorCacheInfo:
+    """Statistics of the cache of validators and meta-schema checks, like functools.lru_cache."""
+    cache = _validator_cache
+    with cache.lock:
+        return ValidatorCacheInfo(cache.hits, cache.misses, cache.maxsize,
+                                  len(cache.validators) + len(cache.valid_schemas))
+
+def clear_validator_cache(maxsize: Optional[int]=None, generate_code: Optional[bool]=None) -> None:
+    """Empty the cache of validators and reset its statistics.
+
+    Parameters
+    ----------
+    maxsize: int, optional
+        If given, the new maximum number of cached validators, 0 disables caching.
+    generate_code: bool, optional
+        If given, whether new validators use Python code generated with
+        fastjsonschema, if that is installed.
+    """
+    global _validator_cache
+    old = _validator_cache
+    _validator_cache = _ValidatorCache(
+        old.maxsize if maxsize is None else maxsize,
+        old.generate_code if generate_code is None else generate_code)
+
 def validate_is_schema(value: Dict[str, Any]):
     if '$schema' in value:
         assert value['$schema'] == _JSON_META_SCHEMA_URL
-    jsonschema.validate(value, _json_meta_schema())
+    if not _validator_cache.is_schema(value):
+        get_validator(_json_meta_schema()).validate(value)
 
 def is_schema(value) -> bool:
     if isinstance(value, dict):
-        try:
-            jsonschema.validate(value, _json_meta_schema())
-        except:
-            return False
-        return True
+        return _validator_cache.is_schema(value)
     return False
 
 def split_with_schemas(estimator, all_X, all_y, indices, train_indices=None):
@@ -155,7 +311,107 @@ def split_with_schemas(estimator, all_X, all_y, indices, train_indices=None):
         lale.datasets.data_schemas.add_schema(subset_y, schema)
     return subset_X, subset_y
 
-def cross_val_score_track_trials(estimator, X, y=None, scoring=accuracy_score, cv=5, args_to_scorer=None):
+class _InferenceCache():
+    """Wraps a trained estimator to compute each inference method on X_test at most once.
+
+    For a trained pipeline with a single sink, the steps before the
+    sink run once, on the first inference call on X_test, and predict,
+    predict_proba, and decision_function only call the sink on their
+    cached output. Calls on data other than X_test, and all other
+    attributes, go to the wrapped estimator."""
+    def __init__(self, trained, X_test):
+        self._trained = trained
+        self._X_test = X_test
+        self._outputs:Dict[str, Any] = {}
+        self._sink = None
+        self._plan = None
+        self._sink_inputs = None
+        from lale.operators import TrainedPipeline
+        if isinstance(trained, TrainedPipeline) and len(trained.steps()) > 1 \
+           and len(trained.find_sink_nodes()) == 1:
+            plan = trained._inference_plan('predict')
+            if not plan.uses_meta:
+                self._sink = trained.steps()[-1]
+                self._plan = plan
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._trained, name)
+
+    def _run(self, method:str, X):
+        if X is not self._X_test:
+            return getattr(self._trained, method)(X)
+        if method not in self._outputs:
+            if self._sink is None:
+                result = getattr(self._trained, method)(X)
+            else:
+                from lale.operators import _bind_inference_step
+                if self._plan is not None:
+                    self._sink_inputs = self._plan.sink_inputs(self._X_test, None)
+                    self._plan = None
+                fun, _ = _bind_inference_step(self._sink, method)
+                result = fun(self._sink_inputs, None)
+                if method == 'predict' and isinstance(result, lale.datasets.data_schemas.NDArrayWithSchema):
+                    result = np.array(result)
+            self._outputs[method] = result
+        return self._outputs[method]
+
+    def predict(self, X):
+        return self._run('predict', X)
+
+    def predict_proba(self, X):
+        return self._run('predict_proba', X)
+
+    def decision_function(self, X):
+        return self._run('decision_function', X)
+
+def _fit_and_score_fold(estimator, X, y, train, test, scorer, args_to_scorer, track_log_loss=True, return_proba=False):
+    X_train, y_train = split_with_schemas(estimator, X, y, train)
+    X_test, y_test = split_with_schemas(estimator, X, y, test, train)
+    start = time.time()
+    #Not calling sklearn.base.clone() here, because:
+    #  (1) For Lale pipelines, clone() calls the pipeline constructor
+    #      with edges=None, so the resulting topology is incorrect.
+    #  (2) For Lale individual operators, the fit() method already
+    #      clones the impl object, so cloning again is redundant.
+    trained = estimator.fit(X_train, y_train)
+    cached = _InferenceCache(trained, X_test)
+    score_value  = scorer(cached, X_test, y_test, **args_to_scorer)
+    execution_time = time.time() - start
+    logloss = None
+    y_pred_proba = None
+    if track_log_loss or return_proba:
+        # not all estimators have predict probability
+        try:
+            y_pred_proba = cached.predict_proba(X_test)
+            if track_log_loss:
+                logloss = log_loss(y_true=y_test, y_pred=y_pred_proba)
+        except BaseException:
+            logger.debug("Warning, log loss cannot be computed")
+    if return_proba:
+        return score_value, logloss, execution_time, y_pred_proba
+    return score_value, logloss, execution_time
+
+class TrialPruned(Exception):
+    """Raised by cross_val_score_track_trials when its prune callback abandons the remaining folds.
+
+    Attributes
+    ----------
+    score, log_loss, time : float
+        Means over the folds evaluated before pruning, like the
+        result of cross_val_score_track_trials.
+    n_folds : int
+        Number of folds evaluated before pruning.
+    """
+    def __init__(self, score:float, log_loss:float, time:float, n_folds:int):
+        super().__init__(f'Trial pruned after {n_folds} folds with mean score {score}.')
+        self.score = score
+        self.log_loss = log_loss
+        self.time = time
+        self.n_folds = n_folds
+
+def cross_val_score_track_trials(estimator, X, y=None, scoring=accuracy_score, cv=5, args_to_scorer=None, n_jobs=1, backend='threading', track_log_loss=True, prune=None, oof_predict_proba=None):
     """
     Use the given estimator to perform fit and predict for splits defined by 'cv' and compute the given score on 
     each of the splits.
@@ -177,9 +433,21 @@ def cross_val_score_track_trials(estimator, X, y=None, scoring=accuracy_score, c
         Note that any of the iterators from https://scikit-learn.org/stable/modules/cross_validation.html#cross-validation-iterators can be used here.
     args_to_scorer: A dictionary of additional keyword arguments to pass to the scorer. 
                 Used for cases where the scorer has a signature such as ``scorer(estimator, X, y, **kwargs)``.
+    n_jobs: Number of folds to fit and score concurrently. None or 1 means one fold at a time, -1 means one worker per CPU.
+    backend: 'threading' or 'multiprocessing', the kind of worker pool used when n_jobs is not 1.
+        With 'threading', each fold fits its own deep copy of the estimator. With 'multiprocessing',
+        the estimator, data, and scorer are pickled to the workers.
+    track_log_loss: Whether to also compute the log loss of each fold. It reuses the predict_proba
+        output of the scorer when there is one, otherwise it costs one more call to the last step.
+    prune: Optional callable, for example a lale.search.fold_pruning.FoldPruner. After each fold but the last,
+        it is called with the list of the scores of the folds done so far, in the order they finished.
+        If it returns True, the remaining folds are skipped and TrialPruned is raised.
+    oof_predict_proba: Optional array with one row per row of X and one column per class. If given, the
+        rows of each test fold are filled with the predict_proba of the model trained without them.
+        Rows of folds whose estimator has no predict_proba, or saw fewer classes, are left unchanged.
     Returns
     -------
-        cv_results: a list of scores corresponding to each cross validation fold
+        cv_results: a triple of the mean score, mean log loss (nan if not tracked), and mean fit-and-score time over the folds
     """
     if isinstance(cv, int):
         cv = StratifiedKFold(cv)
@@ -187,32 +455,57 @@ def cross_val_score_track_trials(estimator, X, y=None, scoring=accuracy_score, c
     if args_to_scorer is None:
         args_to_scorer={}
     scorer = check_scoring(estimator, scoring=scoring)
-    cv_results:List[float] = []
-    log_loss_results = []
-    time_results = []
-    for train, test in cv.split(X, y):
-        X_train, y_train = split_with_schemas(estimator, X, y, train)
-        X_test, y_test = split_with_schemas(estimator, X, y, test, train)
-        start = time.time()
-        #Not calling sklearn.base.clone() here, because:
-        #  (1) For Lale pipelines, clone() calls the pipeline constructor
-        #      with edges=None, so the resulting topology is incorrect.
-        #  (2) For Lale individual operators, the fit() method already
-        #      clones the impl object, so cloning again is redundant.
-        trained = estimator.fit(X_train, y_train)
-        score_value  = scorer(trained, X_test, y_test, **args_to_scorer)
-        execution_time = time.time() - start
-        # not all estimators have predict probability
-        try:
-            y_pred_proba = trained.predict_proba(X_test)
-            logloss = log_loss(y_true=y_test, y_pred=y_pred_proba)
-            log_loss_results.append(logloss)
-        except BaseException:
-            logger.debug("Warning, log loss cannot be computed")
-        cv_results.append(score_value)
-        time_results.append(execution_time)
-    return np.array(cv_results).mean(), np.array(log_loss_results).mean(), np.array(execution_time).mean()
+    folds = list(cv.split(X, y))
+    fold_results:Dict[int, Any] = {}
+    def summarize():
+        results = list(fold_results.values())
+        cv_results:List[float] = [r[0] for r in results]
+        log_loss_results = [r[1] for r in results if r[1] is not None]
+        time_results = [r[2] for r in results]
+        return np.array(cv_results).mean(), np.array(log_loss_results).mean(), np.array(time_results).mean()
+    executor = lale.util.dag_executor.DAGExecutor(n_jobs, backend)
+    def make_task(i):
+        train, test = folds[i]
+        fold_estimator = estimator
+        if not executor.is_sequential() and backend == 'threading':
+            # fitting sets meta data and trained state on the operator,
+            # so concurrent folds must not share it
+            fold_estimator = copy.deepcopy(estimator)
+        return _fit_and_score_fold, (fold_estimator, X, y, train, test, scorer, args_to_scorer, track_log_loss, oof_predict_proba is not None)
+    def on_done(i, result):
+        if oof_predict_proba is not None:
+            *result, y_pred_proba = result
+            if y_pred_proba is not None and np.shape(y_pred_proba)[1:] == oof_predict_proba.shape[1:]:
+                oof_predict_proba[folds[i][1]] = y_pred_proba
+        fold_results[i] = result
+        if prune is not None and len(fold_results) < len(folds):
+            if prune([r[0] for r in fold_results.values()]):
+                raise TrialPruned(*summarize(), len(fold_results))
+    fold_ids = list(range(len(folds)))
+    executor.execute(fold_ids, {i: [] for i in fold_ids}, make_task, on_done)
+    return summarize()
+
+
+def pareto_front(losses, times) -> np.ndarray:
+    """
+    Mark the points that no other point beats in both loss and time.
+
+    Parameters
+    ----------
 
+    losses, times: Sequences of equal length, lower is better for both. Points with a nan in either are never on the front.
+    Returns
+    -------
+        on_front: boolean array, True for each point such that no other point has a lower or equal loss and time with at least one lower.
+    """
+    points = np.column_stack([np.asarray(losses, dtype=float), np.asarray(times, dtype=float)]).reshape(-1, 2)
+    valid = ~np.isnan(points).any(axis=1)
+    on_front = np.zeros(len(points), dtype=bool)
+    for i in np.flatnonzero(valid):
+        others = points[valid]
+        dominated = ((others <= points[i]).all(axis=1) & (others < points[i]).any(axis=1)).any()
+        on_front[i] = not dominated
+    return on_front
 
 def cross_val_score(estimator, X, y=None, scoring=accuracy_score, cv=5):
     """
@@ -490,6 +783,9 @@ def append_batch(data, batch_data):
                 return np.concatenate([data, batch_data])
             else:
                 return np.vstack((data, batch_data))
+    elif scipy.sparse.issparse(data):
+        if scipy.sparse.issparse(batch_data) or isinstance(batch_data, np.ndarray):
+            return scipy.sparse.vstack((data, batch_data), format=data.format)
     elif isinstance(data, tuple):
         X, y = data
         if isinstance(batch_data, tuple):
@@ -523,6 +819,14 @@ def create_data_loader(X, y = None, batch_size = 1):
         if isinstance(y, lale.datasets.data_schemas.NDArrayWithSchema):
             y = y.view(np.ndarray)
         dataset = NumpyTorchDataset(X, y)
+    elif scipy.sparse.issparse(X):
+        from lale.util.sparse_to_torch_dataset import SparseTorchDataset
+        if isinstance(y, pd.Series):
+            y = y.to_numpy()
+        elif isinstance(y, lale.datasets.data_schemas.NDArrayWithSchema):
+            y = y.view(np.ndarray)
+        dataset = SparseTorchDataset(X, y)
+        return DataLoader(dataset, batch_size=batch_size, collate_fn=SparseTorchDataset.collate)
     elif isinstance(X, str):#Assume that this is path to hdf5 file
         dataset = HDF5TorchDataset(X)
     elif isinstance(X, BatchDataDict):
@@ -0,0 +1,35 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+schema_cv_n_jobs = {
+    'description': 'Number of cross-validation folds to evaluate in parallel for each trial.',
+    'anyOf': [
+    {   'description': 'One fold at a time.',
+        'enum': [None]},
+    {   'description': 'Use all processors.',
+        'enum': [-1]},
+    {   'description': 'Number of folds to evaluate in parallel.',
+        'type': 'integer',
+        'minimum': 1}],
+    'default': None}
+
+schema_cv_backend = {
+    'description': """Kind of worker pool for the cross-validation folds of a trial when n_jobs is not 1.
+
+With 'threading', each fold fits its own copy of the estimator, which
+suits operators that release the GIL, such as most of scikit-learn.
+With 'multiprocessing', the estimator and data of each fold are pickled
+to a worker process, which helps pure-Python operators.""",
+    'enum': ['threading', 'multiprocessing'],
+    'default': 'threading'}
@@ -39,12 +39,13 @@ class ConcatFeaturesImpl():
             return result
 
         np_datasets = []
-        #Preprocess the datasets to convert them to 2-d numpy arrays
+        #Preprocess the datasets to convert them to 2-d numpy arrays,
+        #leaving sparse matrices as they are
         for dataset in X:
             if is_pandas(dataset):
                 np_dataset = dataset.values
-            elif isinstance(dataset, scipy.sparse.csr_matrix):
-                np_dataset = dataset.toarray()
+            elif scipy.sparse.issparse(dataset):
+                np_dataset = dataset
             elif torch_installed and isinstance(dataset, torch.Tensor):
                 np_dataset = dataset.detach().cpu().numpy()
             else:
@@ -53,8 +54,11 @@ class ConcatFeaturesImpl():
                 if len(np_dataset.shape) == 1: #To handle numpy column vectors
                     np_dataset = np.reshape(np_dataset, (np_dataset.shape[0], 1))
             np_datasets.append(np_dataset)
-            
-        result = np.concatenate(np_datasets, axis=1)
+
+        if any(scipy.sparse.issparse(d) for d in np_datasets):
+            result = scipy.sparse.hstack(np_datasets, format='csr')
+        else:
+            result = np.concatenate(np_datasets, axis=1)
         return result
 
     def transform_schema(self, s_X):
@@ -14,15 +14,21 @@
 
 from typing import Any, Dict
 
+import os
+import numpy as np
+import sklearn.base
+import sklearn.model_selection
 import lale.lib.sklearn
 import lale.search.lale_grid_search_cv
 import lale.operators
 import lale.sklearn_compat
+from lale.search.trial_store import TrialStore, search_key
+from lale.util.fit_cache import fingerprint
 
 from typing import Any, Dict
 
 class GridSearchCVImpl:
-    def __init__(self, estimator=None, cv=5, scoring='accuracy', n_jobs=None, lale_num_samples=None, lale_num_grids=None, param_grid=None, pgo=None):
+    def __init__(self, estimator=None, cv=5, scoring='accuracy', n_jobs=None, lale_num_samples=None, lale_num_grids=None, param_grid=None, pgo=None, trial_store=None):
         self._hyperparams = {
             'estimator': estimator,
             'cv': cv,
@@ -31,7 +37,8 @@ class GridSearchCVImpl:
             'lale_num_samples': lale_num_samples,
             'lale_num_grids': lale_num_grids,
             'pgo': pgo,
-            'hp_grid': param_grid }
+            'hp_grid': param_grid,
+            'trial_store': trial_store }
 
     def fit(self, X, y):
         if self._hyperparams['estimator'] is None:
@@ -48,7 +55,9 @@ class GridSearchCVImpl:
         if not hp_grid and isinstance(op, lale.operators.IndividualOp):
             hp_grid = [
                 lale.search.lale_grid_search_cv.get_defaults_as_param_grid(op)]
-        if hp_grid:
+        if hp_grid and self._hyperparams['trial_store'] is not None:
+            self._best_estimator = self._fit_with_store(op, hp_grid, X, y)
+        elif hp_grid:
             self.grid = lale.search.lale_grid_search_cv.get_lale_gridsearchcv_op(
                 lale.sklearn_compat.make_sklearn_compat(op),
                 hp_grid,
@@ -62,6 +71,53 @@ class GridSearchCVImpl:
             self._best_estimator = op
         return self
 
+    def _fit_with_store(self, op, hp_grid, X, y):
+        """Evaluate the grid points missing from the trial store, a few at a time, then refit the best."""
+        store = TrialStore(self._hyperparams['trial_store'], search_key(
+            'GridSearchCV', op.to_json(), self._hyperparams['scoring'],
+            self._hyperparams['cv'], fingerprint(X), fingerprint(y)))
+        try:
+            scores = {config_id: record['mean_test_score'] for _, config_id, record in store.read()}
+            candidates = list(sklearn.model_selection.ParameterGrid(hp_grid))
+            todo = [params for params in candidates if search_key(params) not in scores]
+            n_jobs = self._hyperparams['n_jobs']
+            if n_jobs is None:
+                chunk_size = 1
+            elif n_jobs < 0:
+                chunk_size = max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+            else:
+                chunk_size = n_jobs
+            for start in range(0, len(todo), chunk_size):
+                chunk = todo[start:start + chunk_size]
+                grid = lale.search.lale_grid_search_cv.get_lale_gridsearchcv_op(
+                    lale.sklearn_compat.make_sklearn_compat(op),
+                    [{name: [value] for name, value in params.items()} for params in chunk],
+                    cv=self._hyperparams['cv'],
+                    scoring=self._hyperparams['scoring'],
+                    n_jobs=n_jobs,
+                    refit=False)
+                grid.fit(X, y)
+                results = grid.cv_results_
+                for i, params in enumerate(results['params']):
+                    config_id = search_key(params)
+                    scores[config_id] = float(results['mean_test_score'][i])
+                    if not np.isfinite(scores[config_id]):
+                        continue #failed with error_score, re-run next time
+                    store.append(config_id, {
+                        'mean_test_score': scores[config_id],
+                        'std_test_score': float(results['std_test_score'][i]),
+                        'mean_fit_time': float(results['mean_fit_time'][i])})
+        finally:
+            store.close()
+        def score_of(params):
+            score = scores[search_key(params)]
+            return -np.inf if np.isnan(score) else score
+        best_params = max(candidates, key=score_of)
+        best = sklearn.base.clone(lale.sklearn_compat.make_sklearn_compat(op))
+        best.set_params(**best_params)
+        best.fit(X, y)
+        return best.to_lale()
+
     def predict(self, X):
         return self._best_estimator.predict(X)
 
@@ -162,6 +218,17 @@ _hyperparams_schema = {
                 'anyOf': [
                 {   'description': 'lale.search.PGO'},
                 {   'enum': [None]}],
+                'default': None},
+            'trial_store': {
+                'description': """File name of a SQLite database to checkpoint the grid points in, see lale.search.trial_store.
+
+Grid points are cross-validated a few at a time and those with a finite
+score are saved right away. Fitting again with the same estimator, data,
+and settings only evaluates the grid points that are not saved yet.""",
+                'anyOf': [
+                {   'description': 'Evaluate the whole grid in one sklearn GridSearchCV.',
+                    'enum': [None]},
+                {   'type': 'string'}],
                 'default': None}}}]}
 
 _input_fit_schema = {
@@ -13,11 +13,19 @@
 # limitations under the License.
 
 from hyperopt import fmin, tpe, hp, STATUS_OK, STATUS_FAIL, Trials, space_eval
-from lale.helpers import cross_val_score_track_trials, create_instance_from_hyperopt_search_space
+from hyperopt.utils import coarse_utcnow
+import hyperopt.base
+import hyperopt.progress
+from lale.helpers import cross_val_score_track_trials, create_instance_from_hyperopt_search_space, pareto_front, TrialPruned
 from lale.search.op2hp import hyperopt_search_space
 from lale.search.PGO import PGO
+from lale.search.fold_pruning import FoldPruner
+from lale.search.successive_halving import SuccessiveHalving, subsample
+from lale.search.trial_store import TrialStore, search_key
+from lale.util.fit_cache import fingerprint
 from sklearn.model_selection import train_test_split
 from sklearn.model_selection._split import check_cv
+from sklearn.utils.validation import _num_samples
 from sklearn.metrics import log_loss
 from sklearn.metrics.scorer import check_scoring
 import warnings
@@ -26,22 +34,69 @@ import pandas as pd
 import traceback
 
 import time
+import uuid
 import logging
-from typing import Any, Dict, Optional
+import os
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import collections
 import copy
 import sys
 import lale.docstrings
 import lale.operators
 from lale.lib.sklearn import LogisticRegression
-import multiprocessing
+from lale.lib.lale._common_schemas import schema_cv_backend, schema_cv_n_jobs
+import lale.util.oof_cache
+import lale.util.shared_data
+import lale.util.worker_pool
 
 SEED=42
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
 
+_trial_worker_state:Dict[str, Any] = {}
+
+def _init_trial_worker(evaluator, shared_X_train, shared_y_train):
+    _trial_worker_state['evaluator'] = evaluator
+    _trial_worker_state['X_train'] = shared_X_train.get()
+    _trial_worker_state['y_train'] = shared_y_train.get()
+
+def _run_trial_in_worker(params, budget=1.0, prune=None):
+    return_dict:Dict[str, Any] = {}
+    _trial_worker_state['evaluator']._proc_train_test(
+        params, _trial_worker_state['X_train'], _trial_worker_state['y_train'], return_dict, budget, prune)
+    return return_dict
+
+def _tid_of(pipeline_name:str)->int:
+    """Trial ID of a name from summary(), such as 'p3' or, for a promotion of trial 3, 'p3_r1'."""
+    return int(pipeline_name[1:].split('_')[0])
+
+def _canonical_json(trainable)->Dict[str, Any]:
+    """The to_json() of trainable, with the defaults of unset hyperparameters filled in."""
+    defaults:Dict[str, Dict[str, Any]] = {}
+    def collect(op):
+        if isinstance(op, lale.operators.IndividualOp):
+            defaults[op.class_name()] = op.hyperparam_defaults()
+            for value in (op.hyperparams() or {}).values():
+                if isinstance(value, lale.operators.Operator):
+                    collect(value)
+        else:
+            for step in op.steps():
+                collect(step)
+    def fill(jsn):
+        if isinstance(jsn, dict):
+            result = {k: fill(v) for k, v in jsn.items() if k not in ('label', 'documentation_url')}
+            if isinstance(result.get('hyperparams'), dict) and jsn.get('class') in defaults:
+                result['hyperparams'] = {**defaults[jsn['class']], **result['hyperparams']}
+            return result
+        if isinstance(jsn, list):
+            return [fill(v) for v in jsn]
+        return jsn
+    collect(trainable)
+    return fill(trainable.to_json())
+
 class HyperoptImpl:
 
-    def __init__(self, estimator=None, max_evals=50, cv=5, handle_cv_failure=False, scoring='accuracy', best_score=0.0, max_opt_time=None, max_eval_time=None, pgo:Optional[PGO]=None, show_progressbar=True, args_to_scorer=None):
+    def __init__(self, estimator=None, max_evals=50, cv=5, handle_cv_failure=False, scoring='accuracy', best_score=0.0, max_opt_time=None, max_eval_time=None, pgo:Optional[PGO]=None, show_progressbar=True, args_to_scorer=None, n_jobs=None, backend='threading', parallelism=None, min_budget=None, eta=3, fold_pruning=None, trial_store=None, keep_oof_proba=False, time_penalty=None):
         self.max_evals = max_evals
         if estimator is None:
             self.estimator = LogisticRegression()
@@ -60,101 +115,414 @@ class HyperoptImpl:
             self.args_to_scorer = args_to_scorer
         else:
             self.args_to_scorer = {}
+        self.n_jobs = n_jobs
+        self.backend = backend
+        self.parallelism = parallelism
+        self.min_budget = min_budget
+        self.eta = eta
+        self.fold_pruning = fold_pruning
+        self.trial_store = trial_store
+        self.keep_oof_proba = keep_oof_proba
+        self.time_penalty = time_penalty
+        self._oof_cache:Optional[lale.util.oof_cache.OOFCache] = None
+        self._halving = None
+        self._evaluated:Dict[Tuple[str, float], Dict[str, Any]] = {}
+        self._promotion_records:List[Dict[str, Any]] = []
+
+
+    def _train_test(self, params, X_train, y_train, prune=None, oof_predict_proba=None):
+        warnings.filterwarnings("ignore")
+
+        trainable = create_instance_from_hyperopt_search_space(self.estimator, params)
+        try:
+            cv_score, logloss, execution_time = cross_val_score_track_trials(trainable, X_train, y_train, cv=self.cv, scoring=self.scoring, args_to_scorer=self.args_to_scorer, n_jobs=self.n_jobs, backend=self.backend, prune=prune, oof_predict_proba=oof_predict_proba)
+            logger.debug("Successful trial of hyperopt with hyperparameters:{}".format(params))
+        except TrialPruned:
+            raise
+        except BaseException as e:
+            #If there is any error in cross validation, use the score based on a random train-test split as the evaluation criterion
+            if self.handle_cv_failure:
+                if oof_predict_proba is not None:
+                    oof_predict_proba.fill(np.nan)
+                X_train_part, X_validation, y_train_part, y_validation = train_test_split(X_train, y_train, test_size=0.20)
+                start = time.time()
+                trained = trainable.fit(X_train_part, y_train_part)
+                scorer = check_scoring(trainable, scoring=self.scoring)
+                cv_score  = scorer(trained, X_validation, y_validation, **self.args_to_scorer)
+                execution_time = time.time() - start
+                y_pred_proba = trained.predict_proba(X_validation)
+                try:
+                    logloss = log_loss(y_true=y_validation, y_pred=y_pred_proba)
+                except BaseException:
+                    logloss = 0
+                    logger.debug("Warning, log loss cannot be computed")
+            else:
+                logger.debug(e)
+                logger.debug("Error {} with pipeline:{}".format(e, trainable.to_json()))
+                raise e
+        return cv_score, logloss, execution_time
+
+    def _proc_train_test(self, params, X_train, y_train, return_dict, budget=1.0, prune=None):
+        return_dict['params'] = copy.deepcopy(params)
+        return_dict['budget'] = budget
+        try:
+            oof = None
+            if budget < 1.0:
+                X_train, y_train = subsample(self.estimator, X_train, y_train, budget, 2 * self.cv.get_n_splits(), SEED)
+            elif self._oof_cache is not None:
+                oof = np.full((_num_samples(X_train), len(np.unique(y_train))), np.nan, dtype=np.float32)
+            score, logloss, execution_time = self._train_test(params, X_train=X_train, y_train=y_train, prune=prune, oof_predict_proba=oof)
+            return_dict['loss'] = self.best_score - score + self._time_cost(execution_time)
+            return_dict['time'] = execution_time
+            return_dict['log_loss'] = logloss
+            return_dict['status'] = STATUS_OK
+            key = self._config_key(params)
+            if oof is not None and key is not None and np.isfinite(oof).all():
+                self._oof_cache.put(key, oof)
+                return_dict['oof_key'] = key
+        except TrialPruned as e:
+            # A pruned trial keeps the loss of its evaluated folds, which
+            # is worse than the incumbent, so TPE still learns from it
+            logger.debug(f"Trial pruned after {e.n_folds} folds with hyperparams: {params}")
+            return_dict['loss'] = self.best_score - e.score + self._time_cost(e.time)
+            return_dict['time'] = e.time
+            return_dict['log_loss'] = e.log_loss
+            return_dict['status'] = STATUS_OK
+            return_dict['pruned'] = True
+        except BaseException as e:
+            logger.warning(f"Exception caught in Hyperopt:{type(e)}, {traceback.format_exc()} with hyperparams: {params}, setting status to FAIL")
+            return_dict['status'] = STATUS_FAIL
+            return_dict['error_msg'] = f"Exception caught in Hyperopt:{type(e)}, {traceback.format_exc()} with hyperparams: {params}"
+
+    def _time_cost(self, execution_time)->float:
+        """Part of the loss charged for the time of a trial, zero unless time_penalty is set."""
+        if self.time_penalty is None:
+            return 0.0
+        return self.time_penalty * execution_time
+
+    def _n_parallel_trials(self)->int:
+        if self.parallelism is None:
+            return 1
+        if self.parallelism < 0:
+            return max(1, (os.cpu_count() or 1) + 1 + self.parallelism)
+        return self.parallelism
+
+    def _fold_pruner(self, budget=1.0)->Optional[FoldPruner]:
+        """Pruning rule against the best complete trial so far on the same budget, if fold_pruning is enabled."""
+        if self.fold_pruning is None:
+            return None
+        losses = [t['result']['loss'] for t in self._trials.trials
+                  if t['result'].get('status') == STATUS_OK and not t['result'].get('pruned')
+                  and t['result'].get('budget', 1.0) == budget]
+        if not losses:
+            return None
+        # With time_penalty the losses include time costs, so this
+        # incumbent score is a lower bound to beat, and pruning stays safe
+        return FoldPruner(self.best_score - min(losses), z=self.fold_pruning)
+
+    def _config_key(self, params)->Optional[str]:
+        """Canonical form of the pipeline that params instantiate, equal for trials that only differ in unused hyperparameters."""
+        try:
+            trainable = create_instance_from_hyperopt_search_space(self.estimator, params)
+            return search_key(_canonical_json(trainable))
+        except BaseException: #the trial itself will report the error
+            return None
+
+    @staticmethod
+    def _replaces(current:Dict[str, Any], new:Dict[str, Any])->bool:
+        """Whether new should become the result of a trial that has current, when a promotion finishes.
+
+        The result is the trial's successful evaluation on the most rows,
+        which is what TPE and summary see; a promotion that failed or got
+        pruned does not discard the result from the rung below."""
+        if current.get('status') != STATUS_OK:
+            return True
+        return (new['status'] == STATUS_OK and not new.get('pruned')
+                and new.get('budget', 1.0) >= current.get('budget', 1.0))
+
+    def _remember(self, key:Optional[str], result:Dict[str, Any])->None:
+        if key is not None and not result.get('duplicate'):
+            self._evaluated.setdefault((key, result.get('budget', 1.0)), copy.copy(result))
+
+    def _duplicate_result(self, key:Optional[str], budget:float, params)->Optional[Dict[str, Any]]:
+        """Result of an earlier trial of the same pipeline on the same budget, or None."""
+        if key is None or (key, budget) not in self._evaluated:
+            return None
+        result = dict(self._evaluated[(key, budget)], params=copy.deepcopy(params), duplicate=True, spawn_overhead=0.0)
+        return result
+
+    def _trial_result(self, params, task_result)->Dict[str, Any]:
+        """Turn the outcome of a trial run on a worker pool into a result for self._trials."""
+        if task_result.status == 'ok':
+            result = task_result.value
+        elif task_result.status == 'timeout':
+            logger.warning(f"Maximum alloted evaluation time exceeded. with hyperparams: {params}, setting status to FAIL")
+            result = {'params': params, 'status': STATUS_FAIL,
+                      'error_msg': f'Maximum alloted evaluation time of {self.max_eval_time} seconds exceeded.'}
+        else:
+            logger.warning(f"Corrupted results, setting status to FAIL")
+            result = {'params': params, 'status': STATUS_FAIL, 'error_msg': task_result.value}
+        result['spawn_overhead'] = task_result.overhead
+        return result
 
+    def _fmin_async(self, pool, X_train, y_train, opt_start_time, store=None):
+        """Like fmin with tpe.suggest, but scheduling the evaluations itself.
+
+        Evaluations run on the pool, as many at a time as it has
+        workers, or one at a time in this process if pool is None.
+        Whenever a slot is free, the next evaluation is a promotion to a
+        larger budget if successive halving allows one, and otherwise a
+        new trial that TPE suggests from the trials completed so far,
+        without waiting for the running ones (asynchronous TPE). Results
+        go into self._trials; a promoted trial shows its latest result.
+
+        With a TrialStore, each successful evaluation is appended to it,
+        and evaluations found in it, from an earlier fit or from another
+        process running the same search, are added to self._trials
+        before every suggestion and count towards max_evals."""
+        n_slots = self._n_parallel_trials() if pool is not None else 1
+        halving = self._halving
+        budgets = halving.budgets if halving is not None else [1.0]
+        domain = hyperopt.base.Domain(_run_trial_in_worker, self.search_space)
+        rstate = np.random.RandomState(SEED)
+        trials = self._trials
+        configs:Dict[int, Tuple[Dict[str, Any], hyperopt.base.Ctrl, Any]] = {}
+        config_keys:Dict[int, Optional[str]] = {}
+        pending:List[Tuple[int, int]] = []
+        ready:Deque[lale.util.worker_pool.TaskResult] = collections.deque()
+        n_queued = 0
+        trial_ids:Dict[int, str] = {}
+        stored_tids:Dict[str, int] = {}
+        written = set()
+        store_seq = 0
+        def sync_store():
+            nonlocal n_queued, store_seq
+            if store is None:
+                return
+            for seq, trial_id, record in store.read(store_seq):
+                store_seq = seq
+                if (trial_id, record['rung']) in written:
+                    continue
+                if trial_id in stored_tids:
+                    tid = stored_tids[trial_id]
+                    doc = configs[tid][0]
+                else:
+                    tid = trials.new_trial_ids(1)[0]
+                    vals = record['vals']
+                    misc = {'tid': tid, 'cmd': domain.cmd, 'workdir': domain.workdir,
+                            'idxs': {k: [tid] if v else [] for k, v in vals.items()}, 'vals': vals}
+                    doc = trials.new_trial_docs([tid], [None], [{}], [misc])[0]
+                    doc['state'] = hyperopt.JOB_STATE_DONE
+                    trials.insert_trial_docs([doc])
+                    doc = [t for t in trials._dynamic_trials if t['tid'] == tid][0]
+                    params = space_eval(self.search_space, {k: v[0] for k, v in vals.items() if v})
+                    configs[tid] = (doc, None, params)
+                    config_keys[tid] = self._config_key(params)
+                    trial_ids[tid] = trial_id
+                    stored_tids[trial_id] = tid
+                    n_queued += 1
+                result = dict(record['result'], params=configs[tid][2])
+                if halving is not None:
+                    ok = result['status'] == STATUS_OK and not result.get('pruned')
+                    halving.record(tid, record['rung'], result['loss'] if ok else None)
+                if self._replaces(doc['result'], result):
+                    doc['result'] = result
+                self._remember(config_keys[tid], result)
+            trials.refresh()
+        sync_store()
+        def next_result(timeout):
+            if ready:
+                return ready.popleft()
+            if pool is not None:
+                return pool.wait(timeout=timeout)
+            tid, rung = pending[0]
+            return_dict:Dict[str, Any] = {}
+            start = time.time()
+            self._proc_train_test(configs[tid][2], X_train, y_train, return_dict, budgets[rung], self._fold_pruner(budgets[rung]))
+            return lale.util.worker_pool.TaskResult((tid, rung), 'ok', return_dict, time.time() - start, 0.0)
+        if self.show_progressbar:
+            progress_callback = hyperopt.progress.default_callback
+        else:
+            progress_callback = hyperopt.progress.no_progress_callback
+        try:
+            with progress_callback(initial=0, total=self.max_evals) as progress_ctx:
+                while True:
+                    remaining_time = None
+                    if self.max_opt_time is not None:
+                        remaining_time = self.max_opt_time - (time.time() - opt_start_time)
+                        if remaining_time <= 0:
+                            logger.warning('Maximum alloted optimization time exceeded. Optimization exited prematurely')
+                            break
+                    while len(pending) < n_slots:
+                        promotion = halving.next_promotion() if halving is not None else None
+                        if promotion is not None:
+                            tid, rung = promotion
+                        elif n_queued < self.max_evals:
+                            sync_store()
+                            if n_queued >= self.max_evals:
+                                break
+                            tid, rung = trials.new_trial_ids(1)[0], 0
+                            trials.refresh()
+                            new_trials = tpe.suggest([tid], domain, trials, rstate.randint(2 ** 31 - 1))
+                            trials.insert_trial_docs(new_trials)
+                            trials.refresh()
+                            n_queued += 1
+                            doc = [t for t in trials._dynamic_trials if t['tid'] == tid][0]
+                            doc['state'] = hyperopt.JOB_STATE_RUNNING
+                            doc['book_time'] = doc['refresh_time'] = coarse_utcnow()
+                            ctrl = hyperopt.base.Ctrl(trials, current_trial=doc)
+                            _, params = domain.evaluate_async(hyperopt.base.spec_from_misc(doc['misc']), ctrl)
+                            configs[tid] = (doc, ctrl, params)
+                            config_keys[tid] = self._config_key(params)
+                            trial_ids[tid] = uuid.uuid4().hex
+                            stored_tids[trial_ids[tid]] = tid
+                        else:
+                            break
+                        duplicate = self._duplicate_result(config_keys[tid], budgets[rung], configs[tid][2])
+                        if duplicate is not None:
+                            ready.append(lale.util.worker_pool.TaskResult((tid, rung), 'ok', duplicate, 0.0, 0.0))
+                        elif pool is not None:
+                            pool.submit((tid, rung), _run_trial_in_worker, (configs[tid][2], budgets[rung], self._fold_pruner(budgets[rung])), timeout=self.max_eval_time)
+                        pending.append((tid, rung))
+                    if not pending:
+                        break
+                    task_result = next_result(remaining_time)
+                    if task_result is None:
+                        continue
+                    tid, rung = task_result.task_id
+                    pending.remove((tid, rung))
+                    doc, ctrl, params = configs[tid]
+                    try:
+                        result = domain.evaluate_async2(self._trial_result(params, task_result), ctrl)
+                    except BaseException as e:
+                        result = {'params': params, 'status': STATUS_FAIL, 'error_msg': f"Exception caught in Hyperopt:{type(e)}, {e}"}
+                    result.setdefault('budget', budgets[rung])
+                    if self._replaces(doc['result'], result):
+                        doc['result'] = result
+                    else:
+                        self._promotion_records.append(dict(result, tid=tid, rung=rung))
+                    self._remember(config_keys[tid], result)
+                    if store is not None and result['status'] == STATUS_OK:
+                        # failures may be one-off, such as a timeout, so they are not kept
+                        stored_result = {k: v for k, v in result.items() if k != 'params'}
+                        store.append(trial_ids[tid], {'rung': rung, 'vals': doc['misc']['vals'], 'result': stored_result})
+                        written.add((trial_ids[tid], rung))
+                    doc['state'] = hyperopt.JOB_STATE_DONE
+                    doc['refresh_time'] = coarse_utcnow()
+                    trials.refresh()
+                    if halving is not None:
+                        ok = result['status'] == STATUS_OK and not result.get('pruned')
+                        halving.record(tid, rung, result['loss'] if ok else None)
+                    if rung == 0:
+                        progress_ctx.update(1)
+                    losses = [loss for loss in trials.losses() if loss is not None]
+                    if losses:
+                        progress_ctx.postfix = "best loss: " + str(min(losses))
+        finally:
+            for tid, rung in pending:
+                if rung == 0:
+                    doc = configs[tid][0]
+                    doc['result'] = {'status': STATUS_FAIL, 'error_msg': 'Maximum alloted optimization time exceeded.'}
+                    doc['state'] = hyperopt.JOB_STATE_DONE
+            trials.refresh()
+        if STATUS_OK not in trials.statuses():
+            raise ValueError('ValueError from hyperopt, none of the trials succeeded.')
+
+    def _best_trial(self)->Dict[str, Any]:
+        if self._halving is None:
+            return self._trials.best_trial
+        best_tid = self._halving.best()
+        return [t for t in self._trials.trials if t['tid'] == best_tid][0]
 
     def fit(self, X_train, y_train):
         opt_start_time = time.time()
         self.cv = check_cv(self.cv, y = y_train, classifier=True) #TODO: Replace the classifier flag value by using tags?
-        def hyperopt_train_test(params, X_train, y_train):
-            warnings.filterwarnings("ignore")
+        self._halving = None
+        self._evaluated = {}
+        self._promotion_records = []
+        if self._oof_cache is not None:
+            self._oof_cache.close()
+        self._oof_cache = lale.util.oof_cache.OOFCache() if self.keep_oof_proba else None
+        if self.min_budget is not None:
+            self._halving = SuccessiveHalving(self.min_budget, self.eta)
 
-            trainable = create_instance_from_hyperopt_search_space(self.estimator, params)
-            try:
-                cv_score, logloss, execution_time = cross_val_score_track_trials(trainable, X_train, y_train, cv=self.cv, scoring=self.scoring, args_to_scorer=self.args_to_scorer)
-                logger.debug("Successful trial of hyperopt with hyperparameters:{}".format(params))
-            except BaseException as e:
-                #If there is any error in cross validation, use the score based on a random train-test split as the evaluation criterion
-                if self.handle_cv_failure:
-                    X_train_part, X_validation, y_train_part, y_validation = train_test_split(X_train, y_train, test_size=0.20)
-                    start = time.time()
-                    trained = trainable.fit(X_train_part, y_train_part)
-                    scorer = check_scoring(trainable, scoring=self.scoring)
-                    cv_score  = scorer(trained, X_validation, y_validation, **self.args_to_scorer)
-                    execution_time = time.time() - start
-                    y_pred_proba = trained.predict_proba(X_validation)
-                    try:
-                        logloss = log_loss(y_true=y_validation, y_pred=y_pred_proba)
-                    except BaseException:
-                        logloss = 0
-                        logger.debug("Warning, log loss cannot be computed")
-                else:
-                    logger.debug(e)
-                    logger.debug("Error {} with pipeline:{}".format(e, trainable.to_json()))
-                    raise e
-            return cv_score, logloss, execution_time
-            
-            
-        def proc_train_test(params, X_train, y_train, return_dict):
-            return_dict['params'] = copy.deepcopy(params)
-            try:
-                score, logloss, execution_time = hyperopt_train_test(params, X_train=X_train, y_train=y_train)
-                return_dict['loss'] = self.best_score - score
-                return_dict['time'] = execution_time
-                return_dict['log_loss'] = logloss
-                return_dict['status'] = STATUS_OK
-            except BaseException as e:
-                logger.warning(f"Exception caught in Hyperopt:{type(e)}, {traceback.format_exc()} with hyperparams: {params}, setting status to FAIL")
-                return_dict['status'] = STATUS_FAIL
-                return_dict['error_msg'] = f"Exception caught in Hyperopt:{type(e)}, {traceback.format_exc()} with hyperparams: {params}"
-            
         def get_final_trained_estimator(params, X_train, y_train):
             warnings.filterwarnings("ignore")
             trainable = create_instance_from_hyperopt_search_space(self.estimator, params)
             trained = trainable.fit(X_train, y_train)
             return trained
 
+        store = None
+        if self.trial_store is not None:
+            store = TrialStore(self.trial_store, search_key(
+                'Hyperopt', self.estimator.to_json(), self.scoring, self.args_to_scorer,
+                self.cv, self.best_score, self.min_budget, self.eta, self.time_penalty,
+                fingerprint(X_train), fingerprint(y_train)))
+
+        pool = None
+        shared_data = []
+        if self._n_parallel_trials() > 1 or self.max_eval_time:
+            # Trials run on long-lived worker processes that map one
+            # shared copy of the data, and get replaced if a trial runs
+            # out of time
+            evaluator = copy.copy(self)
+            evaluator._trials = None
+            # workers are daemonic processes, which cannot start
+            # processes of their own for the folds
+            evaluator.backend = 'threading'
+            shared_data = [lale.util.shared_data.SharedData(X_train),
+                           lale.util.shared_data.SharedData(y_train)]
+            pool = lale.util.worker_pool.WorkerPool(
+                self._n_parallel_trials(), _init_trial_worker, (evaluator, *shared_data))
+
         def f(params):
             current_time = time.time()
             if (self.max_opt_time is not None) and ((current_time - opt_start_time) > self.max_opt_time) :
                 # if max optimization time set, and we have crossed it, exit optimization completely
                 sys.exit(0)
-            if self.max_eval_time:
-                # Run hyperopt in a subprocess that can be interupted
-                manager = multiprocessing.Manager()
-                proc_dict = manager.dict()
-                p = multiprocessing.Process(
-                    target=proc_train_test,
-                    args=(params, X_train, y_train, proc_dict))
-                p.start()
-                p.join(self.max_eval_time)
-                if p.is_alive():
-                    p.terminate()
-                    p.join()
-                    logger.warning(f"Maximum alloted evaluation time exceeded. with hyperparams: {params}, setting status to FAIL")
-                    proc_dict['status'] = STATUS_FAIL
-                if 'status' not in proc_dict:
-                    logger.warning(f"Corrupted results, setting status to FAIL")
-                    proc_dict['status'] = STATUS_FAIL
+            key = self._config_key(params)
+            proc_dict = self._duplicate_result(key, 1.0, params)
+            if proc_dict is not None:
+                return proc_dict
+            if pool is not None:
+                pool.submit(None, _run_trial_in_worker, (params, 1.0, self._fold_pruner()), timeout=self.max_eval_time)
+                proc_dict = self._trial_result(params, pool.wait())
             else:
                 proc_dict = {}
-                proc_train_test(params, X_train, y_train, proc_dict)    
+                self._proc_train_test(params, X_train, y_train, proc_dict, prune=self._fold_pruner())
+            self._remember(key, proc_dict)
             return proc_dict
 
         try :
-            fmin(f, self.search_space, algo=tpe.suggest, max_evals=self.max_evals, trials=self._trials, rstate=np.random.RandomState(SEED),
-            show_progressbar=self.show_progressbar)
+            if self._n_parallel_trials() > 1 or self._halving is not None or store is not None:
+                self._fmin_async(pool, X_train, y_train, opt_start_time, store)
+            else:
+                fmin(f, self.search_space, algo=tpe.suggest, max_evals=self.max_evals, trials=self._trials, rstate=np.random.RandomState(SEED),
+                show_progressbar=self.show_progressbar)
         except SystemExit :
             logger.warning('Maximum alloted optimization time exceeded. Optimization exited prematurely')
         except ValueError:
             self._best_estimator = None
             if STATUS_OK not in self._trials.statuses():
                 raise ValueError('ValueError from hyperopt, none of the trials succeeded.')
+        finally:
+            if pool is not None:
+                pool.close()
+            for shared in shared_data:
+                shared.close()
+            if store is not None:
+                store.close()
 
         try :
-            best_params = space_eval(self.search_space, self._trials.argmin)
+            best_trial = self._best_trial()
+            best_vals = {k: v[0] for k, v in best_trial['misc']['vals'].items() if v}
+            best_params = space_eval(self.search_space, best_vals)
+            best_result = best_trial['result']
+            # the loss includes the time penalty, which is not part of the score
+            best_loss = best_result['loss'] - self._time_cost(best_result.get('time', 0.0))
             logger.info(
                 'best score: {:.1%}\nbest hyperparams found using {} hyperopt trials: {}'.format(
-                    self.best_score - self._trials.average_best_error(), self.max_evals, best_params
+                    self.best_score - best_loss, self.max_evals, best_params
                 )
             )
             trained = get_final_trained_estimator(best_params, X_train, y_train)
@@ -181,34 +549,61 @@ class HyperoptImpl:
         return predictions
 
     def summary(self):
-        """Table summarizing the trial results (ID, loss, time, log_loss, status).
+        """Table summarizing the trial results (ID, loss, time, log_loss, budget, spawn_overhead, duplicate, pareto, status).
+
+The budget is the fraction of the training rows that the reported
+loss was cross-validated on; it is below 1 only for trials that were
+not promoted to the full data by successive halving (see min_budget).
+A trial shows its successful evaluation on the most rows. A promotion
+that failed or was pruned gets a row of its own, named like
+'p3_r1' for trial p3 on rung 1, with the budget of that rung.
+
+The spawn_overhead is the time a trial spent outside of its own
+evaluation when it ran on a worker process (with max_eval_time or
+parallelism), for example waiting for a replacement worker to start
+or pickling; it is zero for trials run in this process.
+
+A trial is a duplicate if it instantiates the same pipeline as an
+earlier trial, for example because it only differs in hyperparameters
+of an operator that the chosen branch of a choice does not use. Its
+results are copied from the earlier trial instead of cross-validating
+again.
+
+With time_penalty, the loss includes time_penalty times the time.
+A trial is on the pareto front if no other trial with status 'ok' on
+the full data has both a lower or equal loss (without the time
+penalty) and a lower or equal time, with one of them strictly lower.
+The front shows the trade-off between accuracy and fit and predict
+time, for picking a faster pipeline with get_pipeline.
+
+The status of a trial is 'pruned' if fold_pruning skipped some of its
+folds because it could not beat the best trial so far; its loss, time,
+and log_loss are then averaged over the folds it did evaluate.
 
 Returns
 -------
 result : DataFrame"""
-        def make_record(trial_dict):
-            try:
-                loss = trial_dict['result']['loss']
-            except BaseException:
-                loss = np.nan
-            try:
-                time = trial_dict['result']['time']
-            except BaseException:
-                time = '-'
-            try:
-                log_loss = trial_dict['result']['log_loss']
-            except BaseException:
-                log_loss = np.nan
-
+        def make_record(name, tid, result):
             return {
-                'name': f'p{trial_dict["tid"]}',
-                'tid': trial_dict['tid'],
-                'loss': trial_dict['result'].get('loss', float('nan')),
-                'time': trial_dict['result'].get('time', float('nan')),
-                'log_loss': trial_dict['result'].get('log_loss', float('nan')),
-                'status': trial_dict['result']['status']}
-        records = [make_record(td) for td in self._trials.trials]
-        result = pd.DataFrame.from_records(records, index='name')
+                'name': name,
+                'tid': tid,
+                'loss': result.get('loss', float('nan')),
+                'time': result.get('time', float('nan')),
+                'log_loss': result.get('log_loss', float('nan')),
+                'budget': result.get('budget', 1.0),
+                'spawn_overhead': result.get('spawn_overhead', 0.0),
+                'duplicate': result.get('duplicate', False),
+                'status': 'pruned' if result.get('pruned') else result['status']}
+        records = [make_record(f'p{td["tid"]}', td['tid'], td['result']) for td in self._trials.trials]
+        records += [make_record(f'p{r["tid"]}_r{r["rung"]}', r['tid'], r) for r in self._promotion_records]
+        complete = [r for r in records if r['status'] == STATUS_OK and r['budget'] == 1.0]
+        on_front = pareto_front([r['loss'] - self._time_cost(r['time']) for r in complete], [r['time'] for r in complete])
+        for record in records:
+            record['pareto'] = False
+        for record, pareto in zip(complete, on_front):
+            record['pareto'] = bool(pareto)
+        columns = ['name', 'tid', 'loss', 'time', 'log_loss', 'budget', 'spawn_overhead', 'duplicate', 'pareto', 'status']
+        result = pd.DataFrame.from_records(records, columns=columns, index='name')
         return result
 
     def get_pipeline(self, pipeline_name=None, astype='lale'):
@@ -234,7 +629,7 @@ result : Trained operator if best, trainable operator otherwise.
         if pipeline_name is None:
             result = getattr(self, '_best_estimator', None)
         else:
-            tid = int(pipeline_name[1:])
+            tid = _tid_of(pipeline_name)
             params = self._trials.trials[tid]['result']['params']
             result = create_instance_from_hyperopt_search_space(
                 self.estimator, params)
@@ -243,6 +638,26 @@ result : Trained operator if best, trainable operator otherwise.
         assert astype == 'sklearn', astype
         return result.export_to_sklearn_pipeline()
 
+    def get_oof_proba(self, pipeline_name):
+        """Out-of-fold predict_proba of one of the trials, kept with keep_oof_proba.
+
+Parameters
+----------
+pipeline_name : string
+    Key for table returned by summary().
+
+Returns
+-------
+result : Read-only float32 array with one row per training row and one column per class, or None if not kept for this trial.
+"""
+        if self._oof_cache is None:
+            return None
+        tid = _tid_of(pipeline_name)
+        key = self._trials.trials[tid]['result'].get('oof_key')
+        if key is None:
+            return None
+        return self._oof_cache.get(key)
+
 _hyperparams_schema = {
     'allOf': [
     {   'type': 'object',
@@ -331,7 +746,7 @@ where zero is the best loss.""",
                     'enum': [None]}],
                 'default': None},
             'max_eval_time': {
-                'description': 'Maximum amout of time in seconds for each evaluation.',
+                'description': 'Maximum amout of time in seconds for each evaluation. Trials then run on worker processes, see parallelism.',
                 'anyOf': [
                 {   'type': 'number',
                     'minimum': 0.0},
@@ -347,6 +762,102 @@ where zero is the best loss.""",
                 'description': 'Display progress bar during optimization.',
                 'type': 'boolean',
                 'default': True},
+            'n_jobs': schema_cv_n_jobs,
+            'backend': schema_cv_backend,
+            'parallelism': {
+                'description': """Number of trials to evaluate in parallel on a pool of worker processes.
+
+Workers map one shared copy of numeric data. Whenever a worker is free,
+TPE suggests the next trial based on the trials completed so far.
+Cross-validation folds within a trial (see n_jobs) then run on threads,
+whatever the backend; the same holds with max_eval_time.""",
+                'anyOf': [
+                {   'description': 'One trial at a time, in this process.',
+                    'enum': [None]},
+                {   'description': 'One trial per processor.',
+                    'enum': [-1]},
+                {   'description': 'Number of worker processes.',
+                    'type': 'integer',
+                    'minimum': 1}],
+                'default': None},
+            'min_budget': {
+                'description': """Smallest fraction of the training rows to cross-validate a trial on, for successive halving.
+
+Each new trial is first evaluated on a subsample with this fraction
+of the rows. Trials among the best 1/eta of those evaluated on a
+subsample get promoted to eta times more rows, up to the full data,
+so that more trials fit into the same max_opt_time. The best trial is
+picked among those evaluated on the most rows.
+
+TPE is told the loss of each trial on the most rows it was successfully
+evaluated on, so a promotion replaces the loss from the smaller
+subsample, unless the promotion failed or was pruned.""",
+                'anyOf': [
+                {   'description': 'Evaluate all trials on all the rows.',
+                    'enum': [None]},
+                {   'type': 'number',
+                    'minimum': 0.0,
+                    'exclusiveMinimum': True,
+                    'maximum': 1.0}],
+                'default': None},
+            'eta': {
+                'description': 'Ratio between consecutive budgets of successive halving, ignored if min_budget is None.',
+                'type': 'number',
+                'minimum': 1.0,
+                'exclusiveMinimum': True,
+                'default': 3},
+            'fold_pruning': {
+                'description': """Early stopping of the cross-validation of trials that cannot beat the best trial so far.
+
+After each fold, the mean score of the folds so far plus this many
+standard errors is compared to the mean score of the best complete
+trial on the same budget, and if it is lower the remaining folds are
+skipped. Pruned trials show status 'pruned' in summary().""",
+                'anyOf': [
+                {   'description': 'Always evaluate all folds.',
+                    'enum': [None]},
+                {   'description': 'Width of the confidence bound in standard errors.',
+                    'type': 'number',
+                    'minimum': 0.0}],
+                'default': None},
+            'trial_store': {
+                'description': """File name of a SQLite database to checkpoint the trials in, see lale.search.trial_store.
+
+Each successful trial is saved right away. Fitting again with the same
+estimator, data, and settings resumes from the saved trials instead
+of re-running them, with max_evals counting them too, and several
+processes on one machine can share the file to extend the same search.""",
+                'anyOf': [
+                {   'description': 'Keep the trials in memory only.',
+                    'enum': [None]},
+                {   'type': 'string'}],
+                'default': None},
+            'keep_oof_proba': {
+                'description': """Keep the out-of-fold predict_proba of each trial, see get_oof_proba.
+
+Each training row is predicted once during cross-validation, by the
+model of the fold that held it out. The arrays are kept as float32
+files in a temporary folder, for ensemble selection without further
+cross-validation. They are only kept for trials that cross-validated
+all folds on all the rows, and for classifiers with predict_proba.""",
+                'type': 'boolean',
+                'default': False},
+            'time_penalty': {
+                'description': """Cost-aware optimization, trading score for shorter trials.
+
+The loss that Hyperopt minimizes, and by which the best pipeline is
+picked, becomes best_score - score plus this many times the mean time
+in seconds to fit and score one fold. For example, 0.01 accepts one more
+second per fold for a score that is 0.01 better. Cheap configurations
+then look better to TPE, so it explores them more. To rule out slow
+trials altogether instead, use max_eval_time.""",
+                'anyOf': [
+                {   'description': 'The loss only depends on the score.',
+                    'enum': [None]},
+                {   'description': 'Loss per second of fold time.',
+                    'type': 'number',
+                    'minimum': 0.0}],
+                'default': None},
             'args_to_scorer':{
                 'anyOf':[
                     {'type':'object'},#Python dictionary
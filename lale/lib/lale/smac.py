@@ -14,6 +14,7 @@
 
 import logging
 import numpy as np
+import pandas as pd
 import sys
 
 import time
@@ -30,17 +31,31 @@ from smac.configspace import ConfigurationSpace
 from smac.facade.smac_facade import SMAC as orig_SMAC
 from smac.scenario.scenario import Scenario
 from smac.tae.execute_ta_run import BudgetExhaustedException
-from lale.helpers import cross_val_score_track_trials
+from lale.helpers import cross_val_score_track_trials, pareto_front, TrialPruned
 from lale.lib.sklearn import LogisticRegression
 import lale.operators
+from lale.lib.lale._common_schemas import schema_cv_backend, schema_cv_n_jobs
 from lale.search.lale_smac import lale_op_smac_tae, get_smac_space, lale_trainable_op_from_config
+from lale.search.fold_pruning import FoldPruner
+from lale.search.successive_halving import SuccessiveHalving, subsample
+from lale.search.trial_store import TrialStore, search_key
+from lale.util.fit_cache import fingerprint
 import lale.sklearn_compat
 
 logger = logging.getLogger(__name__)
 
+def _replaces(current, new):
+    """Whether summary() should show the trial record new instead of current, for the same trial.
+
+    A trial shows its successful evaluation on the most rows, so a
+    promotion that failed or got pruned keeps the record from the rung below."""
+    if current['status'] != 'ok':
+        return True
+    return new['status'] == 'ok' and new['budget'] >= current['budget']
+
 class SMACImpl:
 
-    def __init__(self, estimator=None, max_evals=50, cv=5, handle_cv_failure=False, scoring='accuracy', best_score=0.0, max_opt_time=None, lale_num_grids=None):
+    def __init__(self, estimator=None, max_evals=50, cv=5, handle_cv_failure=False, scoring='accuracy', best_score=0.0, max_opt_time=None, lale_num_grids=None, n_jobs=None, backend='threading', min_budget=None, eta=3, fold_pruning=None, trial_store=None, time_penalty=None):
         """ Instantiate the SMAC that will use the given estimator and other parameters to select the 
         best performing trainable instantiation of the estimator. 
 
@@ -77,6 +92,40 @@ class SMACImpl:
         max_opt_time : float, optional
             Maximum amount of wall clock time in seconds for the optimization. By default, None, implying no runtime
             bound.
+        n_jobs : int, optional
+            Number of cross-validation folds to evaluate in parallel for each trial,
+            -1 means one per processor. By default, None, i.e., one fold at a time.
+        backend : 'threading' or 'multiprocessing', optional
+            Kind of worker pool for the folds when n_jobs is not 1. With 'threading', the
+            default, each fold fits its own copy of the estimator; with 'multiprocessing',
+            the estimator and data of each fold are pickled to a worker process.
+        min_budget : float, optional
+            Smallest fraction of the training rows to cross-validate a trial on.
+            If set, each configuration proposed by SMAC is evaluated on this fraction
+            of the rows, and the best 1/eta of them are re-evaluated on eta times more
+            rows, up to the full data (successive halving). SMAC is told the loss on the
+            smallest subsample, and the best configuration is picked among those
+            evaluated on the most rows. By default, None, i.e., all trials use all rows.
+        eta : float, optional
+            Ratio between consecutive budgets of successive halving, by default 3.
+        fold_pruning : float, optional
+            If set, the cross-validation of a trial stops early when the mean score of its
+            folds so far plus this many standard errors is below the mean score of the best
+            complete trial on the same budget. SMAC is told the loss of the evaluated folds,
+            and summary() shows such trials with status 'pruned'. By default, None, i.e.,
+            all folds are always evaluated.
+        trial_store : str, optional
+            File name of a SQLite database to checkpoint the trials in, see
+            lale.search.trial_store. Each successful or pruned evaluation is saved right
+            away, and fitting again with the same estimator, data, and settings reuses
+            the saved results of the configurations that SMAC proposes again instead of
+            re-running them; failed ones are re-run. By default, None, i.e., trials are only kept in memory.
+        time_penalty : float, optional
+            If set, the loss that SMAC minimizes, and by which the best pipeline is
+            picked, becomes best_score - score plus this many times the mean time in
+            seconds to fit and score one fold, so that cheap configurations are
+            preferred unless slower ones score better by enough. By default, None,
+            i.e., the loss only depends on the score.
 
         Examples
         --------
@@ -108,6 +157,13 @@ class SMACImpl:
         self.handle_cv_failure = handle_cv_failure
         self.cv = cv
         self.max_opt_time = max_opt_time
+        self.n_jobs = n_jobs
+        self.backend = backend
+        self.min_budget = min_budget
+        self.eta = eta
+        self.fold_pruning = fold_pruning
+        self.trial_store = trial_store
+        self.time_penalty = time_penalty
         # Scenario object
         scenario_options = {"run_obj": "quality",   # we optimize quality (alternatively runtime)
                             "runcount-limit": self.max_evals,  # maximum function evaluations
@@ -119,14 +175,17 @@ class SMACImpl:
             scenario_options["wallclock_limit"]= max_opt_time
         self.scenario = Scenario(scenario_options)
         self.trials = None
+        self._trial_records = []
 
     def fit(self, X_train, y_train):
         self.cv = check_cv(self.cv, y = y_train, classifier=True) #TODO: Replace the classifier flag value by using tags?
 
-        def smac_train_test(trainable, X_train, y_train):
+        def smac_train_test(trainable, X_train, y_train, prune=None):
             try:
-                cv_score, logloss, execution_time = cross_val_score_track_trials(trainable, X_train, y_train, cv=self.cv, scoring=self.scoring)
+                cv_score, logloss, execution_time = cross_val_score_track_trials(trainable, X_train, y_train, cv=self.cv, scoring=self.scoring, n_jobs=self.n_jobs, backend=self.backend, track_log_loss=False, prune=prune)
                 logger.debug("Successful trial of SMAC")
+            except TrialPruned:
+                raise
             except BaseException as e:
                 #If there is any error in cross validation, use the score based on a random train-test split as the evaluation criterion
                 if self.handle_cv_failure:
@@ -147,26 +206,84 @@ class SMACImpl:
                     raise e
             return cv_score, logloss, execution_time
 
+        halving = None if self.min_budget is None else SuccessiveHalving(self.min_budget, self.eta)
+        budgets = [1.0] if halving is None else halving.budgets
+        trainables = []
+        self._trial_records = []
+
+        def fold_pruner(budget):
+            if self.fold_pruning is None:
+                return None
+            losses = [r['loss'] for r in self._trial_records
+                      if r.get('status') == 'ok' and r['budget'] == budget]
+            if not losses:
+                return None
+            return FoldPruner(self.best_score - min(losses), z=self.fold_pruning)
+
+        store = None
+        stored_results = {}
+        if self.trial_store is not None:
+            store = TrialStore(self.trial_store, search_key(
+                'SMAC', self.estimator.to_json(), self.scoring, self.cv, self.best_score,
+                self.min_budget, self.eta, self.time_penalty, fingerprint(X_train), fingerprint(y_train)))
+            for _, config_id, stored in store.read():
+                stored_results[(config_id, stored['rung'])] = stored['result']
+        config_ids = []
+        time_penalty = 0.0 if self.time_penalty is None else self.time_penalty
+
+        def run(tid, rung):
+            X_part, y_part = subsample(self.estimator, X_train, y_train, budgets[rung], 2 * self.cv.get_n_splits())
+            try:
+                score, logloss, execution_time = smac_train_test(trainables[tid], X_train=X_part, y_train=y_part, prune=fold_pruner(budgets[rung]))
+            except TrialPruned as e:
+                return {'loss': self.best_score - e.score + time_penalty * e.time, 'time': e.time, 'status': 'pruned'}
+            except BaseException:
+                return {'loss': np.nan, 'time': np.nan, 'status': 'fail', 'error_msg': traceback.format_exc()}
+            return {'loss': self.best_score - score + time_penalty * execution_time, 'time': execution_time, 'status': 'ok'}
+
+        def evaluate(tid, rung):
+            result = stored_results.get((config_ids[tid], rung))
+            if result is None:
+                result = run(tid, rung)
+                if store is not None and result['status'] in ['ok', 'pruned']:
+                    # failures may be one-off, such as running out of memory, so they are re-run
+                    store.append(config_ids[tid], {'rung': rung, 'result': result})
+            record = {'tid': tid, 'rung': rung, 'budget': budgets[rung], **result}
+            self._trial_records.append(record)
+            if halving is not None:
+                halving.record(tid, rung, record['loss'] if record['status'] == 'ok' else None)
+            if record['status'] == 'fail':
+                raise ValueError(record['error_msg'])
+            return record['loss']
+
         def f(trainable):
-            return_dict = {}
+            tid = len(trainables)
+            trainables.append(trainable)
+            config_ids.append(search_key(trainable.to_json()))
             try:
-                score, logloss, execution_time = smac_train_test(trainable, X_train=X_train, y_train=y_train)
-                return_dict = {
-                    'loss': self.best_score - score,
-                    'time': execution_time,
-                    'log_loss': logloss
-                }
+                loss = evaluate(tid, 0)
             except BaseException as e:
                 logger.warning(f"Exception caught in SMACCV:{type(e)}, {traceback.format_exc()}, SMAC will set a cost_for_crash to MAXINT.")
                 raise e
-            return return_dict['loss']
+            if halving is not None:
+                promotion = halving.next_promotion()
+                while promotion is not None:
+                    try:
+                        evaluate(*promotion)
+                    except BaseException as e:
+                        logger.warning(f"Exception caught in SMACCV while promoting trial {promotion[0]}:{type(e)}")
+                    promotion = halving.next_promotion()
+            return loss
 
         try :
             smac = orig_SMAC(scenario=self.scenario, rng=np.random.RandomState(42),
                     tae_runner=lale_op_smac_tae(self.estimator, f))
             incumbent = smac.optimize()
             self.trials = smac.get_runhistory()
-            trainable = lale_trainable_op_from_config(self.estimator, incumbent)
+            if halving is not None and halving.best() is not None:
+                trainable = trainables[halving.best()]
+            else:
+                trainable = lale_trainable_op_from_config(self.estimator, incumbent)
             #get the trainable corresponding to the best params and train it on the entire training dataset.
             trained = trainable.fit(X_train, y_train)
             self._best_estimator = trained
@@ -175,6 +292,9 @@ class SMACImpl:
         except BaseException as e:
             logger.warning('Error during optimization: {}'.format(e))
             self._best_estimator = None
+        finally:
+            if store is not None:
+                store.close()
 
         return self
 
@@ -200,6 +320,51 @@ class SMACImpl:
         """
         return self.trials
 
+    def summary(self):
+        """Table summarizing the trial results (ID, loss, time, budget, pareto, status).
+
+        The budget is the fraction of the training rows that the reported
+        loss was cross-validated on; it is below 1 only for trials that were
+        not promoted to the full data by successive halving (see min_budget).
+        A trial shows its successful evaluation on the most rows, and each
+        failed or pruned promotion gets its own row, named like 'p3_r1'.
+        The status is 'pruned' for trials whose remaining folds were skipped
+        by fold_pruning; their loss and time are over the evaluated folds.
+        With time_penalty, the loss includes time_penalty times the time.
+        A trial is on the pareto front if no other trial with status 'ok' on
+        the full data is at least as good in both loss (without the time
+        penalty) and time, and better in one of them.
+
+        Returns
+        -------
+        result : DataFrame"""
+        def make_record(name, record):
+            return {
+                'name': name,
+                'tid': record['tid'],
+                'loss': record.get('loss', np.nan),
+                'time': record.get('time', np.nan),
+                'budget': record['budget'],
+                'pareto': False,
+                'status': record['status']}
+        shown = {}
+        promotions = []
+        for record in self._trial_records:
+            current = shown.get(record['tid'])
+            if current is None or _replaces(current, record):
+                shown[record['tid']] = record
+            else:
+                promotions.append(record)
+        records = [make_record(f'p{tid}', record) for tid, record in sorted(shown.items())]
+        records += [make_record(f'p{r["tid"]}_r{r["rung"]}', r) for r in promotions]
+        complete = [r for r in records if r['status'] == 'ok' and r['budget'] == 1.0]
+        time_penalty = 0.0 if self.time_penalty is None else self.time_penalty
+        on_front = pareto_front([r['loss'] - time_penalty * r['time'] for r in complete], [r['time'] for r in complete])
+        for record, pareto in zip(complete, on_front):
+            record['pareto'] = bool(pareto)
+        result = pd.DataFrame.from_records(records, columns=['name', 'tid', 'loss', 'time', 'budget', 'pareto', 'status'], index='name')
+        return result
+
     def get_pipeline(self, pipeline_name=None, astype='lale'):
         if pipeline_name is not None:
             raise NotImplementedError('Cannot get pipeline by name yet.')
@@ -270,6 +435,48 @@ _hyperparams_schema = {
                 {   'description': 'Number of grids to keep.',
                     'type': 'integer',
                     'minimum': 1}],
+                'default': None},
+            'n_jobs': schema_cv_n_jobs,
+            'backend': schema_cv_backend,
+            'min_budget': {
+                'description': 'Smallest fraction of the training rows to cross-validate a trial on, for successive halving.',
+                'anyOf': [
+                {   'description': 'Evaluate all trials on all the rows.',
+                    'enum': [None]},
+                {   'type': 'number',
+                    'minimum': 0.0,
+                    'exclusiveMinimum': True,
+                    'maximum': 1.0}],
+                'default': None},
+            'eta': {
+                'description': 'Ratio between consecutive budgets of successive halving, ignored if min_budget is None.',
+                'type': 'number',
+                'minimum': 1.0,
+                'exclusiveMinimum': True,
+                'default': 3},
+            'fold_pruning': {
+                'description': 'Early stopping of the cross-validation of trials that cannot beat the best trial so far.',
+                'anyOf': [
+                {   'description': 'Always evaluate all folds.',
+                    'enum': [None]},
+                {   'description': 'Width of the confidence bound in standard errors.',
+                    'type': 'number',
+                    'minimum': 0.0}],
+                'default': None},
+            'trial_store': {
+                'description': 'File name of a SQLite database to checkpoint the trials in.',
+                'anyOf': [
+                {   'description': 'Keep the trials in memory only.',
+                    'enum': [None]},
+                {   'type': 'string'}],
+                'default': None},
+            'time_penalty': {
+                'description': 'Loss added per second of mean fold time, to prefer cheaper pipelines.',
+                'anyOf': [
+                {   'description': 'The loss only depends on the score.',
+                    'enum': [None]},
+                {   'type': 'number',
+                    'minimum': 0.0}],
                 'default': None}
                 }}]}
 
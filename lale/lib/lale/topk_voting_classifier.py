@@ -15,8 +15,10 @@
 from hyperopt import STATUS_OK
 from lale.lib.sklearn import VotingClassifier
 from lale.lib.lale import Hyperopt
+from lale.search.ensemble_selection import ensemble_selection
 import lale.helpers
 import lale.operators
+from lale.lib.lale._common_schemas import schema_cv_backend, schema_cv_n_jobs
 import copy
 from typing import Any, Dict, Optional
 
@@ -24,7 +26,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 class TopKVotingClassifierImpl:
-    def __init__(self, estimator=None, optimizer=None, args_to_optimizer=None, k=10):
+    def __init__(self, estimator=None, optimizer=None, args_to_optimizer=None, k=10, n_jobs=None, backend=None, ensemble_size=None):
         self.estimator = estimator
         if self.estimator is None:
             raise ValueError("Estimator is a required argument.")
@@ -34,9 +36,16 @@ class TopKVotingClassifierImpl:
         self.args_to_optimizer = args_to_optimizer
         if self.args_to_optimizer is None:
             self.args_to_optimizer = {}
+        if n_jobs is not None:
+            self.args_to_optimizer = {'n_jobs': n_jobs, **self.args_to_optimizer}
+        if backend is not None:
+            self.args_to_optimizer = {'backend': backend, **self.args_to_optimizer}
         self.k = k
+        self.ensemble_size = ensemble_size
 
     def fit(self, X_train, y_train):
+        if self.ensemble_size is not None:
+            return self._fit_ensemble_selection(X_train, y_train)
         optimizer_instance = self.optimizer(estimator=self.estimator, **self.args_to_optimizer)
         trained_optimizer1 = optimizer_instance.fit(X_train, y_train)
         results = trained_optimizer1.summary()
@@ -61,6 +70,34 @@ class TopKVotingClassifierImpl:
         self._best_estimator = trained_optimizer2.get_pipeline()
         return self
 
+    def _fit_ensemble_selection(self, X_train, y_train):
+        defaults = getattr(self.optimizer, 'hyperparam_defaults', dict)()
+        if 'keep_oof_proba' not in defaults:
+            raise ValueError('ensemble_size needs an optimizer that keeps out-of-fold probabilities with keep_oof_proba, such as Hyperopt.')
+        args_to_optimizer = {**self.args_to_optimizer, 'keep_oof_proba': True}
+        optimizer_instance = self.optimizer(estimator=self.estimator, **args_to_optimizer)
+        trained_optimizer = optimizer_instance.fit(X_train, y_train)
+        results = trained_optimizer.summary()
+        results = results[results['status']==STATUS_OK]
+        results = results.sort_values(by=['loss'], axis=0)
+        probas = {}
+        for pipeline_name in results.index:
+            if len(probas) == self.k:
+                break
+            proba = trained_optimizer.get_oof_proba(pipeline_name)
+            if proba is not None:
+                probas[pipeline_name] = proba
+        if not probas:
+            raise ValueError('None of the trials kept out-of-fold probabilities for ensemble selection.')
+        scoring = self.args_to_optimizer.get('scoring', 'accuracy')
+        weights = ensemble_selection(probas, y_train, scoring, self.ensemble_size)
+        selected = sorted(weights, key=lambda name: results.index.get_loc(name))
+        pipeline_tuples = [(name, trained_optimizer.get_pipeline(name)) for name in selected]
+        voting = VotingClassifier(estimators=pipeline_tuples, voting='soft', weights=[weights[name] for name in selected])
+        self._best_estimator = voting.fit(X_train, y_train)
+        self._ensemble_weights = {name: weights[name] for name in selected}
+        return self
+
     def predict(self, X_eval):
         import warnings
         warnings.filterwarnings("ignore")
@@ -132,7 +169,35 @@ _hyperparams_schema = {
                             only successful trials.""",
                 'type': 'integer',
                 'minimum': 1,
-                'default': 10}}}]}
+                'default': 10},
+            'n_jobs': {
+                **schema_cv_n_jobs,
+                'description': """Number of cross-validation folds the optimizer evaluates in parallel
+                            for each trial, in both stages. An n_jobs entry in args_to_optimizer takes precedence."""},
+            'backend': {
+                'description': """Kind of worker pool for the folds when n_jobs is not 1, see the backend of Hyperopt.
+                            A backend entry in args_to_optimizer takes precedence.""",
+                'anyOf': [
+                {   'description': "The optimizer's default.",
+                    'enum': [None]},
+                {   'enum': schema_cv_backend['enum']}],
+                'default': None},
+            'ensemble_size': {
+                'description': """Build the ensemble by greedy ensemble selection (Caruana et al. 2004) instead of plain voting.
+
+The optimizer keeps the out-of-fold predict_proba of its trials (see
+keep_oof_proba of Hyperopt), and the top k are combined by adding,
+this many times with replacement, the one that most improves the score
+of the averaged probabilities. The result is a soft voting ensemble
+weighted by how often each pipeline was picked, fit once on all the
+data, with no second optimizer run.""",
+                'anyOf': [
+                {   'description': 'Equally weighted hard voting of the top k, tuned by a second optimizer run.',
+                    'enum': [None]},
+                {   'description': 'Number of selection steps.',
+                    'type': 'integer',
+                    'minimum': 1}],
+                'default': None}}}]}
 
 _input_fit_schema = {
     'type': 'object',
@@ -42,6 +42,9 @@ class NMFImpl():
     def transform(self, X):
         return self._sklearn_model.transform(X)
 
+    def fit_transform(self, X, y=None):
+        return self._sklearn_model.fit_transform(X, y)
+
 _hyperparams_schema = {
     '$schema': 'http://json-schema.org/draft-04/schema#',
     'description': 'Non-Negative Matrix Factorization (NMF)',
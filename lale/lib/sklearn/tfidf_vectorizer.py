@@ -36,6 +36,11 @@ class TfidfVectorizerImpl():
             X = X.squeeze()
         return self._sklearn_model.transform(X)
 
+    def fit_transform(self, X, y=None):
+        if isinstance(X, np.ndarray) or isinstance(X, pd.DataFrame):
+            X = X.squeeze()
+        return self._sklearn_model.fit_transform(X, y)
+
 _hyperparams_schema = {
     '$schema': 'http://json-schema.org/draft-04/schema#',
     'description': 'Convert a collection of raw documents to a matrix of TF-IDF features.',
@@ -37,6 +37,9 @@ import logging
 import h5py
 import shutil
 import lale.json_operator
+import lale.util.dag_executor
+import lale.util.fit_cache
+import lale.util.trusted_mode
 from lale.json_operator import JSON_TYPE
 from sklearn.pipeline import if_delegate_has_method
 import sklearn.base
@@ -417,6 +420,30 @@ class TrainedOperator(TrainableOperator):
         """
         pass
 
+    def enable_trusted_mode(self, X, method:str='predict')->'lale.util.trusted_mode.ValidationSavings':
+        """Validate the schemas once on representative data, and skip
+        those checks on later calls to transform, predict, predict_proba,
+        and decision_function.
+
+        Parameters
+        ----------
+        X :
+            Representative features, for example a few rows of the data
+            the operator will be deployed on.
+        method : string, optional
+            Method to call on X for the validation, by default 'predict'.
+
+        Returns
+        -------
+        ValidationSavings
+            Counters of the skipped checks and their estimated time.
+        """
+        return lale.util.trusted_mode.enable(self, X, method)
+
+    def disable_trusted_mode(self)->None:
+        """Validate the schemas on every call again."""
+        lale.util.trusted_mode.disable(self)
+
 _schema_derived_attributes = ['_enum_attributes', '_hyperparam_defaults']
 
 
@@ -456,6 +483,7 @@ class IndividualOp(Operator):
 
     _name:str
     _impl:Any
+    _trusted:Optional['lale.util.trusted_mode.ValidationSavings'] = None
 
     def __init__(self, name:str, impl, schemas) -> None:
         """Create a new IndividualOp.
@@ -878,6 +906,12 @@ class IndividualOp(Operator):
                 self._validate_input_schema('y', y, method)
 
     def _validate_input_schema(self, arg_name, arg, method):
+        if self._trusted is not None:
+            return self._trusted.check(self, method, arg_name,
+                lambda: self._check_input_schema(arg_name, arg, method), arg)
+        return self._check_input_schema(arg_name, arg, method)
+
+    def _check_input_schema(self, arg_name, arg, method):
         if not lale.helpers.is_empty_dict(arg):
             if method == 'fit' or method == 'partial_fit':
                 schema = self.input_schema_fit()
@@ -899,6 +933,12 @@ class IndividualOp(Operator):
         return arg
 
     def _validate_output_schema(self, result, method):
+        if self._trusted is not None:
+            return self._trusted.check(self, method, 'result',
+                lambda: self._check_output_schema(result, method), result)
+        return self._check_output_schema(result, method)
+
+    def _check_output_schema(self, result, method):
         if method == 'transform':
             schema = self.output_schema_transform()
         elif method == 'predict':
@@ -1063,20 +1103,99 @@ class TrainableIndividualOp(PlannedIndividualOp, TrainableOperator):
             result = impl_class(**params_all)
         return result
 
-    def fit(self, X, y = None, **fit_params)->'TrainedIndividualOp':
-        X = self._validate_input_schema('X', X, 'fit')
-        y = self._validate_input_schema('y', y, 'fit')
-        filtered_fit_params = fixup_hyperparams_dict(fit_params)
+    def _train_impl(self, X, y, filtered_fit_params):
         trainable_impl = self._clone_impl()
         if filtered_fit_params is None:
             trained_impl = trainable_impl.fit(X, y)
         else:
             trained_impl = trainable_impl.fit(X, y, **filtered_fit_params)
+        return trained_impl
+
+    def _to_trained(self, trained_impl)->'TrainedIndividualOp':
         result = TrainedIndividualOp(self.name(), trained_impl, self._schemas)
         result._hyperparams = self._hyperparams
         self._trained = result
         return result
 
+    def _fit_cache_lookup(self, X, y, filtered_fit_params):
+        """Returns a triple (cache, key, cached entry), where the latter two are None if there is no enclosing lale.util.fit_cache.fit_cache block or the operator is not cacheable."""
+        cache = lale.util.fit_cache.get_fit_cache()
+        if cache is None:
+            return None, None, None
+        key = cache.key(self, X, y, filtered_fit_params)
+        if key is None:
+            return cache, None, None
+        return cache, key, cache.get(key)
+
+    def fit(self, X, y = None, **fit_params)->'TrainedIndividualOp':
+        X = self._validate_input_schema('X', X, 'fit')
+        y = self._validate_input_schema('y', y, 'fit')
+        filtered_fit_params = fixup_hyperparams_dict(fit_params)
+        cache, cache_key, cached = self._fit_cache_lookup(X, y, filtered_fit_params)
+        if cached is not None:
+            trained_impl = cached[0]
+        else:
+            trained_impl = self._train_impl(X, y, filtered_fit_params)
+            if cache_key is not None:
+                cache.put(cache_key, trained_impl)
+        return self._to_trained(trained_impl)
+
+    def _fit_transform(self, X, y = None, **fit_params)->Tuple['TrainedIndividualOp', Any]:
+        supervised = self.is_supervised()
+        X = self._validate_input_schema('X', X, 'fit')
+        if supervised:
+            y = self._validate_input_schema('y', y, 'fit')
+        filtered_fit_params = fixup_hyperparams_dict(fit_params)
+        if lale.util.fit_cache.get_fit_cache() is None:
+            cache, cache_key, cached = None, None, None
+        else:
+            transform_requires_y = 'y' in [p.lower() for p in self.input_schema_transform().get('required', [])]
+            key_y = y if supervised or transform_requires_y else None
+            cache, cache_key, cached = self._fit_cache_lookup(X, key_y, filtered_fit_params)
+        if cached is not None and cached[1] is not None:
+            return self._to_trained(cached[0]), cached[1]
+        if cached is not None:
+            trained = self._to_trained(cached[0])
+            result = trained.transform(X, y)
+        elif hasattr(self._impl, 'fit_transform'):
+            X = self._validate_input_schema('X', X, 'transform')
+            trainable_impl = self._clone_impl()
+            if supervised:
+                raw_result = trainable_impl.fit_transform(X, y, **filtered_fit_params)
+            else:
+                raw_result = trainable_impl.fit_transform(X, **filtered_fit_params)
+            trained = self._to_trained(trainable_impl)
+            result = trained._validate_output_schema(raw_result, 'transform')
+        else:
+            trained_impl = self._train_impl(X, y if supervised else None, filtered_fit_params)
+            trained = self._to_trained(trained_impl)
+            result = trained.transform(X, y)
+        if cache_key is not None:
+            cache.put(cache_key, trained._impl, result)
+        return trained, result
+
+    def fit_transform(self, X, y = None, **fit_params):
+        """Fit to the data, then transform it.
+
+        Uses the native fit_transform of the impl when it has one, which
+        avoids computing the transformation of the training data twice,
+        and falls back to fit followed by transform otherwise.
+
+        Parameters
+        ----------
+        X :
+            Features; see input_fit schema of the operator.
+        y :
+            Labels, if required by the operator; see input_fit schema of the operator.
+
+        Returns
+        -------
+        result :
+            Transformed features; see output_transform schema of the operator.
+        """
+        _, result = self._fit_transform(X, y, **fit_params)
+        return result
+
     def partial_fit(self, X, y = None, **fit_params)->TrainedOperator:
         if not hasattr(self._impl, "partial_fit"):
             raise AttributeError(f'{self.name()} has no partial_fit implemented.')
@@ -1291,6 +1410,12 @@ class TrainedIndividualOp(TrainableIndividualOp, TrainedOperator):
         else:
             return self 
 
+    def _fit_transform(self, X, y = None, **fit_params)->Tuple['TrainedIndividualOp', Any]:
+        if hasattr(self._impl, "fit") and not self.is_frozen_trained():
+            return super(TrainedIndividualOp, self)._fit_transform(X, y, **fit_params)
+        else:
+            return self, self.transform(X, y)
+
     @if_delegate_has_method(delegate='_impl')
     def transform(self, X, y = None):
         """Transform the data.
@@ -1405,6 +1530,10 @@ class TrainedIndividualOp(TrainableIndividualOp, TrainedOperator):
     def summary(self)->pd.DataFrame:
         return self._impl_instance().summary()
 
+    @if_delegate_has_method(delegate='_impl')
+    def get_oof_proba(self, pipeline_name:str)->Optional[np.ndarray]:
+        return self._impl_instance().get_oof_proba(pipeline_name)
+
     def _lale_clone(self, cloner:Callable[[Any],Any]):
         """ This is really used for sklearn clone compatibility.
             Which mandates that clone returns something that has not been fit.
@@ -1630,6 +1759,16 @@ class BasePipeline(Operator, Generic[OpType]):
                 return False
         return True
 
+    def peak_memory(self)->Optional[int]:
+        """Peak number of bytes held by intermediate step outputs at the same
+        time during the most recent fit or inference call on this pipeline,
+        or None if there was no such call yet."""
+        return getattr(self, '_peak_memory', None)
+
+    def _record_peak_memory(self, peak_bytes:int)->None:
+        self._peak_memory = peak_bytes
+        logger.debug(f'{self.name()}: peak memory of intermediate outputs {peak_bytes} bytes')
+
     def find_sink_nodes(self) -> List[OpType]:
         is_sink = {s: True for s in self.steps()}
         for src, _ in self.edges():
@@ -1837,6 +1976,41 @@ class PlannedPipeline(BasePipeline[PlannedOpType], PlannedOperator):
 
 TrainableOpType = TypeVar('TrainableOpType', bound=TrainableIndividualOp)
 
+def _merge_meta_outputs(preds, meta_outputs):
+    return {key: meta_outputs[pred][key] for pred in preds
+            if meta_outputs[pred] is not None for key in meta_outputs[pred]}
+
+def _fit_step(trainable, inputs, y, meta_data_inputs, is_sink):
+    """Train one step of a pipeline, and unless it is a sink, also compute its output on the training data."""
+    if hasattr(trainable._impl, "set_meta_data"):
+        trainable._impl_instance().set_meta_data(meta_data_inputs)
+    if isinstance(inputs, tuple):#This is the case for transformers which return X and y, such as resamplers.
+        inputs, y = inputs
+    output = None
+    meta_output:Dict[Operator, Any] = {}
+    if not is_sink and trainable.is_transformer():
+        trained, output = trainable._fit_transform(X = inputs, y = y)
+    elif trainable.is_supervised():
+        trained = trainable.fit(X = inputs, y = y)
+    else:
+        trained = trainable.fit(X = inputs)
+    if not is_sink:#There is no need to transform/predict on the last node during fit
+        if trained.is_transformer():
+            if hasattr(trainable._impl, "get_transform_meta_output"):
+                meta_output = trainable._impl_instance().get_transform_meta_output()
+        else:
+            # This is ok because trainable pipelines steps
+            # must only be individual operators
+            if hasattr(trained._impl, 'predict_proba'): # type: ignore
+                output = trained.predict_proba(X = inputs)
+            elif hasattr(trained._impl, 'decision_function'): # type: ignore
+                output = trained.decision_function(X = inputs)
+            else:
+                output = trained._predict(X = inputs)
+            if hasattr(trainable._impl, "get_predict_meta_output"):
+                meta_output = trainable._impl_instance().get_predict_meta_output()
+    return trained, output, y, meta_output
+
 class TrainablePipeline(PlannedPipeline[TrainableOpType], TrainableOperator):
 
     def __init__(self, 
@@ -1849,64 +2023,46 @@ class TrainablePipeline(PlannedPipeline[TrainableOpType], TrainableOperator):
         X = lale.datasets.data_schemas.add_schema(X)
         y = lale.datasets.data_schemas.add_schema(y)
         self.validate_schema(X, y)
-        trained_steps:List[TrainedOperator] = [ ]
-        outputs:Dict[Operator, Any] = { }
+        outputs = lale.util.dag_executor.OutputStore(self._steps, self._preds)
         meta_outputs:Dict[Operator, Any] = {}
+        labels:Dict[Operator, Any] = {}
         edges:List[Tuple[TrainableOpType, TrainableOpType]] = self.edges()
         trained_map:Dict[TrainableOpType, TrainedOperator] = {}
 
         sink_nodes = self.find_sink_nodes()
-        for operator in self._steps:
+        def make_task(operator):
             preds = self._preds[operator]
             if len(preds) == 0:
                 inputs = [X]
+                inputs_y = y
                 meta_data_inputs:Dict[Operator, Any] = {}
             else:
                 inputs = [outputs[pred] for pred in preds]
+                #labels only change downstream of resamplers, which return both X and y
+                inputs_y = next((labels[pred] for pred in preds if labels[pred] is not y), y)
                 #we create meta_data_inputs as a dictionary with metadata from all previous steps
                 #Note that if multiple previous steps generate the same key, it will retain only one of those.
-                
-                meta_data_inputs = {key: meta_outputs[pred][key] for pred in preds 
-                        if meta_outputs[pred] is not None for key in meta_outputs[pred]}
-            trainable = operator
+                meta_data_inputs = _merge_meta_outputs(preds, meta_outputs)
             if len(inputs) == 1:
                 inputs = inputs[0]
-            if hasattr(operator._impl, "set_meta_data"):
-                operator._impl_instance().set_meta_data(meta_data_inputs)
-            meta_output:Dict[Operator, Any] = {}
-            trained:TrainedOperator
-            if isinstance(inputs, tuple):#This is the case for transformers which return X and y, such as resamplers.
-                inputs, y = inputs            
-            if trainable.is_supervised():
-                trained = trainable.fit(X = inputs, y = y)
-            else:
-                trained = trainable.fit(X = inputs)
+            is_sink = operator in sink_nodes
+            return _fit_step, (operator, inputs, inputs_y, meta_data_inputs, is_sink)
+
+        def on_done(operator, step_result):
+            trained, output, step_y, meta_output = step_result
+            operator._trained = trained
             trained_map[operator] = trained
-            trained_steps.append(trained)
-            if trainable not in sink_nodes:#There is no need to transform/predict on the last node during fit
-                if trained.is_transformer():
-                    output = trained.transform(X = inputs, y = y)
-                    if hasattr(operator._impl, "get_transform_meta_output"):
-                        meta_output = operator._impl_instance().get_transform_meta_output()
-                else:
-                    if trainable in sink_nodes:
-                        output = trained._predict(X = inputs) #We don't support y for predict yet as there is no compelling case
-                    else:
-                        # This is ok because trainable pipelines steps
-                        # must only be individual operators
-                        if hasattr(trained._impl, 'predict_proba'): # type: ignore
-                            output = trained.predict_proba(X = inputs)
-                        elif hasattr(trained._impl, 'decision_function'): # type: ignore
-                            output = trained.decision_function(X = inputs)
-                        else:
-                            output = trained._predict(X = inputs)
-                    if hasattr(operator._impl, "get_predict_meta_output"):
-                        meta_output = operator._impl_instance().get_predict_meta_output()
-                outputs[operator] = output
-                meta_output.update({key:meta_outputs[pred][key] for pred in preds 
-                        if meta_outputs[pred] is not None for key in meta_outputs[pred]})
+            if operator not in sink_nodes:
+                outputs.put(operator, output)
+                labels[operator] = step_y
+                meta_output.update(_merge_meta_outputs(self._preds[operator], meta_outputs))
                 meta_outputs[operator] = meta_output
+            outputs.consume(operator)
 
+        executor = lale.util.dag_executor.get_executor()
+        executor.execute(self._steps, self._preds, make_task, on_done)
+        self._record_peak_memory(outputs.peak_bytes)
+        trained_steps:List[TrainedOperator] = [trained_map[op] for op in self._steps]
         trained_edges = [(trained_map[x], trained_map[y]) for (x, y) in edges]
 
         trained_steps2:Any = trained_steps
@@ -2168,6 +2324,141 @@ class TrainablePipeline(PlannedPipeline[TrainableOpType], TrainableOperator):
         self._trained = result
         return result
 
+def _bind_inference_step(operator, sink_method):
+    """Resolve which method of operator a pipeline inference calls.
+
+    The sink_method is the method requested on the pipeline if the
+    operator is a sink node, and None otherwise. Returns a pair
+    (fun, get_meta_output), where fun takes the inputs and labels of
+    the step, and get_meta_output is None if the step produces no
+    meta output."""
+    impl = operator._impl
+    if sink_method == 'predict' and hasattr(impl, 'predict'):#Since this is pipeline's predict, we should invoke predict from sink nodes
+        return (lambda X, y: operator._predict(X = X)), None
+    if operator.is_transformer():
+        get_meta_output = None
+        if hasattr(impl, "get_transform_meta_output"):
+            get_meta_output = operator._impl_instance().get_transform_meta_output
+        return operator.transform, get_meta_output
+    if sink_method in ['predict_proba', 'decision_function']:
+        if not hasattr(impl, sink_method):
+            raise ValueError("The sink node of the pipeline {} does not support a {} method.".format(operator.name(), sink_method))
+        method = getattr(operator, sink_method)
+        return (lambda X, y: method(X = X)), None
+    if hasattr(impl, 'predict_proba'):#For estimator as a transformer, use predict_proba if available
+        return (lambda X, y: operator.predict_proba(X = X)), None
+    if hasattr(impl, 'decision_function'):#For estimator as a transformer, use decision_function if available
+        return (lambda X, y: operator.decision_function(X = X)), None
+    get_meta_output = None
+    if hasattr(impl, "get_predict_meta_output"):
+        get_meta_output = operator._impl_instance().get_predict_meta_output
+    return (lambda X, y: operator._predict(X = X)), get_meta_output
+
+def _inference_step(operator, inputs, y, meta_data_inputs, sink_method):
+    """Run one step of a trained pipeline.
+
+    The sink_method is the method requested on the pipeline if the
+    operator is a sink node, and None otherwise. Returns a pair
+    (output, meta_output)."""
+    if hasattr(operator._impl, "set_meta_data"):
+        operator._impl_instance().set_meta_data(meta_data_inputs)
+    fun, get_meta_output = _bind_inference_step(operator, sink_method)
+    output = fun(inputs, y)
+    meta_output:Dict[Operator, Any] = {}
+    if get_meta_output is not None:
+        meta_output = get_meta_output()
+    return output, meta_output
+
+class _InferencePlan():
+    """Steps of a trained pipeline resolved once for one inference method.
+
+    Each entry is a tuple (fun, pred_indices, set_meta_data,
+    get_meta_output, release) where release lists the indices of the
+    outputs that are no longer needed once the step ran."""
+    def __init__(self, pipeline, method:str):
+        self.steps = pipeline._steps
+        self.preds = pipeline._preds
+        self.structure = _InferencePlan._structure_of(pipeline)
+        index = {step: i for i, step in enumerate(self.steps)}
+        sink_nodes = pipeline.find_sink_nodes()
+        last_consumer:Dict[int, int] = {}
+        for i, step in enumerate(self.steps):
+            for pred in self.preds[step]:
+                last_consumer[index[pred]] = i
+        self.entries:List[Tuple[Any, Tuple[int, ...], Any, Any, Tuple[int, ...]]] = []
+        for i, step in enumerate(self.steps):
+            fun, get_meta_output = _bind_inference_step(
+                step, method if step in sink_nodes else None)
+            set_meta_data = None
+            if hasattr(step._impl, "set_meta_data"):
+                set_meta_data = step._impl_instance().set_meta_data
+            pred_indices = tuple(index[pred] for pred in self.preds[step])
+            release = tuple(j for j, last in last_consumer.items() if last == i)
+            self.entries.append((fun, pred_indices, set_meta_data, get_meta_output, release))
+        self.uses_meta = any(e[2] is not None or e[3] is not None for e in self.entries)
+
+    @staticmethod
+    def _structure_of(pipeline)->Tuple[Tuple[int, ...], ...]:
+        # by identity, since the plan binds methods of these very steps;
+        # they stay alive with the plan, so their ids are not reused
+        steps, preds = pipeline._steps, pipeline._preds
+        return (tuple(id(step) for step in steps),
+                *(tuple(id(pred) for pred in preds.get(step, [])) for step in steps))
+
+    def is_valid_for(self, pipeline)->bool:
+        """Whether the pipeline still has the steps and edges this plan was built for, even after in-place changes."""
+        return self.structure == _InferencePlan._structure_of(pipeline)
+
+    def run(self, X, y):
+        """Returns a pair (output of the last step, peak bytes of intermediate outputs)."""
+        outputs, peak_bytes = self._run_entries(X, y, len(self.entries))
+        return outputs[-1], peak_bytes
+
+    def sink_inputs(self, X, y):
+        """Runs all steps but the last one, and returns the inputs of the last step."""
+        outputs, _ = self._run_entries(X, y, len(self.entries) - 1)
+        return self._gather_inputs(X, outputs, self.entries[-1][1])
+
+    def _gather_inputs(self, X, outputs:List[Any], pred_indices:Tuple[int, ...]):
+        if len(pred_indices) == 0:
+            return X
+        elif len(pred_indices) == 1:
+            inputs = outputs[pred_indices[0]]
+            if isinstance(inputs, tuple):
+                inputs = inputs[0]
+            return inputs
+        return [outputs[j][0] if isinstance(outputs[j], tuple) else outputs[j] for j in pred_indices]
+
+    def _run_entries(self, X, y, n_entries:int)->Tuple[List[Any], int]:
+        nbytes = lale.util.dag_executor.nbytes
+        n = len(self.entries)
+        outputs:List[Any] = [None] * n
+        sizes = [0] * n
+        metas:Optional[List[Dict[Any, Any]]] = [{}] * n if self.uses_meta else None
+        current_bytes = peak_bytes = 0
+        for i, (fun, pred_indices, set_meta_data, get_meta_output, release) in enumerate(self.entries[:n_entries]):
+            inputs = self._gather_inputs(X, outputs, pred_indices)
+            if metas is not None:
+                meta_data_inputs:Dict[Any, Any] = {}
+                for j in pred_indices:
+                    meta_data_inputs.update(metas[j])
+                if set_meta_data is not None:
+                    set_meta_data(meta_data_inputs)
+            output = fun(inputs, y)
+            if metas is not None:
+                meta_output = get_meta_output() if get_meta_output is not None else {}
+                meta_output = {} if meta_output is None else dict(meta_output)
+                meta_output.update(meta_data_inputs)
+                metas[i] = meta_output
+            outputs[i] = output
+            sizes[i] = nbytes(output)
+            current_bytes += sizes[i]
+            peak_bytes = max(peak_bytes, current_bytes)
+            for j in release:
+                outputs[j] = None
+                current_bytes -= sizes[j]
+        return outputs, peak_bytes
+
 TrainedOpType = TypeVar('TrainedOpType', bound=TrainedIndividualOp)
 
 class TrainedPipeline(TrainablePipeline[TrainedOpType], TrainedOperator):
@@ -2179,47 +2470,86 @@ class TrainedPipeline(TrainablePipeline[TrainedOpType], TrainedOperator):
         super(TrainedPipeline, self).__init__(steps, edges, ordered=ordered)
 
 
-    def _predict(self, X, y = None):
-        outputs = { }
-        meta_outputs = {}
+    def compile(self)->'TrainedPipeline':
+        """Resolve once, for each inference method, which method of each
+        step to call and where its inputs come from.
+
+        Inference on small batches is then a loop over a flat list of
+        bound methods, instead of re-inspecting every step and the
+        edges of the pipeline on every call. Plans are also built
+        lazily on first use, and rebuilt when the steps or edges of
+        the pipeline change, so calling this is only needed to move
+        that cost out of the first request.
+
+        Returns
+        -------
+        TrainedPipeline
+            self
+        """
         sink_nodes = self.find_sink_nodes()
-        for operator in self._steps:
+        for method in ['predict', 'predict_proba', 'decision_function']:
+            if method == 'predict' or all(hasattr(s._impl, method) for s in sink_nodes):
+                self._inference_plan(method)
+        return self
+
+    def _inference_plan(self, method:str)->_InferencePlan:
+        plans = self.__dict__.setdefault('_inference_plans', {})
+        plan = plans.get(method, None)
+        if plan is None or not plan.is_valid_for(self):
+            plan = _InferencePlan(self, method)
+            plans[method] = plan
+        return plan
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Plans hold bound methods of the steps, rebuild them after copying
+        state.pop('_inference_plans', None)
+        return state
+
+    def _run_inference(self, X, y, method:str):
+        """Run all steps on X, calling the given method on the sink node.
+
+        By default, this runs the compiled plan for the method (see
+        ``compile``). Inside a ``lale.util.dag_executor.parallel_backend``
+        block, steps run through its executor instead, so sibling
+        branches can be evaluated concurrently. Either way, intermediate
+        outputs are dropped as soon as all their successors ran."""
+        executor = lale.util.dag_executor.get_executor()
+        if executor.is_sequential():
+            result, peak_bytes = self._inference_plan(method).run(X, y)
+            self._record_peak_memory(peak_bytes)
+            return result
+        outputs = lale.util.dag_executor.OutputStore(self._steps, self._preds)
+        meta_outputs:Dict[Operator, Any] = {}
+        sink_nodes = self.find_sink_nodes()
+        def make_task(operator):
             preds = self._preds[operator]
             if len(preds) == 0:
                 inputs = [X]
-                meta_data_inputs = {}
+                meta_data_inputs:Dict[Operator, Any] = {}
             else:
                 inputs = [outputs[pred][0] if isinstance(outputs[pred], tuple) else outputs[pred] for pred in preds]
                 #we create meta_data_inputs as a dictionary with metadata from all previous steps
                 #Note that if multiple previous steps generate the same key, it will retain only one of those.
-                
-                meta_data_inputs = {key: meta_outputs[pred][key] for pred in preds 
-                        if meta_outputs[pred] is not None for key in meta_outputs[pred]}
+                meta_data_inputs = _merge_meta_outputs(preds, meta_outputs)
             if len(inputs) == 1:
                 inputs = inputs[0]
-            if hasattr(operator._impl, "set_meta_data"):
-                operator._impl_instance().set_meta_data(meta_data_inputs)
-            meta_output = {}
-            if operator in sink_nodes and hasattr(operator._impl, 'predict'):#Since this is pipeline's predict, we should invoke predict from sink nodes
-                output = operator._predict(X = inputs)
-            elif operator.is_transformer():
-                output = operator.transform(X = inputs, y = y)
-                if hasattr(operator._impl, "get_transform_meta_output"):
-                    meta_output = operator._impl_instance().get_transform_meta_output()
-            elif hasattr(operator._impl, 'predict_proba'):#For estimator as a transformer, use predict_proba if available
-                output = operator.predict_proba(X = inputs)
-            elif hasattr(operator._impl, 'decision_function'):#For estimator as a transformer, use decision_function if available
-                output = operator.decision_function(X = inputs)
-            else:
-                output = operator._predict(X = inputs)
-                if hasattr(operator._impl, "get_predict_meta_output"):
-                    meta_output = operator._impl_instance().get_predict_meta_output()
-            outputs[operator] = output
-            meta_output.update({key:meta_outputs[pred][key] for pred in preds 
-                    if meta_outputs[pred] is not None for key in meta_outputs[pred]})
+            sink_method = method if operator in sink_nodes else None
+            return _inference_step, (operator, inputs, y, meta_data_inputs, sink_method)
+
+        def on_done(operator, step_result):
+            output, meta_output = step_result
+            outputs.put(operator, output)
+            meta_output.update(_merge_meta_outputs(self._preds[operator], meta_outputs))
             meta_outputs[operator] = meta_output
-        result = outputs[self._steps[-1]]
-        return result
+            outputs.consume(operator)
+
+        executor.execute(self._steps, self._preds, make_task, on_done)
+        self._record_peak_memory(outputs.peak_bytes)
+        return outputs[self._steps[-1]]
+
+    def _predict(self, X, y = None):
+        return self._run_inference(X, y, 'predict')
 
     def predict(self, X):
         result = self._predict(X)
@@ -2247,33 +2577,7 @@ class TrainedPipeline(TrainablePipeline[TrainedOpType], TrainedOperator):
         result :
             Probabilities; see output_predict_proba schema of the operator.
         """
-        outputs = { }
-        sink_nodes = self.find_sink_nodes()
-        for operator in self._steps:
-            preds = self._preds[operator]
-            if len(preds) == 0:
-                inputs = [X]
-            else:
-                inputs = [outputs[pred][0] if isinstance(outputs[pred], tuple) else outputs[pred] for pred in preds]
-            if len(inputs) == 1:
-                inputs = inputs[0]
-            if operator.is_transformer():
-                output = operator.transform(X = inputs)
-            else:
-                if operator in sink_nodes:
-                    if hasattr(operator._impl, 'predict_proba'):
-                        output = operator.predict_proba(X = inputs)
-                    else:
-                        raise ValueError("The sink node of the pipeline {} does not support a predict_proba method.".format(operator.name()))
-                else:#this behavior may be different later if we add user input.
-                    if hasattr(operator._impl, 'predict_proba'):
-                        output = operator.predict_proba(X = inputs)
-                    elif hasattr(operator._impl, 'decision_function'):
-                        output = operator.decision_function(X = inputs)
-                    else:
-                        output = operator._predict(X = inputs)
-            outputs[operator] = output
-        return outputs[self._steps[-1]]
+        return self._run_inference(X, None, 'predict_proba')
 
     def decision_function(self, X):
         """Confidence scores for all classes.
@@ -2288,33 +2592,7 @@ class TrainedPipeline(TrainablePipeline[TrainedOpType], TrainedOperator):
         result :
             Confidences; see output_decision_function schema of the operator.
         """
-        outputs = { }
-        sink_nodes = self.find_sink_nodes()
-        for operator in self._steps:
-            preds = self._preds[operator]
-            if len(preds) == 0:
-                inputs = [X]
-            else:
-                inputs = [outputs[pred][0] if isinstance(outputs[pred], tuple) else outputs[pred] for pred in preds]
-            if len(inputs) == 1:
-                inputs = inputs[0]
-            if operator.is_transformer():
-                output = operator.transform(X = inputs)
-            else:
-                if operator in sink_nodes:
-                    if hasattr(operator._impl, 'decision_function'):
-                        output = operator.decision_function(X = inputs)
-                    else:
-                        raise ValueError("The sink node of the pipeline {} does not support a decision_function method.".format(operator.name()))
-                else:#this behavior may be different later if we add user input.
-                    if hasattr(operator._impl, 'predict_proba'):
-                        output = operator.predict_proba(X = inputs)
-                    elif hasattr(operator._impl, 'decision_function'):
-                        output = operator.decision_function(X = inputs)
-                    else:
-                        output = operator._predict(X = inputs)
-            outputs[operator] = output
-        return outputs[self._steps[-1]]
+        return self._run_inference(X, None, 'decision_function')
 
     def transform_with_batches(self, X, y=None, serialize = True):
         """[summary]
@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import logging
 import itertools
+import threading
 import jsonschema
+import lale.helpers
 
 from .schema_ranges import SchemaRange
 
@@ -23,6 +26,89 @@ from .schema_utils import Schema, getMinimum, getMaximum, isForOptimizer, makeAl
 
 logger = logging.getLogger(__name__)
 
+# The simplify* functions recurse into the same sub-schemas many times,
+# for example when floatAny distributes an allOf over the cross product
+# of several anyOfs. While a top-level call runs, equal (sub-)schemas are
+# hash-consed: each distinct one is interned under a small integer,
+# computed from the integers of its children, and the results of the
+# simplify* functions and of enumeration checks are memoized by it.
+class _SimplifierMemo():
+    def __init__(self):
+        self._num_by_id:Dict[int, int] = {}
+        self._num_by_key:Dict[Any, int] = {}
+        self.interned:List[Any] = [] # canonical node for each number
+        self._alive:List[Any] = [] # numbered objects, so that their ids stay unique
+        self.results:Dict[Tuple[str, int, bool], Any] = {}
+        self.validators:Dict[int, Any] = {}
+        self.valid:Dict[Tuple[int, type, str], bool] = {}
+
+    def number(self, value)->int:
+        """Integer that is equal for equal JSON values, including the order of dictionary keys."""
+        num = self._num_by_id.get(id(value))
+        if num is not None:
+            return num
+        if isinstance(value, dict):
+            key:Any = (dict, tuple((k, self.number(v)) for k, v in value.items()))
+        elif isinstance(value, (list, tuple)):
+            key = (type(value), tuple(self.number(v) for v in value))
+        elif isinstance(value, float):
+            key = (float, repr(value))
+        elif value is None or isinstance(value, (str, int)):
+            key = (type(value), value)
+        else:
+            key = (object, id(value)) # for example an operator, equal only to itself
+        num = self._num_by_key.get(key)
+        if num is None:
+            num = len(self.interned)
+            self._num_by_key[key] = num
+            self.interned.append(value)
+        if not isinstance(value, list): # lists may still be appended to by callers
+            self._num_by_id[id(value)] = num
+            self._alive.append(value)
+        return num
+
+_memo_state = threading.local()
+
+def _current_memo()->Optional[_SimplifierMemo]:
+    return getattr(_memo_state, 'memo', None)
+
+# Set to False to simplify without the memo, for example to compare results.
+memoize = True
+
+def _copy_json(value):
+    """Copy of the dicts and lists in value, sharing everything else."""
+    if isinstance(value, dict):
+        return {k: _copy_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(v) for v in value]
+    return value
+
+def _memoized(function):
+    """Memoize a simplify* function of (schema or list of schemas, floatAny) during the outermost call.
+
+    Within the call, equal sub-schemas share one memoized result. The
+    outermost call returns a copy of its dicts and lists, so callers may
+    modify the output in place without changing the branches that an
+    equal sub-schema produced elsewhere."""
+    @functools.wraps(function)
+    def wrapper(schema, floatAny:bool):
+        if not memoize:
+            return function(schema, floatAny)
+        memo = _current_memo()
+        outermost = memo is None
+        if outermost:
+            memo = _SimplifierMemo()
+            _memo_state.memo = memo
+        try:
+            key = (function.__name__, memo.number(schema), bool(floatAny))
+            if key not in memo.results:
+                memo.results[key] = function(schema, floatAny)
+            return _copy_json(memo.results[key]) if outermost else memo.results[key]
+        finally:
+            if outermost:
+                _memo_state.memo = None
+    return wrapper
+
 # Goal: given a json schema, convert it into an equivalent json-schema
 # in "grouped-dnf" form:
 # allOf: [anyOf: nochoice], where
@@ -120,13 +206,31 @@ def enumValues(es:set_with_str_for_keys[Any], s:Schema)->set_with_str_for_keys[A
     """Given an enumeration set and a schema, return all the consistent values of the enumeration."""
     # TODO: actually check.  This should call the json schema validator
     ret = list()
+    memo = _current_memo()
+    s_num = memo.number(s) if memo is not None else None
     try:
-        for e in es:
+        for k, e in es._elems.items():
+            if memo is not None and (s_num, type(e), k) in memo.valid:
+                if memo.valid[(s_num, type(e), k)]:
+                    ret.append(e)
+                continue
             try:
-                jsonschema.validate(e, s, jsonschema.Draft4Validator)
-                ret.append(e)
+                if memo is None:
+                    validator = lale.helpers.get_validator(s)
+                else:
+                    if s_num not in memo.validators:
+                        memo.validators[s_num] = lale.helpers.get_validator(s)
+                    validator = memo.validators[s_num]
+                validator.validate(e)
+                valid = True
             except:
-                logger.debug(f"enumValues: {e} removed from {es} because it does not validate according to {s}")
+                valid = False
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"enumValues: {e} removed from {es} because it does not validate according to {s}")
+            if memo is not None:
+                memo.valid[(s_num, type(e), k)] = valid
+            if valid:
+                ret.append(e)
         return set_with_str_for_keys(iter(ret))
     except jsonschema.ValidationError as error:
         logger.warning(f"enumValues: Schema {s} does not validate: {error}")
@@ -171,6 +275,7 @@ def hasAnyOperatorSchemas(schemas:List[Schema]):
     return False
 
 
+@_memoized
 def simplifyAll(schemas:List[Schema], floatAny:bool)->Schema:
     # First, we partition the schemas into the different types
     # that we care about
@@ -678,6 +783,7 @@ def simplifyAll(schemas:List[Schema], floatAny:bool)->Schema:
     else:
         return ret_all_schema
 
+@_memoized
 def simplifyAny(schema:List[Schema], floatAny:bool)->Schema:
     s_any = schema
 
@@ -773,6 +879,7 @@ def simplifyNot_(schema:Schema, floatAny:bool, alreadySimplified:bool=False)->Sc
     else:
         return {'not':schema}
 
+@_memoized
 def simplify(schema:Schema, floatAny:bool)->Schema:
     """ Tries to simplify a schema into an equivalent but
         more compact/simpler one.  If floatAny if true, then
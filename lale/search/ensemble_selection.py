@@ -0,0 +1,91 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Greedy ensemble selection from out-of-fold predictions.
+
+Following Caruana et al. (2004), an ensemble is grown one model at a
+time, with replacement: each step adds the candidate whose addition
+gives the best score of the averaged out-of-fold probabilities. The
+number of times each candidate was picked is its weight in a soft
+voting ensemble. Because the out-of-fold probabilities are already
+known from the optimizer's cross-validation (see
+lale.util.oof_cache), this needs no further cross-validation.
+"""
+
+from typing import Dict, Optional
+import numpy as np
+import sklearn.metrics
+
+class _FixedPredictions():
+    """Stand-in estimator for scorers, returning precomputed probabilities."""
+    _estimator_type = 'classifier'
+
+    def __init__(self, proba:np.ndarray, classes:np.ndarray):
+        self._proba = proba
+        self.classes_ = classes
+
+    def fit(self, X, y=None):
+        return self
+
+    def predict_proba(self, X):
+        return self._proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self._proba, axis=1)]
+
+def ensemble_selection(probas:Dict[str, np.ndarray], y, scoring='accuracy', ensemble_size:int=20, classes:Optional[np.ndarray]=None)->Dict[str, int]:
+    """Pick a weighted ensemble of candidates by greedy forward selection with replacement.
+
+    Parameters
+    ----------
+    probas : dict
+        Maps the name of each candidate to its out-of-fold
+        predict_proba, with one row per row of y and one column per class.
+    y : array
+        True labels.
+    scoring : string or callable, optional
+        Scorer name from sklearn.metrics.SCORERS or scorer object,
+        higher is better, by default 'accuracy'.
+    ensemble_size : int, optional
+        Number of selection steps, i.e., sum of the weights.
+    classes : array, optional
+        Labels of the columns of the probabilities, by default the
+        sorted unique values of y.
+
+    Returns
+    -------
+    weights : dict
+        Maps the name of each selected candidate to the number of times
+        it was picked.
+    """
+    if not probas:
+        raise ValueError('ensemble_selection needs at least one candidate.')
+    scorer = sklearn.metrics.get_scorer(scoring) if isinstance(scoring, str) else scoring
+    if classes is None:
+        classes = np.unique(y)
+    names = sorted(probas)
+    total = np.zeros(probas[names[0]].shape, dtype=np.float64)
+    weights:Dict[str, int] = {}
+    for step in range(ensemble_size):
+        best_name, best_score = None, -np.inf
+        for name in names:
+            candidate = (total + probas[name]) / (step + 1)
+            score = scorer(_FixedPredictions(candidate, classes), None, y)
+            if score > best_score:
+                best_name, best_score = name, score
+        if best_name is None: #all scores were nan
+            best_name = names[0]
+        total += probas[best_name]
+        weights[best_name] = weights.get(best_name, 0) + 1
+    return weights
@@ -0,0 +1,59 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Early stopping of cross-validation for trials that cannot win.
+
+Most configurations proposed by an optimizer are clearly worse than
+the best one found so far (the incumbent) after a couple of folds.
+A ``FoldPruner`` is passed as the prune argument of
+``lale.helpers.cross_val_score_track_trials``, which then skips the
+remaining folds of such trials and raises ``lale.helpers.TrialPruned``.
+"""
+
+import math
+from typing import List
+import numpy as np
+
+class FoldPruner():
+    """Prune a trial when an optimistic estimate of its score is below the incumbent.
+
+    After each fold, the optimistic estimate is the mean of the fold
+    scores so far plus z standard errors of that mean. Scores are as
+    returned by the scorer, so higher is better.
+
+    Parameters
+    ----------
+    incumbent_score : float
+        Mean cross-validation score of the best trial so far.
+    z : float, optional
+        Width of the confidence bound in standard errors, by default 2.
+        Larger values prune fewer trials.
+    min_folds : int, optional
+        Number of folds to evaluate before pruning is considered, by
+        default 2, which is also the least needed for a standard error.
+    """
+    def __init__(self, incumbent_score:float, z:float=2.0, min_folds:int=2):
+        self.incumbent_score = incumbent_score
+        self.z = z
+        self.min_folds = max(2, min_folds)
+
+    def __call__(self, scores:List[float])->bool:
+        """Whether to skip the remaining folds, given the scores of the folds evaluated so far."""
+        if len(scores) < self.min_folds:
+            return False
+        values = np.asarray(scores, dtype=float)
+        if not np.isfinite(values).all():
+            return False
+        bound = values.mean() + self.z * values.std(ddof=1) / math.sqrt(len(values))
+        return bool(bound < self.incumbent_score)
@@ -20,6 +20,7 @@ from lale.util.Visitor import Visitor
 from lale.search.schema2search_space import op_to_search_space
 from lale.search.lale_hyperopt import search_space_to_hp_expr, search_space_to_hp_str
 from lale.search.PGO import PGO
+from lale.search.search_space_cache import cached_search_space
 
 from hyperopt import hp
 
@@ -37,6 +38,7 @@ def hyperopt_search_space(op:'PlannedOperator',
 
         if should_print_search_space("true", "all", "backend", "hyperopt"):
             print(f"hyperopt search space for {name}: {search_space_to_hp_str(search_space, name)}")
-        return search_space_to_hp_expr(search_space, name)
+        return cached_search_space('hyperopt', op, pgo,
+                                   lambda: search_space_to_hp_expr(search_space, name))
     else:
         return None
@@ -16,6 +16,7 @@ import math
 import logging
 import numpy
 import jsonschema
+import lale.helpers
 import os
 
 from lale.util.Visitor import Visitor
@@ -27,15 +28,18 @@ from lale.schema_utils import Schema, getMinimum, getMaximum, STrue, SFalse, is_
 from lale.search.search_space import *
 from lale.search.lale_hyperopt import search_space_to_str_for_comparison
 from lale.search.PGO import PGO, FrequencyDistribution, Freqs
+from lale.search.search_space_cache import cached_search_space
 
 from lale.operators import *
 
 logger = logging.getLogger(__name__)              
 
 def op_to_search_space(op:PlannedOperator, pgo:Optional[PGO]=None)->SearchSpace:
-    """ Given an operator, this method compiles its schemas into a SearchSpace
+    """ Given an operator, this method compiles its schemas into a SearchSpace,
+    or returns a copy of the cached result (see lale.search.search_space_cache)
     """
-    search_space = SearchSpaceOperatorVisitor.run(op, pgo=pgo)
+    search_space = cached_search_space('search_space', op, pgo,
+                                       lambda: SearchSpaceOperatorVisitor.run(op, pgo=pgo))
 
     if should_print_search_space("true", "all", "search_space"):
         name = op.name()
@@ -49,7 +53,7 @@ def get_default(schema)->Optional[Any]:
     if d is not None:
         try:
             s = forOptimizer(schema)
-            jsonschema.validate(d, s, jsonschema.Draft4Validator)
+            lale.helpers.get_validator(s).validate(d)
             return d
         except:
             logger.debug(f"get_default: default {d} not used because it is not valid for the schema {schema}")
@@ -372,7 +376,7 @@ class SearchSpaceOperatorVisitor(Visitor):
                     if k in anys:
                         logger.info(f"Ignoring Duplicate SearchSpace entry {k}")
                     anys[k] = o_choice
-                return SearchSpaceObject(longName, all_keys, anys.values())
+                return SearchSpaceObject(longName, all_keys, list(anys.values()))
             else:
                 return SearchSpaceObject(longName, [], [])
         
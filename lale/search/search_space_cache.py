@@ -0,0 +1,204 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cache of compiled search spaces, shared by all optimizers.
+
+Compiling the schemas of a planned operator into a SearchSpace, and
+lowering that into a hyperopt expression or into grids (which GridSearchCV
+and SMAC use), can take seconds for large choices. The same planned
+operator is often compiled many times, for example when sklearn's clone
+re-creates an optimizer. Results are therefore cached, keyed by
+a structural hash of the planned operator and the PGO data
+(see search_space_key), so equal pipelines built separately share
+entries.
+
+Entries are kept pickled and every lookup unpickles a fresh copy, so
+callers may modify what they get. If the environment variable
+LALE_SEARCH_SPACE_CACHE names a folder, or clear_search_space_cache is
+given one, entries are also written there, so that worker processes and
+later sessions can skip recompilation. Empty that folder after upgrading
+lale.
+"""
+
+import collections
+import logging
+import os
+import pickle
+import threading
+from typing import Any, Callable, Dict, Optional, TypeVar
+import lale.helpers
+
+logger = logging.getLogger(__name__)
+
+_DISK_FORMAT = 1
+
+T = TypeVar('T')
+
+SearchSpaceCacheInfo = collections.namedtuple(
+    'SearchSpaceCacheInfo', ['hits', 'disk_hits', 'misses', 'maxsize', 'currsize'])
+
+def _structure(value)->Any:
+    import lale.operators
+    if isinstance(value, lale.operators.IndividualOp):
+        impl_class = value._impl_class()
+        schema_hash = lale.helpers.json_hash(value.hyperparam_schema())
+        if schema_hash is None:
+            raise ValueError(f'hyperparameter schema of {value.name()} is not JSON')
+        return {
+            'kind': type(value).__name__,
+            'impl': f'{impl_class.__module__}.{impl_class.__qualname__}',
+            'name': value.name(),
+            'schema': schema_hash,
+            'hyperparams': _structure(getattr(value, '_hyperparams', None))}
+    if isinstance(value, lale.operators.BasePipeline):
+        steps = value.steps()
+        index = {id(step): i for i, step in enumerate(steps)}
+        return {
+            'kind': type(value).__name__,
+            'steps': [_structure(step) for step in steps],
+            'edges': [(index[id(src)], index[id(dst)]) for src, dst in value.edges()]}
+    if isinstance(value, lale.operators.OperatorChoice):
+        return {
+            'kind': type(value).__name__,
+            'name': value.name(),
+            'steps': [_structure(step) for step in value.steps()]}
+    if isinstance(value, dict):
+        return {str(k): _structure(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_structure(v) for v in value]
+    return value
+
+def search_space_key(op, pgo=None)->Optional[str]:
+    """Structural hash of a planned operator and PGO data, or None if it cannot be computed.
+
+    Operators with the same structure, names, implementation classes,
+    hyperparameter schemas, and fixed hyperparameters get the same key,
+    even if they are different objects."""
+    try:
+        return lale.helpers.json_hash([_DISK_FORMAT, _structure(op), pgo])
+    except BaseException as e: #the compilation itself will report problems
+        logger.debug(f'search space of {op} not cached: {e}')
+        return None
+
+class _SearchSpaceCache():
+    def __init__(self, maxsize:int, folder:Optional[str]):
+        self.maxsize = maxsize
+        self.folder = folder
+        self.entries:'collections.OrderedDict[str, bytes]' = collections.OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _path(self, key:str)->str:
+        assert self.folder is not None
+        return os.path.join(self.folder, key + '.pickle')
+
+    def _lookup(self, key:str)->Optional[bytes]:
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+        if self.folder is not None:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                data = None
+            if data is not None:
+                with self.lock:
+                    self.disk_hits += 1
+                self._store(key, data, write=False)
+                return data
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def _store(self, key:str, data:bytes, write:bool=True)->None:
+        with self.lock:
+            self.entries[key] = data
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        if write and self.folder is not None:
+            path = self._path(key)
+            partial = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            try:
+                os.makedirs(self.folder, exist_ok=True)
+                with open(partial, 'wb') as f:
+                    f.write(data)
+                os.replace(partial, path)
+            except OSError as e:
+                logger.debug(f'could not write search space cache entry {path}: {e}')
+
+    def get(self, kind:str, op, pgo, compile:Callable[[], T])->T:
+        key = search_space_key(op, pgo) if self.maxsize > 0 or self.folder is not None else None
+        if key is None:
+            return compile()
+        key = f'{kind}-{key}'
+        data = self._lookup(key)
+        if data is not None:
+            try:
+                return pickle.loads(data)
+            except BaseException as e:
+                logger.debug(f'ignoring unreadable search space cache entry {key}: {e}')
+        result = compile()
+        try:
+            data = pickle.dumps(result, protocol=4)
+        except BaseException as e:
+            logger.debug(f'search space {kind} of {op} not cached: {e}')
+            return result
+        self._store(key, data)
+        # callers get a copy too, so that changing it cannot change the cache
+        return pickle.loads(data)
+
+_search_space_cache = _SearchSpaceCache(
+    maxsize=128, folder=os.environ.get('LALE_SEARCH_SPACE_CACHE', None) or None)
+
+def cached_search_space(kind:str, op, pgo, compile:Callable[[], T])->T:
+    """Result of compile(), a search space of kind for op and pgo, compiled on first use and then cached.
+
+    Parameters
+    ----------
+    kind: str
+        Which compilation of op this is, for example 'hyperopt' or 'grids'.
+    op: The lale PlannedOperator
+    pgo: PGO data used by the compilation, or None
+    compile: callable
+        Computes the search space on a cache miss, its result must be picklable to be cached.
+    """
+    return _search_space_cache.get(kind, op, pgo, compile)
+
+def search_space_cache_info()->SearchSpaceCacheInfo:
+    """Statistics of the search space cache, like functools.lru_cache; disk_hits were read from the folder."""
+    cache = _search_space_cache
+    with cache.lock:
+        return SearchSpaceCacheInfo(cache.hits, cache.disk_hits, cache.misses, cache.maxsize, len(cache.entries))
+
+def clear_search_space_cache(maxsize:Optional[int]=None, folder:Optional[str]=None)->None:
+    """Empty the in-memory search space cache and reset its statistics.
+
+    Parameters
+    ----------
+    maxsize: int, optional
+        If given, the new maximum number of entries kept in memory, 0 disables the in-memory tier.
+    folder: str, optional
+        If given, the folder for the on-disk tier, '' disables it. Files
+        already in the folder are kept.
+    """
+    global _search_space_cache
+    old = _search_space_cache
+    _search_space_cache = _SearchSpaceCache(
+        old.maxsize if maxsize is None else maxsize,
+        old.folder if folder is None else (folder or None))
@@ -23,6 +23,7 @@ from lale.util.Visitor import Visitor, accept
 from lale.search.search_space import SearchSpace, SearchSpaceObject, SearchSpaceConstant, SearchSpaceEnum, SearchSpaceSum, SearchSpaceProduct, SearchSpacePrimitive, SearchSpaceArray, SearchSpaceOperator, should_print_search_space
 from lale.search.schema2search_space import op_to_search_space
 from lale.search.PGO import PGO
+from lale.search.search_space_cache import cached_search_space
 from lale.sklearn_compat import nest_all_HPparams, nest_choice_all_HPparams, DUMMY_SEARCH_SPACE_GRID_PARAM_NAME, discriminant_name, make_indexed_name, make_array_index_name, structure_type_name, structure_type_list, structure_type_tuple, structure_type_dict
 
 from lale.operators import PlannedOperator, OperatorChoice, PlannedIndividualOp, PlannedPipeline, Operator
@@ -76,9 +77,8 @@ def search_space_to_grids(hp:SearchSpace)->List[SearchSpaceGrid]:
 
 def op_to_search_space_grids(op:PlannedOperator,
                              pgo:Optional[PGO]=None)->List[SearchSpaceGrid]:
-    search_space = op_to_search_space(op, pgo=pgo)
-    grids = search_space_to_grids(search_space)
-    return grids
+    return cached_search_space('grids', op, pgo,
+                               lambda: search_space_to_grids(op_to_search_space(op, pgo=pgo)))
 
 # lets handle the general case
 SearchSpaceGridInternalType = Union[List[SearchSpaceGrid], SearchSpacePrimitive]
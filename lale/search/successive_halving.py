@@ -0,0 +1,120 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Budget allocation by asynchronous successive halving.
+
+Instead of cross-validating every configuration on all the training
+data, new configurations are first evaluated on a small subsample
+(the lowest rung). Whenever a configuration is among the best 1/eta of
+those evaluated on its rung, it gets promoted and evaluated again on
+eta times more rows, up to the full data. Promotions happen as soon as
+they are possible, without waiting for a rung to fill up (ASHA, Li et
+al. 2018), so this works with both sequential and parallel trials.
+"""
+
+import math
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+import numpy as np
+from sklearn.utils.validation import _num_samples
+import lale.helpers
+
+class SuccessiveHalving():
+    """Rungs of losses, and the promotions that follow from them.
+
+    Parameters
+    ----------
+    min_budget : float
+        Fraction of the training rows used on the lowest rung, in (0, 1].
+    eta : float, optional
+        Ratio between the budgets of consecutive rungs, and inverse of
+        the fraction of configurations promoted from each rung.
+
+    Attributes
+    ----------
+    budgets : list of float
+        Fraction of the rows used on each rung, ending with 1.0.
+    """
+    def __init__(self, min_budget:float, eta:float=3):
+        if not 0 < min_budget <= 1:
+            raise ValueError(f'min_budget must be in (0, 1], got {min_budget}.')
+        if eta <= 1:
+            raise ValueError(f'eta must be greater than 1, got {eta}.')
+        self.eta = eta
+        n_rungs = 1 + int(math.floor(math.log(1.0 / min_budget, eta) + 1e-9))
+        self.budgets:List[float] = [min(1.0, min_budget * eta ** i) for i in range(n_rungs)]
+        self.budgets[-1] = 1.0
+        self._losses:List[Dict[Hashable, float]] = [{} for _ in self.budgets]
+        self._promoted:List[Set[Hashable]] = [set() for _ in self.budgets]
+
+    def record(self, key:Hashable, rung:int, loss:Optional[float])->None:
+        """Record the loss of a configuration on a rung; None or nan means the evaluation failed.
+
+        A configuration recorded on a rung above the lowest counts as
+        promoted from the rung below, even without next_promotion, for
+        example when restoring stored trials."""
+        if loss is None or np.isnan(loss):
+            loss = float('inf')
+        self._losses[rung][key] = loss
+        if rung > 0:
+            self._promoted[rung - 1].add(key)
+
+    def rung_of(self, key:Hashable)->int:
+        """Highest rung on which key has been evaluated, or -1."""
+        for rung in range(len(self.budgets) - 1, -1, -1):
+            if key in self._losses[rung]:
+                return rung
+        return -1
+
+    def next_promotion(self)->Optional[Tuple[Hashable, int]]:
+        """Pick a configuration to evaluate on a higher rung, as a pair (key, new rung), or None.
+
+        Higher rungs are served first. The picked configuration is
+        considered promoted from then on."""
+        for rung in range(len(self.budgets) - 2, -1, -1):
+            losses = self._losses[rung]
+            n_promotable = int(len(losses) // self.eta)
+            ranked = sorted(losses, key=lambda k: losses[k])[:n_promotable]
+            for key in ranked:
+                if key not in self._promoted[rung] and losses[key] != float('inf'):
+                    self._promoted[rung].add(key)
+                    return key, rung + 1
+        return None
+
+    def best(self)->Optional[Hashable]:
+        """Configuration with the lowest loss on the highest rung that has a successful evaluation."""
+        for rung in range(len(self.budgets) - 1, -1, -1):
+            losses = {k: v for k, v in self._losses[rung].items() if v != float('inf')}
+            if losses:
+                return min(losses, key=lambda k: losses[k])
+        return None
+
+def budget_indices(n_rows:int, budget:float, seed:int=42, min_rows:int=1)->Optional[np.ndarray]:
+    """Row indices of the subsample for a budget, or None for all rows.
+
+    The subsamples for increasing budgets are nested, so a promoted
+    configuration sees the rows it was evaluated on before plus more."""
+    n = max(min_rows, int(math.ceil(budget * n_rows)))
+    if n >= n_rows:
+        return None
+    permutation = np.random.RandomState(seed).permutation(n_rows)
+    return np.sort(permutation[:n])
+
+def subsample(estimator, X, y, budget:float, min_rows:int=1, seed:int=42):
+    """The pair (X, y) restricted to the rows for a budget, keeping their schemas."""
+    if budget >= 1.0:
+        return X, y
+    indices = budget_indices(_num_samples(X), budget, seed, min_rows)
+    if indices is None:
+        return X, y
+    return lale.helpers.split_with_schemas(estimator, X, y, indices)
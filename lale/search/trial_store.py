@@ -0,0 +1,135 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""On-disk log of optimizer trials, for checkpointing and resuming searches.
+
+Hyperopt, SMAC, and GridSearchCV take a trial_store argument naming a
+SQLite file. Every successful evaluation is appended to it right away,
+so a search that crashes or runs out of time loses at most the
+evaluations that were still running. Calling fit again with the same
+estimator, data, and settings picks up the stored trials instead of
+re-running them, and a larger max_evals extends the search. Failed
+evaluations are not stored, since their cause (running out of memory
+or time, a killed worker) may not recur, so they get run again.
+
+Several processes on the same machine may read and append to the same
+file at once, for example to run one search from several notebooks.
+SQLite locking is unreliable on network file systems, so the file
+should be on a local disk.
+Each search is identified by a key computed from everything that
+affects its results, so one file can hold many searches::
+
+    from lale.search.trial_store import TrialStore, search_key
+    from lale.util.fit_cache import fingerprint
+    store = TrialStore('trials.db', search_key('Hyperopt', planned.to_json(), fingerprint(X), fingerprint(y)))
+    store.append(trial_id, {'loss': 0.1})
+    for seq, trial_id, record in store.read():
+        ...
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    qualname = getattr(value, '__qualname__', None)
+    if callable(value) and qualname is not None:
+        # by name, since the repr of a function includes its address
+        return f'{value.__module__}.{qualname}'
+    return str(value)
+
+def canonical_json(value)->str:
+    """JSON string of value with sorted keys, so equal configurations give equal strings."""
+    return json.dumps(value, sort_keys=True, default=_to_json)
+
+def search_key(*parts)->str:
+    """Digest of the JSON of parts, identifying one search in a store."""
+    return hashlib.sha256(canonical_json(parts).encode('utf-8')).hexdigest()
+
+class TrialStore():
+    """Append-only log of trial records of one search in a SQLite file.
+
+    Parameters
+    ----------
+    path : str
+        File name of the SQLite database, created if needed.
+    search : str
+        Key of the search, for example from search_key. Records of
+        other searches in the same file are ignored.
+    timeout : float, optional
+        Seconds to wait for another process holding the write lock.
+    """
+    def __init__(self, path:str, search:str, timeout:float=60.0):
+        self.path = path
+        self.search = search
+        self.timeout = timeout
+        self._conn:Optional[sqlite3.Connection] = None
+        self._pid:Optional[int] = None
+        conn = self._connection()
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS trials ('
+                         'seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                         'search TEXT NOT NULL, '
+                         'trial_id TEXT NOT NULL, '
+                         'record TEXT NOT NULL, '
+                         'created REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS trials_search ON trials (search, seq)')
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        state['_pid'] = None
+        return state
+
+    def _connection(self)->sqlite3.Connection:
+        # sqlite connections must not cross a fork, so each process opens its own
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=self.timeout)
+            self._pid = os.getpid()
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        return self._conn
+
+    def append(self, trial_id:str, record:Dict[str, Any])->int:
+        """Durably add a record for trial_id, and return its sequence number."""
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                'INSERT INTO trials (search, trial_id, record, created) VALUES (?, ?, ?, ?)',
+                (self.search, trial_id, canonical_json(record), time.time()))
+        return cursor.lastrowid
+
+    def read(self, after:int=0)->List[Tuple[int, str, Dict[str, Any]]]:
+        """Records appended by any process with sequence number above after, as triples (seq, trial_id, record)."""
+        rows = self._connection().execute(
+            'SELECT seq, trial_id, record FROM trials WHERE search = ? AND seq > ? ORDER BY seq',
+            (self.search, after)).fetchall()
+        return [(seq, trial_id, json.loads(record)) for seq, trial_id, record in rows]
+
+    def __len__(self)->int:
+        row = self._connection().execute(
+            'SELECT COUNT(*) FROM trials WHERE search = ?', (self.search,)).fetchone()
+        return row[0]
+
+    def close(self)->None:
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
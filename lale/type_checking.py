@@ -30,7 +30,9 @@ as the right side succeed. This is specified using ``{'laleType': 'Any'}``.
 .. _subschema: https://arxiv.org/abs/1911.12651
 """
 
+import collections
 import functools
+import threading
 import jsonschema
 import jsonsubschema
 import lale.helpers
@@ -39,7 +41,7 @@ import pandas as pd
 import scipy.sparse
 import logging
 import inspect
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 JSON_TYPE = Dict[str, Any]
 import lale.datasets.data_schemas
 
@@ -63,7 +65,7 @@ def validate_schema(value, schema: Dict[str, Any], subsample_array:bool=True):
         The value was invalid for the schema.
     """
     json_value = lale.helpers.data_to_json(value, subsample_array)
-    jsonschema.validate(json_value, schema, jsonschema.Draft4Validator)
+    lale.helpers.get_validator(schema).validate(json_value)
 
 def _json_replace(subject, old, new):
     if subject == old:
@@ -93,9 +95,43 @@ def _json_replace(subject, old, new):
                 return result
     return subject #nothing changed so share original object (not a copy)
 
+SubschemaCacheInfo = collections.namedtuple(
+    'SubschemaCacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+_subschema_cache:'collections.OrderedDict[Tuple[str, str], bool]' = collections.OrderedDict()
+_subschema_cache_lock = threading.Lock()
+_subschema_cache_maxsize = 4096
+_subschema_cache_hits = 0
+_subschema_cache_misses = 0
+
+def subschema_cache_info() -> SubschemaCacheInfo:
+    """Statistics of the cache of subschema checks, like functools.lru_cache."""
+    with _subschema_cache_lock:
+        return SubschemaCacheInfo(_subschema_cache_hits, _subschema_cache_misses,
+                                  _subschema_cache_maxsize, len(_subschema_cache))
+
+def clear_subschema_cache(maxsize:Optional[int]=None) -> None:
+    """Empty the cache of subschema checks and reset its statistics.
+
+    Parameters
+    ----------
+    maxsize: int, optional
+        If given, the new maximum number of cached checks, 0 disables caching.
+    """
+    global _subschema_cache_maxsize, _subschema_cache_hits, _subschema_cache_misses
+    with _subschema_cache_lock:
+        _subschema_cache.clear()
+        _subschema_cache_hits = 0
+        _subschema_cache_misses = 0
+        if maxsize is not None:
+            _subschema_cache_maxsize = maxsize
+
 def is_subschema(sub_schema, super_schema) -> bool:
     """Is sub_schema a subschema of super_schema?
 
+    Results are memoized in a bounded LRU cache keyed by canonical
+    hashes of both schemas, see ``subschema_cache_info``.
+
     Parameters
     ----------
     sub_schema: JSON schema
@@ -109,7 +145,47 @@ def is_subschema(sub_schema, super_schema) -> bool:
     bool
         True if `sub_schema <: super_schema`, False otherwise.
     """
-    new_sub = _json_replace(sub_schema, {'laleType': 'Any'}, {'not': {}})
+    global _subschema_cache_hits, _subschema_cache_misses
+    key = None
+    if _subschema_cache_maxsize > 0:
+        sub_hash, super_hash = lale.helpers.json_hash(sub_schema), lale.helpers.json_hash(super_schema)
+        if sub_hash is not None and super_hash is not None:
+            key = (sub_hash, super_hash)
+            with _subschema_cache_lock:
+                if key in _subschema_cache:
+                    _subschema_cache.move_to_end(key)
+                    _subschema_cache_hits += 1
+                    return _subschema_cache[key]
+    result = _is_subschema_uncached(sub_schema, super_schema)
+    with _subschema_cache_lock:
+        _subschema_cache_misses += 1
+        if key is not None:
+            _subschema_cache[key] = result
+            while len(_subschema_cache) > _subschema_cache_maxsize:
+                _subschema_cache.popitem(last=False)
+    return result
+
+def _group_uniform_items(schema):
+    """Replace a list of per-column items schemas that only differ in their
+    descriptions by a single items schema, when the length of the array is
+    fixed to the length of that list, as in schemas of data frames."""
+    if isinstance(schema, list):
+        return [_group_uniform_items(s) for s in schema]
+    if not isinstance(schema, dict):
+        return schema
+    result = {k: _group_uniform_items(v) for k, v in schema.items()}
+    items = result.get('items', None)
+    if isinstance(items, list) and len(items) > 1 and \
+       result.get('minItems', None) == len(items) == result.get('maxItems', None):
+        grouped = [lale.helpers.dict_without(s, 'description') if isinstance(s, dict) else s
+                   for s in items]
+        if all(s == grouped[0] for s in grouped):
+            result['items'] = grouped[0]
+    return result
+
+def _is_subschema_uncached(sub_schema, super_schema) -> bool:
+    new_sub = _group_uniform_items(sub_schema)
+    new_sub = _json_replace(new_sub, {'laleType': 'Any'}, {'not': {}})
     try:
         return jsonsubschema.isSubschema(new_sub, super_schema)
     except Exception as e:
@@ -0,0 +1,216 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Scheduling of pipeline steps once all their predecessors are done.
+
+By default, Lale pipelines run their steps one at a time in
+topological order. Inside a ``parallel_backend`` block, steps whose
+predecessors have all completed run concurrently on a pool of
+workers instead, so independent branches of a pipeline overlap::
+
+    from lale.util.dag_executor import parallel_backend
+    with parallel_backend(n_jobs=4):
+        trained = ((pca & nys) >> ConcatFeatures >> lr).fit(X, y)
+
+The 'threading' backend works well for operators that release the
+GIL (most numpy, scipy, and scikit-learn numerics). The
+'multiprocessing' backend pickles each step and its inputs to a worker
+process, which helps pure-Python operators at the cost of copying data.
+"""
+
+import concurrent.futures
+import contextlib
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+_BACKENDS = ['threading', 'multiprocessing']
+
+class DAGExecutor():
+    """Runs tasks for the nodes of a DAG as soon as their predecessors are done.
+
+    Parameters
+    ----------
+    n_jobs : int or None, optional
+        Maximum number of tasks to run concurrently. None or 1 means
+        sequential execution in topological order, -1 means one
+        worker per CPU.
+    backend : 'threading' or 'multiprocessing', optional
+        Kind of worker pool to use when n_jobs is not 1.
+    """
+    def __init__(self, n_jobs:Optional[int]=None, backend:str='threading'):
+        if backend not in _BACKENDS:
+            raise ValueError(f'Unknown backend {backend}, expected one of {_BACKENDS}.')
+        if n_jobs is None:
+            n_jobs = 1
+        elif n_jobs < 0:
+            n_jobs = max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+        elif n_jobs == 0:
+            raise ValueError('n_jobs == 0 has no meaning.')
+        self.n_jobs = n_jobs
+        self.backend = backend
+
+    def is_sequential(self)->bool:
+        return self.n_jobs == 1
+
+    def _make_pool(self)->concurrent.futures.Executor:
+        if self.backend == 'threading':
+            return concurrent.futures.ThreadPoolExecutor(self.n_jobs)
+        else:
+            return concurrent.futures.ProcessPoolExecutor(self.n_jobs)
+
+    def execute(self,
+                steps:List[Any],
+                preds:Dict[Any, List[Any]],
+                make_task:Callable[[Any], Tuple[Callable, tuple]],
+                on_done:Callable[[Any, Any], None])->None:
+        """Run one task per step, respecting the order given by preds.
+
+        Parameters
+        ----------
+        steps : list
+            Nodes of the DAG in topological order.
+        preds : dict
+            Maps each node to the list of its predecessors.
+        make_task : callable
+            Called in the calling thread when all predecessors of a node
+            are done, returns a pair (function, arguments) to run.
+            For the 'multiprocessing' backend, both must be picklable.
+        on_done : callable
+            Called in the calling thread with the node and the result
+            of its task, before any of its successors become ready.
+        """
+        if self.is_sequential():
+            for step in steps:
+                fun, args = make_task(step)
+                on_done(step, fun(*args))
+            return
+        n_pending = {step: len(set(preds[step])) for step in steps}
+        succs:Dict[Any, List[Any]] = {step: [] for step in steps}
+        for step in steps:
+            for pred in set(preds[step]):
+                succs[pred].append(step)
+        running:Dict[concurrent.futures.Future, Any] = {}
+        with self._make_pool() as pool:
+            def submit(step):
+                fun, args = make_task(step)
+                running[pool.submit(fun, *args)] = step
+            try:
+                for step in steps:
+                    if n_pending[step] == 0:
+                        submit(step)
+                while running:
+                    done, _ = concurrent.futures.wait(
+                        running, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in [f for f in running if f in done]:
+                        step = running.pop(future)
+                        on_done(step, future.result())
+                        for succ in succs[step]:
+                            n_pending[succ] -= 1
+                            if n_pending[succ] == 0:
+                                submit(succ)
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+
+_state = threading.local()
+
+def get_executor()->DAGExecutor:
+    """The executor of the innermost enclosing ``parallel_backend`` block in this thread, if any, or a sequential one otherwise."""
+    stack = getattr(_state, 'stack', None)
+    if stack:
+        return stack[-1]
+    return DAGExecutor()
+
+@contextlib.contextmanager
+def parallel_backend(n_jobs:Optional[int]=-1, backend:str='threading')->Iterator[DAGExecutor]:
+    """Context manager for running independent pipeline steps concurrently.
+
+    Parameters
+    ----------
+    n_jobs : int or None, optional
+        Maximum number of steps to run concurrently, -1 (the default)
+        means one worker per CPU.
+    backend : 'threading' or 'multiprocessing', optional
+        Kind of worker pool, by default 'threading'.
+    """
+    executor = DAGExecutor(n_jobs, backend)
+    if not hasattr(_state, 'stack'):
+        _state.stack = []
+    _state.stack.append(executor)
+    try:
+        yield executor
+    finally:
+        _state.stack.pop()
+
+def nbytes(value)->int:
+    """Best-effort estimate of the memory held by a dataset, in bytes."""
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    if hasattr(value, 'nbytes') and isinstance(value.nbytes, int):
+        return value.nbytes #numpy arrays, h5py datasets
+    if hasattr(value, 'memory_usage'): #pandas DataFrame and Series
+        usage = value.memory_usage(index=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if all(hasattr(value, a) for a in ['data', 'indices', 'indptr']):
+        return nbytes(value.data) + nbytes(value.indices) + nbytes(value.indptr) #scipy.sparse compressed matrices
+    if hasattr(value, 'element_size') and hasattr(value, 'nelement'):
+        return value.element_size() * value.nelement() #torch tensors
+    return 0
+
+class OutputStore():
+    """Outputs of DAG nodes, each dropped as soon as all its successors have consumed it.
+
+    Parameters
+    ----------
+    steps : list
+        Nodes of the DAG.
+    preds : dict
+        Maps each node to the list of its predecessors.
+
+    Attributes
+    ----------
+    peak_bytes : int
+        Largest total size of the outputs held at the same time,
+        as estimated by ``nbytes``.
+    """
+    def __init__(self, steps:List[Any], preds:Dict[Any, List[Any]]):
+        self._n_consumers = {step: 0 for step in steps}
+        for step in steps:
+            for pred in set(preds[step]):
+                self._n_consumers[pred] += 1
+        self._preds = preds
+        self._outputs:Dict[Any, Any] = {}
+        self._sizes:Dict[Any, int] = {}
+        self.current_bytes = 0
+        self.peak_bytes = 0
+
+    def put(self, step, output)->None:
+        size = nbytes(output)
+        self._outputs[step] = output
+        self._sizes[step] = size
+        self.current_bytes += size
+        self.peak_bytes = max(self.peak_bytes, self.current_bytes)
+
+    def __getitem__(self, step):
+        return self._outputs[step]
+
+    def consume(self, step)->None:
+        """Record that the inputs of step have been read, dropping predecessor outputs that have no other consumers left."""
+        for pred in set(self._preds[step]):
+            self._n_consumers[pred] -= 1
+            if self._n_consumers[pred] == 0 and pred in self._outputs:
+                del self._outputs[pred]
+                self.current_bytes -= self._sizes.pop(pred)
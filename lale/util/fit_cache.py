@@ -0,0 +1,249 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Content-addressed cache of trained operators and their outputs.
+
+Optimizers such as Hyperopt, SMAC, or GridSearchCV often fit the same
+preprocessing operators with the same hyperparameters on the same
+cross-validation folds again and again. Inside a ``fit_cache`` block,
+``TrainableIndividualOp.fit`` and ``fit_transform`` look up the
+trained impl (and transformed training data) under a key made of the
+operator class, its hyperparameters, and a fingerprint of the data,
+and only fit on a miss::
+
+    from lale.util.fit_cache import fit_cache
+    with fit_cache(max_bytes=2**30, cache_dir='/tmp/lale_fit_cache') as cache:
+        trained = Hyperopt(estimator=planned, max_evals=100).fit(X, y)
+    print(cache.hits, cache.misses)
+
+Only operators whose hyperparameters are all JSON values are cached.
+Note that operators with ``random_state=None`` become deterministic
+within a cache block. Cached impls and outputs are shared between all
+hits, so they must not be modified in place.
+"""
+
+import collections
+import contextlib
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import scipy.sparse
+try:
+    import joblib
+except ImportError:
+    from sklearn.externals import joblib # type: ignore
+import lale.util.dag_executor
+
+logger = logging.getLogger(__name__)
+
+def _update_with_data(h, data)->None:
+    if data is None:
+        h.update(b'None')
+    elif isinstance(data, np.ndarray):
+        h.update(f'ndarray{data.dtype.str}{data.shape}'.encode())
+        if data.dtype.hasobject:
+            h.update(pickle.dumps(data.tolist(), pickle.HIGHEST_PROTOCOL))
+        else:
+            h.update(np.ascontiguousarray(data).reshape(-1).view(np.uint8).data)
+    elif isinstance(data, scipy.sparse.spmatrix):
+        data = data.tocsr()
+        h.update(f'csr{data.shape}'.encode())
+        for part in [data.data, data.indices, data.indptr]:
+            _update_with_data(h, part)
+    elif isinstance(data, pd.DataFrame):
+        h.update(f'DataFrame{list(data.columns)}{list(data.dtypes)}'.encode())
+        _update_with_data(h, pd.util.hash_pandas_object(data, index=True).values)
+    elif isinstance(data, pd.Series):
+        h.update(f'Series{data.name}{data.dtype}'.encode())
+        _update_with_data(h, pd.util.hash_pandas_object(data, index=True).values)
+    elif isinstance(data, (list, tuple)):
+        h.update(f'{type(data).__name__}{len(data)}'.encode())
+        for item in data:
+            _update_with_data(h, item)
+    else:
+        h.update(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+
+def fingerprint(data)->str:
+    """Hash of the contents of a dataset, regardless of any attached schema."""
+    h = hashlib.sha1()
+    _update_with_data(h, data)
+    return h.hexdigest()
+
+def _is_json_value(value)->bool:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(_is_json_value(v) for v in value)
+    if isinstance(value, dict):
+        return all(isinstance(k, str) and _is_json_value(v) for k, v in value.items())
+    return False
+
+class FitCache():
+    """LRU cache of trained impls and their transformed training data.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Maximum number of entries kept in memory.
+    max_bytes : int or None, optional
+        Maximum estimated size in bytes of the entries kept in memory.
+        None means no bound.
+    cache_dir : str or None, optional
+        If given, entries are also written to this directory with joblib,
+        so they survive eviction from memory and can be shared between
+        processes.
+    max_disk_bytes : int or None, optional
+        Maximum total size of the files in cache_dir, evicting the least
+        recently used files first. None means no bound.
+    """
+    def __init__(self, max_entries:int=256, max_bytes:Optional[int]=2**30,
+                 cache_dir:Optional[str]=None, max_disk_bytes:Optional[int]=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._entries:'collections.OrderedDict[str, Tuple[Any, Any, int]]' = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, op, X, y, fit_params:Dict[str, Any])->Optional[str]:
+        """Key for fitting op on X and y, or None if op cannot be cached."""
+        hyperparams = op.get_params_all()
+        if not (_is_json_value(hyperparams) and _is_json_value(fit_params)):
+            return None
+        h = hashlib.sha1()
+        h.update(op.class_name().encode())
+        h.update(repr(sorted(hyperparams.items())).encode())
+        h.update(repr(sorted(fit_params.items())).encode())
+        _update_with_data(h, X)
+        _update_with_data(h, y)
+        return h.hexdigest()
+
+    def _path(self, key:str)->str:
+        assert self.cache_dir is not None
+        return os.path.join(self.cache_dir, key + '.joblib')
+
+    def get(self, key:str)->Optional[Tuple[Any, Any]]:
+        """Return the pair (trained impl, output or None) stored for key, or None on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                impl, output, _ = self._entries[key]
+                self.hits += 1
+                return impl, output
+        if self.cache_dir is not None:
+            path = self._path(key)
+            try:
+                impl, output = joblib.load(path)
+                os.utime(path)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+            else:
+                with self._lock:
+                    self._put_in_memory(key, impl, output)
+                    self.hits += 1
+                return impl, output
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key:str, impl, output=None)->None:
+        """Store a trained impl and, optionally, its output on the training data."""
+        try:
+            size = len(pickle.dumps(impl, pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            logger.debug(f'not caching unpicklable impl {type(impl)}: {e}')
+            return
+        size += lale.util.dag_executor.nbytes(output)
+        with self._lock:
+            self._put_in_memory(key, impl, output, size)
+        if self.cache_dir is not None:
+            path = self._path(key)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            joblib.dump((impl, output), tmp_path)
+            os.replace(tmp_path, path)
+            self._evict_from_disk()
+
+    def _put_in_memory(self, key:str, impl, output, size:Optional[int]=None)->None:
+        if size is None:
+            size = lale.util.dag_executor.nbytes(output)
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key)[2]
+        self._entries[key] = (impl, output, size)
+        self.current_bytes += size
+        while self._entries and (
+                len(self._entries) > self.max_entries or
+                (self.max_bytes is not None and self.current_bytes > self.max_bytes)):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+
+    def _evict_from_disk(self)->None:
+        if self.max_disk_bytes is None:
+            return
+        assert self.cache_dir is not None
+        files:List[Tuple[float, int, str]] = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.joblib'):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self)->None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+_active:List[FitCache] = []
+
+def get_fit_cache()->Optional[FitCache]:
+    """The cache of the innermost enclosing ``fit_cache`` block, if any."""
+    return _active[-1] if _active else None
+
+@contextlib.contextmanager
+def fit_cache(max_entries:int=256, max_bytes:Optional[int]=2**30,
+              cache_dir:Optional[str]=None, max_disk_bytes:Optional[int]=None)->Iterator[FitCache]:
+    """Context manager that makes operator fits inside it consult a FitCache.
+
+    Unlike ``parallel_backend``, the cache is visible from all threads,
+    so folds or trials evaluated on worker threads share it. Forked worker
+    processes inherit it, and share entries if cache_dir is given.
+    See FitCache for the parameters.
+    """
+    cache = FitCache(max_entries, max_bytes, cache_dir, max_disk_bytes)
+    _active.append(cache)
+    try:
+        yield cache
+    finally:
+        _active.remove(cache)
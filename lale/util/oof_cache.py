@@ -0,0 +1,89 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Out-of-fold class probabilities of optimizer trials, kept on disk.
+
+During cross-validation every training row is predicted exactly once,
+by the model of the fold that held it out. Keeping these out-of-fold
+``predict_proba`` arrays lets post-hoc methods such as ensemble
+selection (see lale.search.ensemble_selection) combine trials without
+any further cross-validation. With many trials the arrays add up, so
+each one is a float32 file in a scratch folder, read back as a
+read-only memory map::
+
+    from lale.util.oof_cache import OOFCache
+    cache = OOFCache()
+    cache.put('trial-key', oof_proba)
+    proba = cache.get('trial-key')
+
+Worker processes can put arrays into a pickled copy of the cache, since
+every key gets its own file.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import weakref
+from typing import List, Optional
+import numpy as np
+
+class OOFCache():
+    """Folder of float32 out-of-fold predict_proba arrays, one per key.
+
+    Parameters
+    ----------
+    temp_folder : str, optional
+        Where to create the scratch folder, by default the system
+        temporary folder. The folder is deleted with the cache object
+        that created it, or by close.
+    """
+    def __init__(self, temp_folder:Optional[str]=None):
+        self.folder:Optional[str] = tempfile.mkdtemp(prefix='lale_oof_', dir=temp_folder)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.folder, True)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_finalizer'] = None #only the creating process deletes the folder
+        return state
+
+    def _path(self, key:str)->str:
+        assert self.folder is not None, 'OOFCache was closed'
+        assert re.match(r'^[\w.-]+$', key), key
+        return os.path.join(self.folder, key + '.npy')
+
+    def put(self, key:str, proba)->None:
+        """Store proba, an array with one row per training row and one column per class, as float32."""
+        path = self._path(key)
+        partial = f'{path}.{os.getpid()}.tmp'
+        with open(partial, 'wb') as f:
+            np.save(f, np.asarray(proba, dtype=np.float32), allow_pickle=False)
+        os.replace(partial, path)
+
+    def get(self, key:str)->Optional[np.ndarray]:
+        """Read-only memory map of the array stored for key, or None."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode='r', allow_pickle=False)
+
+    def keys(self)->List[str]:
+        assert self.folder is not None, 'OOFCache was closed'
+        return sorted(name[:-len('.npy')] for name in os.listdir(self.folder) if name.endswith('.npy'))
+
+    def close(self)->None:
+        """Delete the stored arrays. Memory maps already returned by get stay valid."""
+        if self._finalizer is not None:
+            self._finalizer()
+        self.folder = None
@@ -0,0 +1,121 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Datasets published once to memory-mapped files, shared by worker processes.
+
+Optimizers that evaluate trials in subprocesses would otherwise send a
+copy of the training data to every worker. ``SharedData`` writes the
+data once to a scratch file, in RAM-backed /dev/shm when available,
+and pickles as a small handle. Each worker calls ``get`` to map the
+same pages without copying::
+
+    from lale.util.shared_data import SharedData
+    with SharedData(X_train) as shared_X:
+        pool = WorkerPool(4, initializer=attach, initargs=(shared_X,))
+        ...
+
+    def attach(shared_X):
+        X_train = shared_X.get()
+
+Numeric numpy arrays, single-dtype DataFrames, and numeric Series are
+shared; anything else, including object columns and sparse matrices,
+falls back to travelling with the pickled handle. Views are mapped
+copy-on-write, so operators that modify their input in place only
+change their own private copy of the touched pages.
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Any, Optional
+import numpy as np
+import pandas as pd
+import lale.datasets.data_schemas
+
+def _default_folder()->Optional[str]:
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+def _is_shareable(array)->bool:
+    return isinstance(array, np.ndarray) and not array.dtype.hasobject and array.dtype.kind != 'V'
+
+class SharedData():
+    """Handle on a dataset stored in a memory-mapped scratch file.
+
+    Parameters
+    ----------
+    data : numpy array, pandas DataFrame or Series, or other
+        Dataset to share. A schema attached to it is restored by get.
+    temp_folder : str, optional
+        Where to create the scratch file, by default /dev/shm if it is
+        writable, or the system temporary folder otherwise.
+    """
+    def __init__(self, data, temp_folder:Optional[str]=None):
+        self._schema = getattr(data, 'json_schema', None)
+        self._data:Any = None
+        self._folder:Optional[str] = None
+        self._kind = 'pickled'
+        if isinstance(data, np.ndarray):
+            values = np.asarray(data)
+            if _is_shareable(values):
+                self._kind = 'ndarray'
+        elif isinstance(data, pd.DataFrame):
+            if data.shape[1] > 0 and len(set(data.dtypes)) == 1 and _is_shareable(data.values):
+                self._kind = 'DataFrame'
+                values = data.values
+                self._columns, self._index = data.columns, data.index
+        elif isinstance(data, pd.Series):
+            if _is_shareable(data.values):
+                self._kind = 'Series'
+                values = data.values
+                self._name, self._index = data.name, data.index
+        if self._kind == 'pickled':
+            self._data = data
+        else:
+            if temp_folder is None:
+                temp_folder = _default_folder()
+            self._folder = tempfile.mkdtemp(prefix='lale_shared_', dir=temp_folder)
+            np.save(os.path.join(self._folder, 'values.npy'), values, allow_pickle=False)
+
+    def __enter__(self)->'SharedData':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback)->None:
+        self.close()
+
+    @property
+    def is_shared(self)->bool:
+        """Whether the data is in a scratch file, as opposed to travelling with the handle."""
+        return self._kind != 'pickled'
+
+    def get(self):
+        """Zero-copy view of the data, with its schema if it had one."""
+        if self._kind == 'pickled':
+            return self._data
+        assert self._folder is not None, 'SharedData was closed'
+        values = np.load(os.path.join(self._folder, 'values.npy'), mmap_mode='c', allow_pickle=False)
+        if self._kind == 'ndarray':
+            result = values
+        elif self._kind == 'DataFrame':
+            result = pd.DataFrame(values, index=self._index, columns=self._columns, copy=False)
+        else:
+            result = pd.Series(values, index=self._index, name=self._name, copy=False)
+        return lale.datasets.data_schemas.add_schema(result, self._schema)
+
+    def close(self)->None:
+        """Delete the scratch file. Views already returned by get stay valid."""
+        if self._folder is not None:
+            shutil.rmtree(self._folder, ignore_errors=True)
+            self._folder = None
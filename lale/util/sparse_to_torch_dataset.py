@@ -0,0 +1,65 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import scipy.sparse
+try:
+    from torch.utils.data import Dataset
+    from torch.utils.data.dataloader import default_collate
+except ModuleNotFoundError:
+    raise ModuleNotFoundError("""Your Python environment does not have torch installed. You can install it with 
+                                pip install torch
+                                or with
+                                    pip install 'lale[full]'""")
+
+class SparseTorchDataset(Dataset):
+    """Pytorch Dataset subclass that takes a scipy sparse matrix and an optional label array.
+
+    Batches stay sparse: use ``collate`` as the collate_fn of the
+    DataLoader to stack the rows of a batch into a CSR matrix."""
+
+    def __init__(self, X, y=None):
+        """X and y are the dataset and labels respectively.
+
+        Parameters
+        ----------
+        X : scipy sparse matrix
+            Two dimensional dataset of input features, converted to CSR
+            for fast row access if it is in another format.
+        y : numpy array
+            Labels
+        """
+        self.X = X if X.format == 'csr' else X.tocsr()
+        self.y = y
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    def __getitem__(self, idx):
+        if self.y is not None:
+            return self.X[idx], self.y[idx]
+        else:
+            return self.X[idx]
+
+    @staticmethod
+    def collate(batch):
+        if isinstance(batch[0], tuple):
+            batch_X, batch_y = zip(*batch)
+            return scipy.sparse.vstack(batch_X, format='csr'), default_collate(list(batch_y))
+        return scipy.sparse.vstack(batch, format='csr')
+
+    def get_data(self):
+        if self.y is None:
+            return self.X
+        else:
+            return self.X, self.y
@@ -0,0 +1,150 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Inference without per-call schema validation for deployed operators.
+
+Trained operators check their inputs and outputs against their JSON
+schemas on every call to transform, predict, predict_proba, or
+decision_function. For small batches served at a high rate, these
+checks can cost more than the inference itself. In trusted mode, each
+check runs once, on a representative dataset at deployment time, and
+later calls skip it::
+
+    from lale.util.trusted_mode import trusted_mode
+    with trusted_mode(trained, X_sample) as savings:
+        for batch in batches:
+            trained.predict(batch)
+    print(savings.estimated_seconds)
+
+Alternatively, ``trained.enable_trusted_mode(X_sample)`` turns trusted
+mode on until ``trained.disable_trusted_mode()``. Fit and partial_fit
+are always validated. Results in trusted mode are returned as produced
+by the operator impls, without an attached schema.
+"""
+
+import collections
+import contextlib
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Tuple
+import pandas as pd
+
+_TRUSTED_METHODS = ['transform', 'predict', 'predict_proba', 'decision_function']
+
+class ValidationSavings():
+    """Counters of the schema checks skipped in trusted mode.
+
+    Checks are identified by a triple (operator name, method, argument),
+    where argument is 'X', 'y', or 'result'.
+
+    Attributes
+    ----------
+    seconds_per_check : dict
+        Time taken by the one validation run of each check.
+    n_skipped : dict
+        Number of times each check was skipped since.
+    """
+    def __init__(self):
+        self.seconds_per_check:Dict[Tuple[str, str, str], float] = {}
+        self.n_skipped:Dict[Tuple[str, str, str], int] = collections.Counter()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def check(self, op, method:str, arg_name:str, validate:Callable[[], Any], unchecked:Any)->Any:
+        """Return the result of validate() the first time, and unchecked afterwards."""
+        if method not in _TRUSTED_METHODS:
+            return validate()
+        key = (op.name(), method, arg_name)
+        with self._lock:
+            if key in self.seconds_per_check:
+                self.n_skipped[key] += 1
+                return unchecked
+        start = time.time()
+        result = validate()
+        with self._lock:
+            self.seconds_per_check[key] = time.time() - start
+        return result
+
+    @property
+    def n_skipped_total(self)->int:
+        return sum(self.n_skipped.values())
+
+    @property
+    def estimated_seconds(self)->float:
+        """Estimated time the skipped checks would have taken."""
+        return sum(n * self.seconds_per_check[key] for key, n in self.n_skipped.items())
+
+    def summary(self)->pd.DataFrame:
+        """Table with one row per check, sorted by estimated time saved."""
+        records = [{'operator': key[0], 'method': key[1], 'argument': key[2],
+                    'seconds_per_check': seconds,
+                    'n_skipped': self.n_skipped[key],
+                    'estimated_seconds': seconds * self.n_skipped[key]}
+                   for key, seconds in self.seconds_per_check.items()]
+        columns = ['operator', 'method', 'argument', 'seconds_per_check', 'n_skipped', 'estimated_seconds']
+        result = pd.DataFrame.from_records(records, columns=columns)
+        return result.sort_values('estimated_seconds', ascending=False).reset_index(drop=True)
+
+def _individual_ops(op):
+    return op.steps() if hasattr(op, 'steps') else [op]
+
+def enable(op, X, method:str='predict')->ValidationSavings:
+    """Validate op once by calling the given method on X, then skip those checks.
+
+    Raises the usual validation errors, leaving trusted mode off, if X
+    or the outputs of any step do not match their schemas."""
+    if method not in _TRUSTED_METHODS:
+        raise ValueError(f'Unknown method {method}, expected one of {_TRUSTED_METHODS}.')
+    savings = ValidationSavings()
+    for individual_op in _individual_ops(op):
+        individual_op._trusted = savings
+    try:
+        getattr(op, method)(X)
+    except BaseException:
+        disable(op)
+        raise
+    return savings
+
+def disable(op)->None:
+    """Turn per-call validation back on for op."""
+    for individual_op in _individual_ops(op):
+        individual_op.__dict__.pop('_trusted', None)
+
+@contextlib.contextmanager
+def trusted_mode(op, X, method:str='predict')->Iterator[ValidationSavings]:
+    """Context manager that validates op once on X and skips checks afterwards.
+
+    Parameters
+    ----------
+    op : TrainedOperator
+        Trained individual operator or pipeline.
+    X :
+        Representative features, for example a few rows of the data
+        the operator will be applied to.
+    method : 'transform', 'predict', 'predict_proba', or 'decision_function', optional
+        Method to call on X for the initial validation, by default 'predict'.
+    """
+    savings = enable(op, X, method)
+    try:
+        yield savings
+    finally:
+        disable(op)
@@ -0,0 +1,241 @@
+# Copyright 2019 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Long-lived worker processes that run tasks with per-task timeouts.
+
+Starting a fresh process for every optimizer trial, and pickling the
+training data into it, can cost more than the trial itself on small
+datasets. A ``WorkerPool`` starts its workers once. Each worker runs
+the initializer once, for example to receive the training data, and
+then runs one task at a time. A worker whose task exceeds its timeout
+is killed and replaced by a fresh one::
+
+    from lale.util.worker_pool import WorkerPool
+    with WorkerPool(4, initializer=load_data, initargs=(X, y)) as pool:
+        for i, params in enumerate(configs):
+            pool.submit(i, evaluate, (params,), timeout=60)
+        for _ in configs:
+            result = pool.wait()
+            print(result.task_id, result.status, result.overhead)
+"""
+
+import collections
+import logging
+import multiprocessing
+import multiprocessing.connection
+import time
+import traceback
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TaskResult = collections.namedtuple('TaskResult', ['task_id', 'status', 'value', 'seconds', 'overhead'])
+TaskResult.__doc__ = """Outcome of a task run by a WorkerPool.
+
+status is 'ok' (value is the return value of the task), 'error'
+(value is the formatted traceback), or 'timeout' (value is None).
+seconds is the time spent running the task in the worker, and
+overhead is the rest of the time between submit and the result being
+received, including waiting for a worker to start and pickling."""
+
+def _worker_main(conn, initializer, initargs)->None:
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        task_id, fun, args = message
+        start = time.time()
+        conn.send(('start', task_id, start))
+        try:
+            status, value = 'ok', fun(*args)
+        except BaseException:
+            status, value = 'error', traceback.format_exc()
+        end = time.time()
+        try:
+            conn.send(('done', task_id, status, value, start, end))
+        except BaseException:
+            conn.send(('done', task_id, 'error', traceback.format_exc(), start, end))
+
+class _Worker():
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.task:Optional[Tuple[Any, float, Optional[float]]] = None #(task_id, submit time, timeout)
+        self.deadline:Optional[float] = None
+
+class WorkerPool():
+    """Pool of worker processes that persist across tasks.
+
+    Parameters
+    ----------
+    n_workers : int
+        Number of worker processes.
+    initializer : callable, optional
+        Called once in each new worker with initargs, before its first
+        task. With the default fork start method, initargs are inherited
+        by the workers instead of being pickled.
+    initargs : tuple, optional
+
+    Attributes
+    ----------
+    n_spawned : int
+        Number of worker processes started, including replacements for
+        workers killed after a timeout or crash.
+    """
+    def __init__(self, n_workers:int, initializer:Optional[Callable]=None, initargs:tuple=()):
+        if n_workers < 1:
+            raise ValueError(f'n_workers must be at least 1, got {n_workers}.')
+        self._initializer = initializer
+        self._initargs = initargs
+        self._queue:Deque[Tuple[Any, Callable, tuple, Optional[float], float]] = collections.deque()
+        self._results:Deque[TaskResult] = collections.deque()
+        self.n_spawned = 0
+        self._workers:List[_Worker] = [self._spawn() for _ in range(n_workers)]
+
+    def __enter__(self)->'WorkerPool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback)->None:
+        self.close()
+
+    def _spawn(self)->_Worker:
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(child_conn, self._initializer, self._initargs),
+            daemon=True)
+        process.start()
+        child_conn.close()
+        self.n_spawned += 1
+        return _Worker(process, parent_conn)
+
+    def _replace(self, worker:_Worker)->None:
+        if worker.process.is_alive():
+            worker.process.terminate()
+        worker.process.join()
+        worker.conn.close()
+        self._workers[self._workers.index(worker)] = self._spawn()
+
+    @property
+    def n_pending(self)->int:
+        """Number of tasks submitted whose result has not been returned by wait yet."""
+        n_running = sum(1 for w in self._workers if w.task is not None)
+        return len(self._queue) + n_running + len(self._results)
+
+    def submit(self, task_id, fun:Callable, args:tuple=(), timeout:Optional[float]=None)->None:
+        """Queue fun(*args) to run on the next free worker.
+
+        The fun and args must be picklable. If the task runs longer than
+        timeout seconds, its worker is killed and the result has status
+        'timeout'."""
+        self._queue.append((task_id, fun, args, timeout, time.time()))
+        self._dispatch()
+
+    def _dispatch(self)->None:
+        for worker in list(self._workers):
+            if not self._queue:
+                break
+            if worker.task is None:
+                task = self._queue.popleft()
+                task_id, fun, args, timeout, submit_time = task
+                try:
+                    worker.conn.send((task_id, fun, args))
+                except (OSError, ValueError): #worker died while idle
+                    self._queue.appendleft(task)
+                    self._replace(worker)
+                    continue
+                worker.task = (task_id, submit_time, timeout)
+                worker.deadline = None
+
+    def _handle_message(self, worker:_Worker)->None:
+        assert worker.task is not None
+        task_id, submit_time, timeout = worker.task
+        try:
+            message = worker.conn.recv()
+        except (EOFError, OSError):
+            message = None
+        if message is None:
+            exitcode = worker.process.exitcode
+            self._results.append(TaskResult(
+                task_id, 'error', f'Worker process died with exit code {exitcode}.',
+                float('nan'), time.time() - submit_time))
+            worker.task = None
+            self._replace(worker)
+        elif message[0] == 'start':
+            if timeout is not None:
+                worker.deadline = time.time() + timeout
+        else:
+            _, _, status, value, start, end = message
+            seconds = end - start
+            self._results.append(TaskResult(
+                task_id, status, value, seconds, time.time() - submit_time - seconds))
+            worker.task = None
+            worker.deadline = None
+
+    def _kill_overdue(self)->None:
+        now = time.time()
+        for worker in list(self._workers):
+            if worker.deadline is not None and now >= worker.deadline:
+                assert worker.task is not None
+                task_id, submit_time, timeout = worker.task
+                logger.info(f'task {task_id} exceeded its timeout of {timeout} seconds, replacing its worker')
+                self._results.append(TaskResult(
+                    task_id, 'timeout', None, timeout, now - submit_time - timeout))
+                worker.task = None
+                self._replace(worker)
+
+    def wait(self, timeout:Optional[float]=None)->Optional[TaskResult]:
+        """Return the next finished task, or None if there is none within timeout seconds or nothing is pending."""
+        end_of_wait = None if timeout is None else time.time() + timeout
+        while not self._results:
+            busy = [w for w in self._workers if w.task is not None]
+            if not busy:
+                return None
+            now = time.time()
+            wake_ups = [w.deadline for w in busy if w.deadline is not None]
+            if end_of_wait is not None:
+                wake_ups.append(end_of_wait)
+            wait_for = max(0.0, min(wake_ups) - now) if wake_ups else None
+            ready = multiprocessing.connection.wait(
+                [w.conn for w in busy] + [w.process.sentinel for w in busy], timeout=wait_for)
+            for worker in busy:
+                if worker.conn in ready or worker.process.sentinel in ready:
+                    self._handle_message(worker)
+            self._kill_overdue()
+            self._dispatch()
+            if end_of_wait is not None and time.time() >= end_of_wait:
+                break
+        return self._results.popleft() if self._results else None
+
+    def close(self)->None:
+        """Stop all workers, killing those that are still running a task."""
+        for worker in self._workers:
+            if worker.task is None and worker.process.is_alive():
+                try:
+                    worker.conn.send(None)
+                except (OSError, ValueError):
+                    pass
+        for worker in self._workers:
+            worker.process.join(timeout=1.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            worker.conn.close()
+        self._workers = []
+        self._queue.clear()
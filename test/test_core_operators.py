@@ -844,3 +844,94 @@ class TestLazyImpl(unittest.TestCase):
         from lale.lib.lale import Hyperopt
         impl = Hyperopt._impl
         self.assertTrue(inspect.isclass(impl))
+
+class _FitTransformCountingImpl():
+    calls:list = []
+    def __init__(self):
+        pass
+    def fit(self, X, y=None):
+        _FitTransformCountingImpl.calls.append('fit')
+        return self
+    def transform(self, X):
+        _FitTransformCountingImpl.calls.append('transform')
+        return X
+    def fit_transform(self, X, y=None):
+        _FitTransformCountingImpl.calls.append('fit_transform')
+        return X
+
+class TestFitTransform(unittest.TestCase):
+    def setUp(self):
+        from sklearn.datasets import load_iris
+        data = load_iris()
+        self.X, self.y = data.data, data.target
+
+    def test_pca_same_as_fit_then_transform(self):
+        import numpy as np
+        pca = PCA(n_components=2)
+        result = pca.fit_transform(self.X)
+        expected = pca.fit(self.X).transform(self.X)
+        self.assertTrue(np.allclose(np.abs(result), np.abs(expected)))
+        self.assertIsNotNone(result.json_schema)
+
+    def test_fallback_without_native(self):
+        import numpy as np
+        result = MinMaxScaler().fit_transform(self.X, self.y)
+        self.assertTrue(np.allclose(result.min(axis=0), 0.0))
+
+    def test_pipeline_uses_native(self):
+        op = Ops.make_operator(_FitTransformCountingImpl, name='Counting')
+        _FitTransformCountingImpl.calls = []
+        trainable = op() >> LogisticRegression()
+        trained = trainable.fit(self.X, self.y)
+        self.assertEqual(_FitTransformCountingImpl.calls, ['fit_transform'])
+        trained.predict(self.X)
+        self.assertEqual(_FitTransformCountingImpl.calls, ['fit_transform', 'transform'])
+
+class TestFitCache(unittest.TestCase):
+    def setUp(self):
+        from sklearn.datasets import load_iris
+        data = load_iris()
+        self.X, self.y = data.data, data.target
+
+    def test_individual_op(self):
+        from lale.util.fit_cache import fit_cache
+        with fit_cache() as cache:
+            trained1 = PCA(n_components=2).fit(self.X)
+            trained2 = PCA(n_components=2).fit(self.X)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            PCA(n_components=3).fit(self.X)
+            PCA(n_components=2).fit(self.X[:100])
+            self.assertEqual((cache.hits, cache.misses), (1, 3))
+        self.assertIs(trained1._impl, trained2._impl)
+        PCA(n_components=2).fit(self.X)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_pipeline_prefix(self):
+        from lale.util.fit_cache import fit_cache
+        with fit_cache() as cache:
+            expected = (StandardScaler() >> PCA(n_components=2) >> LogisticRegression()).fit(self.X, self.y).predict(self.X)
+            self.assertEqual((cache.hits, cache.misses), (0, 3))
+            actual = (StandardScaler() >> PCA(n_components=2) >> LinearSVC()).fit(self.X, self.y).predict(self.X)
+            self.assertEqual((cache.hits, cache.misses), (2, 4))
+        self.assertEqual(len(actual), len(expected))
+
+    def test_lru_eviction(self):
+        from lale.util.fit_cache import fit_cache
+        with fit_cache(max_entries=1) as cache:
+            PCA(n_components=2).fit(self.X)
+            PCA(n_components=3).fit(self.X)
+            PCA(n_components=2).fit(self.X)
+            self.assertEqual((cache.hits, cache.misses), (0, 3))
+            self.assertEqual(len(cache._entries), 1)
+
+    def test_disk_tier(self):
+        import tempfile
+        from lale.util.fit_cache import fit_cache
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with fit_cache(cache_dir=cache_dir) as cache1:
+                expected = MinMaxScaler().fit_transform(self.X)
+            with fit_cache(cache_dir=cache_dir) as cache2:
+                actual = MinMaxScaler().fit_transform(self.X)
+            self.assertEqual((cache1.hits, cache1.misses), (0, 1))
+            self.assertEqual((cache2.hits, cache2.misses), (1, 0))
+        self.assertEqual(actual.tolist(), expected.tolist())
@@ -507,3 +507,200 @@ class TestComposition(unittest.TestCase):
     def test_remove_last5(self):
         pipeline = StandardScaler()  >> ( PCA() & Nystroem() & PassiveAggressiveClassifier() )>>ConcatFeatures() >> NoOp() >> PassiveAggressiveClassifier()
         pipeline.remove_last(inplace=True).freeze_trainable()
+
+class TestParallelExecution(unittest.TestCase):
+    def setUp(self):
+        from sklearn.datasets import load_iris
+        from sklearn.model_selection import train_test_split
+        data = load_iris()
+        X, y = data.data, data.target
+        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(X, y, random_state=42)
+
+    def _check_fit_matches_sequential(self, backend):
+        from lale.util.dag_executor import parallel_backend
+        trainable = (PCA() & Nystroem(random_state=42) & MinMaxScaler()) >> ConcatFeatures() >> LogisticRegression(random_state=42)
+        expected = trainable.fit(self.X_train, self.y_train).predict(self.X_test)
+        with parallel_backend(n_jobs=3, backend=backend):
+            trained = trainable.fit(self.X_train, self.y_train)
+        self.assertIsInstance(trained, TrainedPipeline)
+        self.assertEqual(len(trained.steps()), len(trainable.steps()))
+        self.assertEqual(list(trained.predict(self.X_test)), list(expected))
+
+    def test_fit_threading(self):
+        self._check_fit_matches_sequential('threading')
+
+    def test_fit_multiprocessing(self):
+        self._check_fit_matches_sequential('multiprocessing')
+
+    def test_fit_propagates_errors(self):
+        from lale.util.dag_executor import parallel_backend
+        trainable = (PCA(n_components=10) & MinMaxScaler()) >> ConcatFeatures() >> LogisticRegression()
+        with parallel_backend(n_jobs=2):
+            with self.assertRaises(ValueError):
+                trainable.fit(self.X_train, self.y_train)
+
+    def test_invalid_backend(self):
+        from lale.util.dag_executor import parallel_backend
+        with self.assertRaises(ValueError):
+            with parallel_backend(n_jobs=2, backend='gpu'):
+                pass
+
+    def test_inference_matches_sequential(self):
+        from lale.util.dag_executor import parallel_backend
+        trainable = (PCA() & Nystroem(random_state=42) & LinearSVC()) >> ConcatFeatures() >> LogisticRegression()
+        trained = trainable.fit(self.X_train, self.y_train)
+        expected = [trained.predict(self.X_test), trained.predict_proba(self.X_test), trained.decision_function(self.X_test)]
+        for backend in ['threading', 'multiprocessing']:
+            with parallel_backend(n_jobs=3, backend=backend):
+                actual = [trained.predict(self.X_test), trained.predict_proba(self.X_test), trained.decision_function(self.X_test)]
+            for e, a in zip(expected, actual):
+                self.assertEqual(e.tolist(), a.tolist())
+
+class TestIntermediateOutputs(unittest.TestCase):
+    def setUp(self):
+        from sklearn.datasets import load_iris
+        from sklearn.model_selection import train_test_split
+        data = load_iris()
+        X, y = data.data, data.target
+        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(X, y)
+
+    def test_chain_holds_widest_cut_only(self):
+        trainable = MinMaxScaler() >> MinMaxScaler() >> MinMaxScaler() >> LogisticRegression()
+        self.assertIsNone(trainable.peak_memory())
+        trained = trainable.fit(self.X_train, self.y_train)
+        self.assertEqual(trainable.peak_memory(), 2 * self.X_train.nbytes)
+        trained.predict(self.X_test)
+        self.assertEqual(trained.peak_memory(), 2 * self.X_test.nbytes)
+
+    def test_output_store_frees_after_last_consumer(self):
+        import numpy as np
+        from lale.util.dag_executor import OutputStore
+        steps = ['a', 'b', 'c', 'd']
+        preds = {'a': [], 'b': ['a'], 'c': ['a'], 'd': ['b', 'c']}
+        store = OutputStore(steps, preds)
+        for step in steps:
+            store.put(step, np.zeros(10))
+            store.consume(step)
+            if step == 'b':
+                self.assertEqual(store['a'].shape, (10,))
+        with self.assertRaises(KeyError):
+            store['a']
+        self.assertEqual(store.current_bytes, 80)
+        self.assertEqual(store.peak_bytes, 240)
+
+class TestCompiledInference(unittest.TestCase):
+    def setUp(self):
+        from sklearn.datasets import load_iris
+        from sklearn.model_selection import train_test_split
+        data = load_iris()
+        X, y = data.data, data.target
+        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(X, y)
+
+    def test_compiled_matches_uncompiled(self):
+        from lale.util.dag_executor import parallel_backend
+        trainable = (PCA() & Nystroem(random_state=42) & LinearSVC()) >> ConcatFeatures() >> LogisticRegression()
+        trained = trainable.fit(self.X_train, self.y_train)
+        with parallel_backend(n_jobs=2):
+            expected = [trained.predict(self.X_test), trained.predict_proba(self.X_test), trained.decision_function(self.X_test)]
+        self.assertIs(trained.compile(), trained)
+        self.assertEqual(set(trained._inference_plans.keys()), {'predict', 'predict_proba', 'decision_function'})
+        actual = [trained.predict(self.X_test), trained.predict_proba(self.X_test), trained.decision_function(self.X_test)]
+        for e, a in zip(expected, actual):
+            self.assertEqual(e.tolist(), a.tolist())
+
+    def test_unsupported_sink_method(self):
+        trained = (PCA() >> LinearSVC()).fit(self.X_train, self.y_train)
+        trained.compile()
+        self.assertNotIn('predict_proba', trained._inference_plans)
+        with self.assertRaises(ValueError):
+            trained.predict_proba(self.X_test)
+
+    def test_plan_rebuilt_after_changes(self):
+        import copy
+        trained = (MinMaxScaler() >> PCA() >> LogisticRegression()).fit(self.X_train, self.y_train)
+        expected = trained.predict(self.X_test)
+        old_plan = trained.compile()._inference_plans['predict']
+        copied = copy.deepcopy(trained)
+        self.assertNotIn('_inference_plans', copied.__dict__)
+        self.assertEqual(copied.predict(self.X_test).tolist(), expected.tolist())
+        unpickled = pickle.loads(pickle.dumps(trained))
+        self.assertEqual(unpickled.predict(self.X_test).tolist(), expected.tolist())
+        trained.remove_last(inplace=True)
+        transformed = trained.transform(self.X_test)
+        self.assertIsNot(trained._inference_plans['predict'], old_plan)
+        self.assertEqual(transformed.shape, (len(self.X_test), 4))
+
+    def test_plan_rebuilt_after_rewiring_in_place(self):
+        from lale.util.dag_executor import parallel_backend
+        trained = (MinMaxScaler() >> PCA() >> LogisticRegression()).fit(self.X_train, self.y_train)
+        old_plan = trained.compile()._inference_plans['predict_proba']
+        scaler, _, lr = trained.steps()
+        trained._preds[lr] = [scaler]
+        self.assertFalse(old_plan.is_valid_for(trained))
+        with parallel_backend(n_jobs=2):
+            expected = trained.predict_proba(self.X_test)
+        self.assertEqual(trained.predict_proba(self.X_test).tolist(), expected.tolist())
+        self.assertIsNot(trained._inference_plans['predict_proba'], old_plan)
+
+class TestTrustedMode(unittest.TestCase):
+    def setUp(self):
+        from sklearn.datasets import load_iris
+        from sklearn.model_selection import train_test_split
+        data = load_iris()
+        X, y = data.data, data.target
+        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(X, y)
+
+    def test_skips_checks_after_first_call(self):
+        from lale.util.trusted_mode import trusted_mode
+        trained = (PCA() >> LogisticRegression()).fit(self.X_train, self.y_train)
+        expected = trained.predict(self.X_test)
+        with trusted_mode(trained, self.X_test[:5]) as savings:
+            self.assertEqual(savings.n_skipped_total, 0)
+            self.assertEqual(len(savings.seconds_per_check), 4)
+            for _ in range(3):
+                self.assertEqual(trained.predict(self.X_test).tolist(), expected.tolist())
+            self.assertEqual(savings.n_skipped_total, 12)
+            self.assertGreater(savings.estimated_seconds, 0)
+            self.assertEqual(list(savings.summary()['n_skipped']), [3, 3, 3, 3])
+        self.assertIsNone(trained.steps()[0]._trusted)
+
+    def test_invalid_sample_leaves_mode_off(self):
+        trained = LogisticRegression().fit(self.X_train, self.y_train)
+        with self.assertRaises(ValueError):
+            trained.enable_trusted_mode([['a', 'b']])
+        self.assertIsNone(trained._trusted)
+        savings = trained.enable_trusted_mode(self.X_test[:5])
+        trained.predict_proba(self.X_test)
+        trained.predict_proba(self.X_test)
+        self.assertEqual(savings.n_skipped[('LogisticRegression', 'predict_proba', 'X')], 1)
+        trained.disable_trusted_mode()
+        with self.assertRaises(ValueError):
+            trained.predict([['a', 'b']])
+
+class TestSparsePipeline(unittest.TestCase):
+    def test_concat_stays_sparse(self):
+        import numpy as np
+        import scipy.sparse
+        rng = np.random.RandomState(42)
+        words = ['red', 'green', 'blue', 'apple', 'tree', 'car', 'sky', 'water']
+        X = np.array([[' '.join(rng.choice(words, 5))] for _ in range(200)])
+        y = rng.randint(0, 2, 200)
+        trainable = (TfidfVectorizer() & OneHotEncoder(handle_unknown='ignore')) >> ConcatFeatures() >> LogisticRegression()
+        trained = trainable.fit(X, y)
+        tfidf, ohe, concat = trained.steps()[:3]
+        concatenated = concat.transform([tfidf.transform(X), ohe.transform(X)])
+        self.assertTrue(scipy.sparse.issparse(concatenated))
+        self.assertEqual(concatenated.format, 'csr')
+        n_rows, n_cols = concatenated.shape
+        self.assertLess(trainable.peak_memory(), n_rows * n_cols * 8)
+        self.assertEqual(len(trained.predict(X)), 200)
+
+    def test_concat_mixed_dense_and_sparse(self):
+        import numpy as np
+        import scipy.sparse
+        dense = np.arange(6.0).reshape(3, 2)
+        sparse = scipy.sparse.csc_matrix(np.eye(3))
+        trained = ConcatFeatures()
+        result = trained.transform([dense, sparse, np.arange(3.0)])
+        self.assertTrue(scipy.sparse.issparse(result))
+        self.assertEqual(result.toarray().tolist(), np.hstack([dense, np.eye(3), np.arange(3.0).reshape(3, 1)]).tolist())
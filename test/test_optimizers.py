@@ -14,8 +14,10 @@
 
 import unittest
 import warnings
+import jsonschema
 
 import sklearn.datasets
+import sklearn.metrics
 from lale.lib.lale import ConcatFeatures
 from lale.lib.lale import NoOp
 from lale.lib.sklearn import KNeighborsClassifier
@@ -181,6 +183,64 @@ class TestSMAC(unittest.TestCase):
         trials = res._impl.get_trials()
         assert 2147483647.0 in trials.cost_per_config.values()
 
+    def test_smac_fold_pruning(self):
+        from lale.lib.lale import SMAC
+        planned_pipeline = (PCA(n_components=1) | NoOp) >> (LogisticRegression | KNeighborsClassifier)
+        opt = SMAC(estimator=planned_pipeline, cv=5, max_evals=12, fold_pruning=0.0)
+        res = opt.fit(self.X_train, self.y_train)
+        self.assertIn('pruned', list(res.summary()['status']))
+        res.predict(self.X_test)
+
+    def test_smac_trial_store(self):
+        import os
+        import tempfile
+        import sqlite3
+        from lale.lib.lale import SMAC
+        path = os.path.join(tempfile.mkdtemp(), 'trials.db')
+        planned_pipeline = (PCA | NoOp) >> LogisticRegression
+        for _ in range(2):
+            res = SMAC(estimator=planned_pipeline, cv=3, max_evals=3, trial_store=path).fit(self.X_train, self.y_train)
+            self.assertEqual(len(res.summary()), 3)
+        n_records = sqlite3.connect(path).execute('SELECT COUNT(*) FROM trials').fetchone()[0]
+        self.assertLessEqual(n_records, 3)
+
+    def test_smac_time_penalty(self):
+        from lale.lib.lale import SMAC
+        planned_pipeline = (PCA | NoOp) >> (LogisticRegression | KNeighborsClassifier)
+        res = SMAC(estimator=planned_pipeline, cv=3, max_evals=4, time_penalty=1.0).fit(self.X_train, self.y_train)
+        summary = res.summary()
+        self.assertTrue(summary['pareto'].any())
+        ok = summary[summary['status'] == 'ok']
+        self.assertTrue((ok['loss'] >= ok['time'] - 1.0).all())
+        res.predict(self.X_test)
+
+    def test_smac_successive_halving(self):
+        from lale.lib.lale import SMAC
+        planned_pipeline = (PCA | NoOp) >> LogisticRegression
+        opt = SMAC(estimator=planned_pipeline, cv=3, max_evals=9, min_budget=1/3)
+        res = opt.fit(self.X_train, self.y_train)
+        summary = res.summary()
+        self.assertEqual(len(summary), 9)
+        self.assertIn(1/3, list(summary['budget']))
+        self.assertIn(1.0, list(summary['budget']))
+        res.predict(self.X_test)
+
+    def test_smac_successive_halving_promotion_failure(self):
+        from lale.lib.lale import SMAC
+        planned_pipeline = (PCA | NoOp) >> LogisticRegression
+        opt = SMAC(estimator=planned_pipeline, cv=3, max_evals=3, min_budget=1/3,
+                   scoring=failing_on_full_data_scorer)
+        res = opt.fit(self.X_train, self.y_train)
+        summary = res.summary()
+        self.assertEqual(len(summary[~summary.index.str.contains('_')]), 3)
+        promotions = summary[summary.index.str.contains('_')]
+        self.assertEqual(list(promotions['status']), ['fail'])
+        self.assertEqual(list(promotions['budget']), [1.0])
+        promoted = summary.loc[f'p{promotions["tid"].iloc[0]}']
+        self.assertEqual(promoted['status'], 'ok')
+        self.assertAlmostEqual(promoted['budget'], 1/3)
+        res.predict(self.X_test)
+
     def test_smac_timeout_zero_classification(self):
         from lale.lib.lale import SMAC
         planned_pipeline = (MinMaxScaler | Normalizer) >> (LogisticRegression | KNeighborsClassifier)
@@ -243,6 +303,19 @@ def run_hyperopt_on_planned_pipeline(planned_pipeline, max_iters=1) :
     # run optimizer
     res = opt.fit(features, labels)    
 
+def slow_on_full_data_scorer(estimator, X, y):
+    """Accuracy, after sleeping on test folds of more than 20 rows, which exceeds max_eval_time in the tests."""
+    import time
+    if len(X) > 20:
+        time.sleep(60)
+    return sklearn.metrics.accuracy_score(y, estimator.predict(X))
+
+def failing_on_full_data_scorer(estimator, X, y):
+    """Accuracy, but raises on test folds of more than 20 rows, to make promotions to the full data fail."""
+    if len(X) > 20:
+        raise ValueError('full data')
+    return sklearn.metrics.accuracy_score(y, estimator.predict(X))
+
 class TestHyperoptOperatorDuplication(unittest.TestCase) :
     def test_planned_pipeline_1(self) :
         plan = (
@@ -294,6 +367,190 @@ class TestHyperopt(unittest.TestCase):
         predictions_1 = clf.predict(self.X_test)
         assert np.array_equal(predictions_1, predictions)
 
+    def test_parallel_folds(self):
+        planned = PCA >> (LogisticRegression | KNeighborsClassifier)
+        for backend in ['threading', 'multiprocessing']:
+            clf = Hyperopt(estimator=planned, cv=3, max_evals=3, n_jobs=3, backend=backend, show_progressbar=False)
+            trained = clf.fit(self.X_train, self.y_train)
+            summary = trained.summary()
+            self.assertEqual(len(summary), 3)
+            self.assertTrue((summary['status'] == 'ok').all())
+            self.assertTrue((summary['time'] > 0).all())
+            trained.predict(self.X_test)
+        with self.assertRaises(jsonschema.ValidationError):
+            Hyperopt(estimator=planned, n_jobs=3, backend='gpu')
+
+    def test_parallel_trials(self):
+        planned = (PCA | NoOp) >> LogisticRegression
+        clf = Hyperopt(estimator=planned, cv=3, max_evals=6, parallelism=3, show_progressbar=False)
+        trained = clf.fit(self.X_train, self.y_train)
+        summary = trained.summary()
+        self.assertEqual(list(summary['tid']), list(range(6)))
+        self.assertTrue((summary['status'] == 'ok').all())
+        self.assertEqual(len(trained._impl._trials.trials), 6)
+        trained.predict(self.X_test)
+        self.assertIsNotNone(trained.get_pipeline('p3'))
+
+    def test_parallel_trials_runtime_limit(self):
+        import time
+        clf = Hyperopt(estimator=LogisticRegression, cv=3, max_evals=1000, parallelism=2, max_opt_time=3, show_progressbar=False)
+        start = time.time()
+        trained = clf.fit(self.X_train, self.y_train)
+        self.assertLess(time.time() - start, 20)
+        self.assertLess(len(trained.summary()), 1000)
+        trained.predict(self.X_test)
+
+    def test_eval_time_limit(self):
+        clf = Hyperopt(estimator=LogisticRegression, cv=3, max_evals=3, max_eval_time=60, show_progressbar=False)
+        trained = clf.fit(self.X_train, self.y_train)
+        summary = trained.summary()
+        self.assertTrue((summary['status'] == 'ok').all())
+        self.assertTrue((summary['spawn_overhead'] >= 0).all())
+        trained.predict(self.X_test)
+
+    def test_successive_halving(self):
+        planned = (PCA | NoOp) >> LogisticRegression
+        clf = Hyperopt(estimator=planned, cv=3, max_evals=9, min_budget=1/3, show_progressbar=False)
+        trained = clf.fit(self.X_train, self.y_train)
+        summary = trained.summary()
+        self.assertEqual(list(summary['tid']), list(range(9)))
+        self.assertIn(1/3, list(summary['budget']))
+        self.assertIn(1.0, list(summary['budget']))
+        best = summary[summary['budget'] == 1.0]['loss'].idxmin()
+        self.assertIsNotNone(trained.get_pipeline(best))
+        trained.predict(self.X_test)
+
+    def test_fold_pruning(self):
+        planned = (PCA(n_components=1) | NoOp) >> (LogisticRegression | KNeighborsClassifier)
+        clf = Hyperopt(estimator=planned, cv=5, max_evals=12, fold_pruning=0.0, show_progressbar=False)
+        trained = clf.fit(self.X_train, self.y_train)
+        summary = trained.summary()
+        self.assertIn('pruned', list(summary['status']))
+        best_loss = summary[summary['status'] == 'ok']['loss'].min()
+        self.assertTrue((summary[summary['status'] == 'pruned']['loss'] > best_loss).all())
+        trained.predict(self.X_test)
+
+    def test_trial_store(self):
+        import os
+        import tempfile
+        path = os.path.join(tempfile.mkdtemp(), 'trials.db')
+        planned = (PCA | NoOp) >> LogisticRegression
+        first = Hyperopt(estimator=planned, cv=3, max_evals=3, trial_store=path, show_progressbar=False)
+        first = first.fit(self.X_train, self.y_train)
+        resumed = Hyperopt(estimator=planned, cv=3, max_evals=5, trial_store=path, show_progressbar=False)
+        resumed = resumed.fit(self.X_train, self.y_train)
+        summary = resumed.summary()
+        self.assertEqual(len(summary), 5)
+        self.assertEqual(list(summary['loss'][:3]), list(first.summary()['loss']))
+        resumed.predict(self.X_test)
+        self.assertIsNotNone(resumed.get_pipeline('p1'))
+        other_data = Hyperopt(estimator=planned, cv=3, max_evals=1, trial_store=path, show_progressbar=False)
+        self.assertEqual(len(other_data.fit(self.X_test, self.y_test).summary()), 1)
+
+    def test_trial_store_skips_failures(self):
+        import os
+        import sqlite3
+        import tempfile
+        def failing_scorer(estimator, X, y):
+            raise MemoryError('out of memory this time')
+        path = os.path.join(tempfile.mkdtemp(), 'trials.db')
+        hyperopt = Hyperopt(estimator=LogisticRegression, cv=3, max_evals=2, scoring=failing_scorer, trial_store=path, show_progressbar=False)
+        with self.assertRaises(ValueError):
+            hyperopt.fit(self.X_train, self.y_train)
+        self.assertEqual(sqlite3.connect(path).execute('SELECT COUNT(*) FROM trials').fetchone()[0], 0)
+
+    def test_duplicate_trials(self):
+        lr = LogisticRegression(solver='lbfgs', multi_class='auto', C=1.0, tol=0.001, fit_intercept=True, class_weight=None)
+        knn = KNeighborsClassifier(n_neighbors=5, weights='uniform', metric='euclidean', algorithm='auto')
+        planned = (MinMaxScaler | NoOp) >> (lr | knn)
+        clf = Hyperopt(estimator=planned, cv=3, max_evals=12, show_progressbar=False)
+        trained = clf.fit(self.X_train, self.y_train)
+        summary = trained.summary()
+        duplicates = summary[summary['duplicate']]
+        originals = summary[~summary['duplicate']]
+        self.assertGreater(len(duplicates), 0)
+        self.assertLessEqual(len(originals), 4)
+        for name in duplicates.index:
+            same = originals[originals['time'] == duplicates.loc[name, 'time']]
+            self.assertEqual(len(same), 1)
+            self.assertEqual(same['loss'][0], duplicates.loc[name, 'loss'])
+            self.assertEqual(
+                trained.get_pipeline(name).to_json(), trained.get_pipeline(same.index[0]).to_json())
+
+    def test_time_penalty(self):
+        planned = (MinMaxScaler | NoOp) >> (LogisticRegression | KNeighborsClassifier)
+        plain = Hyperopt(estimator=planned, cv=3, max_evals=4, show_progressbar=False)
+        summary = plain.fit(self.X_train, self.y_train).summary()
+        self.assertEqual(list(summary.columns), ['tid', 'loss', 'time', 'log_loss', 'budget', 'spawn_overhead', 'duplicate', 'pareto', 'status'])
+        self.assertTrue(summary['pareto'].any())
+        penalized = Hyperopt(estimator=planned, cv=3, max_evals=4, time_penalty=100.0, show_progressbar=False)
+        with self.assertLogs('lale.lib.lale.hyperopt', level='INFO') as logs:
+            trained = penalized.fit(self.X_train, self.y_train)
+        summary = trained.summary()
+        best = summary[summary['status'] == 'ok']['loss'].idxmin()
+        best_score = 100.0 * summary.loc[best, 'time'] - summary.loc[best, 'loss']
+        self.assertIn(f'best score: {best_score:.1%}', '\n'.join(logs.output))
+        for name in summary.index:
+            self.assertGreaterEqual(summary.loc[name, 'loss'], 100.0 * summary.loc[name, 'time'] - 1.0)
+        raw_loss = summary['loss'] - 100.0 * summary['time']
+        for name in summary[summary['pareto']].index:
+            dominating = summary[(raw_loss < raw_loss[name]) & (summary['time'] < summary.loc[name, 'time'])]
+            self.assertEqual(len(dominating), 0)
+        trained.predict(self.X_test)
+
+    def test_keep_oof_proba(self):
+        planned = (MinMaxScaler | NoOp) >> (LogisticRegression | LinearSVC)
+        clf = Hyperopt(estimator=planned, cv=3, max_evals=6, keep_oof_proba=True, show_progressbar=False)
+        trained = clf.fit(self.X_train, self.y_train)
+        summary = trained.summary()
+        n_classes = len(np.unique(self.y_train))
+        kept = 0
+        for name in summary.index:
+            proba = trained.get_oof_proba(name)
+            if proba is None:
+                continue
+            kept += 1
+            self.assertEqual(proba.shape, (len(self.y_train), n_classes))
+            self.assertEqual(proba.dtype, np.float32)
+            np.testing.assert_allclose(proba.sum(axis=1), 1.0, rtol=1e-5)
+        self.assertGreater(kept, 0)
+        without = Hyperopt(estimator=planned, cv=3, max_evals=1, show_progressbar=False)
+        self.assertIsNone(without.fit(self.X_train, self.y_train).get_oof_proba('p0'))
+
+    def test_successive_halving_parallel(self):
+        planned = (PCA | NoOp) >> LogisticRegression
+        clf = Hyperopt(estimator=planned, cv=3, max_evals=9, min_budget=1/3, parallelism=3, show_progressbar=False)
+        trained = clf.fit(self.X_train, self.y_train)
+        summary = trained.summary()
+        self.assertEqual(len(summary), 9)
+        self.assertTrue((summary['status'] == 'ok').all())
+        self.assertIn(1.0, list(summary['budget']))
+        trained.predict(self.X_test)
+
+    def test_successive_halving_promotion_timeout(self):
+        planned = (PCA | NoOp) >> LogisticRegression
+        clf = Hyperopt(estimator=planned, cv=3, max_evals=3, min_budget=1/3, max_eval_time=5,
+                       scoring=slow_on_full_data_scorer, show_progressbar=False)
+        trained = clf.fit(self.X_train, self.y_train)
+        summary = trained.summary()
+        promotions = summary[summary.index.str.contains('_')]
+        self.assertEqual(list(promotions['status']), ['fail'])
+        self.assertEqual(list(promotions['budget']), [1.0])
+        promoted = summary.loc[f'p{promotions["tid"].iloc[0]}']
+        self.assertEqual(promoted['status'], 'ok')
+        self.assertAlmostEqual(promoted['budget'], 1/3)
+        self.assertEqual(summary[summary['budget'] < 1.0]['loss'].idxmin(), promoted.name)
+        self.assertIsNotNone(trained.get_pipeline())
+        self.assertIsNotNone(trained.get_pipeline(promotions.index[0]))
+        trained.predict(self.X_test)
+
+    def test_max_eval_time_with_multiprocessing_folds(self):
+        clf = Hyperopt(estimator=LogisticRegression, cv=3, max_evals=2, max_eval_time=60,
+                       n_jobs=2, backend='multiprocessing', show_progressbar=False)
+        trained = clf.fit(self.X_train, self.y_train)
+        self.assertEqual(list(trained.summary()['status']), ['ok', 'ok'])
+        trained.predict(self.X_test)
+
     def test_runtime_limit_hoc(self):
         import time
         planned_pipeline = (MinMaxScaler | Normalizer) >> (LogisticRegression | KNeighborsClassifier)
@@ -481,6 +738,239 @@ class TestHyperopt(unittest.TestCase):
         predictions_1 = clf.predict(self.X_test)
         assert np.array_equal(predictions_1, predictions)
 
+class TestWorkerPool(unittest.TestCase):
+    def test_workers_persist(self):
+        import os
+        from lale.util.worker_pool import WorkerPool
+        with WorkerPool(2) as pool:
+            for i in range(6):
+                pool.submit(i, os.getpid)
+            results = [pool.wait() for _ in range(6)]
+            self.assertIsNone(pool.wait())
+        self.assertEqual(sorted(r.task_id for r in results), list(range(6)))
+        self.assertTrue(all(r.status == 'ok' for r in results))
+        self.assertLessEqual(len({r.value for r in results}), 2)
+        self.assertEqual(pool.n_spawned, 2)
+
+    def test_timeout_replaces_worker(self):
+        import os
+        import time
+        from lale.util.worker_pool import WorkerPool
+        with WorkerPool(1) as pool:
+            start = time.time()
+            pool.submit('slow', time.sleep, (30,), timeout=0.5)
+            result = pool.wait()
+            self.assertLess(time.time() - start, 10)
+            self.assertEqual((result.task_id, result.status), ('slow', 'timeout'))
+            pool.submit('fast', os.getpid, timeout=10)
+            result = pool.wait()
+            self.assertEqual((result.task_id, result.status), ('fast', 'ok'))
+            self.assertEqual(pool.n_spawned, 2)
+
+    def test_errors(self):
+        import operator
+        import os
+        from lale.util.worker_pool import WorkerPool
+        with WorkerPool(1) as pool:
+            pool.submit('div', operator.truediv, (1, 0))
+            result = pool.wait()
+            self.assertEqual(result.status, 'error')
+            self.assertIn('ZeroDivisionError', result.value)
+            pool.submit('crash', os._exit, (3,))
+            result = pool.wait()
+            self.assertEqual(result.status, 'error')
+            pool.submit('after', operator.add, (1, 2))
+            self.assertEqual(pool.wait().value, 3)
+
+class TestSharedData(unittest.TestCase):
+    def _is_memory_mapped(self, array):
+        while array is not None:
+            if isinstance(array, np.memmap):
+                return True
+            array = array.base
+        return False
+
+    def test_ndarray(self):
+        import os
+        import pickle
+        from lale.datasets.data_schemas import add_schema
+        from lale.util.shared_data import SharedData
+        X = add_schema(np.arange(20000.0).reshape(1000, 20))
+        with SharedData(X) as shared:
+            self.assertTrue(shared.is_shared)
+            self.assertLess(len(pickle.dumps(shared)), 10000)
+            view = pickle.loads(pickle.dumps(shared)).get()
+            self.assertTrue(self._is_memory_mapped(view))
+            self.assertTrue(np.array_equal(view, X))
+            self.assertEqual(view.json_schema, X.json_schema)
+            view[0, 0] = -1.0
+            self.assertEqual(shared.get()[0, 0], 0.0)
+            folder = shared._folder
+        self.assertFalse(os.path.exists(folder))
+
+    def test_pandas(self):
+        import pandas as pd
+        from lale.util.shared_data import SharedData
+        df = pd.DataFrame(np.arange(12).reshape(4, 3), columns=['a', 'b', 'c'], index=[3, 2, 1, 0])
+        with SharedData(df) as shared:
+            view = shared.get()
+            self.assertTrue(self._is_memory_mapped(view.values))
+            pd.testing.assert_frame_equal(view, df)
+            self.assertIsNotNone(view.json_schema)
+        series = pd.Series([1.5, 2.5], name='y')
+        with SharedData(series) as shared:
+            pd.testing.assert_series_equal(shared.get(), series)
+
+    def test_fallback(self):
+        import pandas as pd
+        from lale.util.shared_data import SharedData
+        df = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+        with SharedData(df) as shared:
+            self.assertFalse(shared.is_shared)
+            self.assertIs(shared.get(), df)
+
+class TestSuccessiveHalving(unittest.TestCase):
+    def test_budgets(self):
+        from lale.search.successive_halving import SuccessiveHalving
+        self.assertEqual(SuccessiveHalving(1/9).budgets, [1/9, 1/3, 1.0])
+        self.assertEqual(SuccessiveHalving(1/4, eta=2).budgets, [1/4, 1/2, 1.0])
+        self.assertEqual(SuccessiveHalving(1.0).budgets, [1.0])
+        with self.assertRaises(ValueError):
+            SuccessiveHalving(0.0)
+
+    def test_promotions(self):
+        from lale.search.successive_halving import SuccessiveHalving
+        halving = SuccessiveHalving(1/9)
+        for key, loss in enumerate([0.5, 0.1, None]):
+            halving.record(key, 0, loss)
+        self.assertEqual(halving.next_promotion(), (1, 1))
+        self.assertIsNone(halving.next_promotion())
+        halving.record(1, 1, 0.3)
+        self.assertEqual(halving.rung_of(1), 1)
+        for key, loss in enumerate([0.2, 0.4, 0.6], 3):
+            halving.record(key, 0, loss)
+        self.assertEqual(halving.next_promotion(), (3, 1))
+        self.assertEqual(halving.best(), 1)
+
+    def test_budget_indices(self):
+        from lale.search.successive_halving import budget_indices
+        small = budget_indices(100, 1/9)
+        large = budget_indices(100, 1/3)
+        self.assertEqual(len(small), 12)
+        self.assertEqual(len(large), 34)
+        self.assertTrue(set(small) <= set(large))
+        self.assertIsNone(budget_indices(100, 1.0))
+
+class TestTrialStore(unittest.TestCase):
+    def test_append_read(self):
+        import os
+        import pickle
+        import tempfile
+        import sklearn.metrics
+        from lale.search.trial_store import TrialStore, canonical_json, search_key
+        path = os.path.join(tempfile.mkdtemp(), 'trials.db')
+        key = search_key('test', {'b': 1, 'a': np.float64(2.0)})
+        self.assertEqual(key, search_key('test', {'a': 2.0, 'b': 1}))
+        accuracy = sklearn.metrics.accuracy_score
+        self.assertEqual(canonical_json(accuracy), f'"{accuracy.__module__}.accuracy_score"')
+        writer = TrialStore(path, key)
+        reader = pickle.loads(pickle.dumps(writer))
+        other = TrialStore(path, search_key('other'))
+        seq = writer.append('t0', {'loss': np.float32(0.5), 'vals': {'x': [np.int64(1)]}})
+        other.append('t0', {'loss': 0.0})
+        writer.append('t1', {'loss': float('nan')})
+        records = reader.read()
+        self.assertEqual([(s, t) for s, t, _ in records][0], (seq, 't0'))
+        self.assertEqual(records[0][2], {'loss': 0.5, 'vals': {'x': [1]}})
+        self.assertEqual([t for _, t, _ in reader.read(seq)], ['t1'])
+        self.assertTrue(np.isnan(reader.read(seq)[0][2]['loss']))
+        self.assertEqual(len(reader), 2)
+        self.assertEqual(len(other), 1)
+
+class TestSearchSpaceCache(unittest.TestCase):
+    def setUp(self):
+        from lale.search.search_space_cache import clear_search_space_cache
+        clear_search_space_cache()
+
+    def tearDown(self):
+        from lale.search.search_space_cache import clear_search_space_cache
+        clear_search_space_cache(maxsize=128, folder='')
+
+    def test_structural_key(self):
+        import lale.schemas
+        from lale.search.search_space_cache import search_space_key
+        make = lambda: (PCA | NoOp) >> (LogisticRegression | KNeighborsClassifier)
+        self.assertEqual(search_space_key(make()), search_space_key(make()))
+        self.assertNotEqual(search_space_key(make()), search_space_key(make(), pgo={'PCA': {}}))
+        self.assertNotEqual(search_space_key(LogisticRegression), search_space_key(LogisticRegression(C=0.5)))
+        self.assertNotEqual(search_space_key(LogisticRegression), search_space_key(LogisticRegression.customize_schema(C=lale.schemas.Float(min=1.0, max=2.0, default=1.0))))
+        self.assertNotEqual(search_space_key(PCA >> LogisticRegression), search_space_key(PCA | LogisticRegression))
+
+    def test_hits(self):
+        import hyperopt.pyll
+        from lale.search.search_space_cache import search_space_cache_info
+        from lale.search.search_space_grid import get_search_space_grids, search_space_grids_to_string
+        make = lambda: (PCA | NoOp) >> (LogisticRegression | KNeighborsClassifier)
+        first = hyperopt_search_space(make())
+        misses = search_space_cache_info().misses
+        second = hyperopt_search_space(make())
+        self.assertEqual(search_space_cache_info().misses, misses)
+        self.assertIsNot(first, second)
+        self.assertEqual(str(hyperopt.pyll.as_apply(first)), str(hyperopt.pyll.as_apply(second)))
+        grids = get_search_space_grids(make())
+        expected = search_space_grids_to_string(grids)
+        grids.clear()
+        self.assertEqual(search_space_grids_to_string(get_search_space_grids(make())), expected)
+        Hyperopt(estimator=make(), max_evals=1)
+        self.assertEqual(search_space_cache_info().misses, misses + 1)
+
+    def test_disk_tier(self):
+        import os
+        import tempfile
+        from lale.search.search_space_cache import clear_search_space_cache, search_space_cache_info
+        from lale.search.search_space_grid import get_search_space_grids, search_space_grids_to_string
+        folder = tempfile.mkdtemp()
+        clear_search_space_cache(maxsize=0, folder=folder)
+        planned = PCA >> (LogisticRegression | KNeighborsClassifier)
+        expected = search_space_grids_to_string(get_search_space_grids(planned))
+        self.assertEqual(len(os.listdir(folder)), 2)
+        self.assertEqual(search_space_grids_to_string(get_search_space_grids(planned)), expected)
+        info = search_space_cache_info()
+        self.assertEqual((info.disk_hits, info.misses, info.currsize), (1, 2, 0))
+
+class TestEnsembleSelection(unittest.TestCase):
+    def test_oof_cache(self):
+        import os
+        import pickle
+        from lale.util.oof_cache import OOFCache
+        cache = OOFCache()
+        worker = pickle.loads(pickle.dumps(cache))
+        worker.put('a1', np.array([[0.25, 0.75], [1.0, 0.0]]))
+        proba = cache.get('a1')
+        self.assertEqual(proba.dtype, np.float32)
+        self.assertEqual(proba.tolist(), [[0.25, 0.75], [1.0, 0.0]])
+        self.assertIsNone(cache.get('b2'))
+        self.assertEqual(cache.keys(), ['a1'])
+        folder = cache.folder
+        del worker
+        self.assertTrue(os.path.isdir(folder))
+        cache.close()
+        self.assertFalse(os.path.exists(folder))
+
+    def test_ensemble_selection(self):
+        from lale.search.ensemble_selection import ensemble_selection
+        y = np.array([0, 0, 1, 1])
+        probas = {
+            'good': np.array([[0.9, 0.1], [0.6, 0.4], [0.4, 0.6], [0.6, 0.4]]),
+            'other': np.array([[0.9, 0.1], [0.9, 0.1], [0.1, 0.9], [0.1, 0.9]]),
+            'bad': np.array([[0.1, 0.9], [0.1, 0.9], [0.9, 0.1], [0.9, 0.1]])}
+        weights = ensemble_selection(probas, y, 'accuracy', ensemble_size=5)
+        self.assertEqual(sum(weights.values()), 5)
+        self.assertNotIn('bad', weights)
+        self.assertGreater(weights['other'], 0)
+        weights = ensemble_selection(probas, y, 'neg_log_loss', ensemble_size=3)
+        self.assertEqual(weights, {'other': 3})
+
 class TestAutoConfigureClassification(unittest.TestCase):
     def setUp(self):
         from sklearn.datasets import load_iris
@@ -611,6 +1101,25 @@ class TestGridSearchCV(unittest.TestCase):
             iris = load_iris()
             clf.fit(iris.data, iris.target)
 
+    def test_trial_store(self):
+        import os
+        import tempfile
+        from sklearn.datasets import load_iris
+        import sqlite3
+        from lale.lib.lale import GridSearchCV
+        warnings.simplefilter("ignore")
+        iris = load_iris()
+        path = os.path.join(tempfile.mkdtemp(), 'trials.db')
+        parameters = {'C': [0.01, 1.0, 100.0], 'solver': ['liblinear', 'lbfgs']}
+        expected = GridSearchCV(estimator=LogisticRegression, param_grid=parameters, cv=3).fit(iris.data, iris.target)
+        for _ in range(2):
+            clf = GridSearchCV(estimator=LogisticRegression, param_grid=parameters, cv=3, n_jobs=2, trial_store=path)
+            trained = clf.fit(iris.data, iris.target)
+            self.assertEqual(
+                trained.get_pipeline().hyperparams(), expected.get_pipeline().hyperparams())
+            n_records = sqlite3.connect(path).execute('SELECT COUNT(*) FROM trials').fetchone()[0]
+            self.assertEqual(n_records, 6)
+
 class TestCrossValidation(unittest.TestCase):
     def test_cv_folds(self):
         trainable_lr = LogisticRegression(n_jobs=1)
@@ -641,6 +1150,154 @@ class TestCrossValidation(unittest.TestCase):
                 cv = KFold(2), scoring=make_scorer(accuracy_score))
         self.assertEqual(len(cv_results), 2)
 
+    def test_inference_cache_is_lazy(self):
+        from unittest import mock
+        from lale.helpers import _InferenceCache
+        iris = sklearn.datasets.load_iris()
+        trained = (PCA() >> LogisticRegression()).fit(iris.data, iris.target)
+        plan = trained._inference_plan('predict')
+        with mock.patch.object(plan, 'sink_inputs', wraps=plan.sink_inputs) as sink_inputs:
+            cached = _InferenceCache(trained, iris.data)
+            self.assertEqual(sink_inputs.call_count, 0)
+            self.assertEqual(cached.predict(iris.data).tolist(), trained.predict(iris.data).tolist())
+            self.assertEqual(cached.predict_proba(iris.data).tolist(), trained.predict_proba(iris.data).tolist())
+            self.assertEqual(sink_inputs.call_count, 1)
+
+    def test_cv_track_trials_parallel(self):
+        from lale.helpers import cross_val_score_track_trials
+        from sklearn.model_selection import StratifiedKFold
+        iris = sklearn.datasets.load_iris()
+        trainable = PCA() >> LogisticRegression(n_jobs=1)
+        expected = cross_val_score_track_trials(
+            trainable, iris.data, iris.target, scoring='accuracy', cv=StratifiedKFold(3))
+        for backend in ['threading', 'multiprocessing']:
+            score, logloss, execution_time = cross_val_score_track_trials(
+                trainable, iris.data, iris.target, scoring='accuracy', cv=StratifiedKFold(3),
+                n_jobs=3, backend=backend)
+            self.assertAlmostEqual(score, expected[0])
+            self.assertAlmostEqual(logloss, expected[1])
+            self.assertGreater(execution_time, 0)
+        untouched = PCA() >> LogisticRegression(n_jobs=1)
+        cross_val_score_track_trials(
+            untouched, iris.data, iris.target, scoring='accuracy', cv=StratifiedKFold(3), n_jobs=3)
+        self.assertTrue(all(getattr(step, '_trained', None) is None for step in untouched.steps()))
+
+    def test_cv_track_trials_pruned(self):
+        from lale.helpers import cross_val_score_track_trials, TrialPruned
+        from sklearn.model_selection import StratifiedKFold
+        iris = sklearn.datasets.load_iris()
+        trainable = LogisticRegression()
+        expected = cross_val_score_track_trials(
+            trainable, iris.data, iris.target, scoring='accuracy', cv=StratifiedKFold(3))
+        seen = []
+        result = cross_val_score_track_trials(
+            trainable, iris.data, iris.target, scoring='accuracy', cv=StratifiedKFold(3),
+            prune=lambda scores: seen.append(len(scores)))
+        self.assertEqual(seen, [1, 2])
+        self.assertAlmostEqual(result[0], expected[0])
+        for n_jobs in [1, 3]:
+            with self.assertRaises(TrialPruned) as context:
+                cross_val_score_track_trials(
+                    trainable, iris.data, iris.target, scoring='accuracy', cv=StratifiedKFold(3),
+                    n_jobs=n_jobs, prune=lambda scores: True)
+            self.assertEqual(context.exception.n_folds, 1)
+            self.assertGreater(context.exception.score, 0.5)
+
+    def test_cv_track_trials_oof_predict_proba(self):
+        from lale.helpers import cross_val_score_track_trials
+        from sklearn.model_selection import StratifiedKFold
+        iris = sklearn.datasets.load_iris()
+        cv = StratifiedKFold(3)
+        oof = np.full((len(iris.target), 3), np.nan)
+        cross_val_score_track_trials(
+            LogisticRegression(), iris.data, iris.target, scoring='accuracy', cv=cv,
+            n_jobs=3, oof_predict_proba=oof)
+        expected = sklearn.model_selection.cross_val_predict(
+            sklearn.linear_model.LogisticRegression(), iris.data, iris.target, cv=cv, method='predict_proba')
+        np.testing.assert_allclose(oof, expected)
+        oof = np.full((len(iris.target), 3), np.nan)
+        cross_val_score_track_trials(
+            LinearSVC(), iris.data, iris.target, scoring='accuracy', cv=cv, oof_predict_proba=oof)
+        self.assertTrue(np.isnan(oof).all())
+
+    def test_pareto_front(self):
+        from lale.helpers import pareto_front
+        losses = [0.1, 0.2, 0.1, 0.3, float('nan'), 0.1]
+        times = [2.0, 1.0, 3.0, 0.5, 0.1, 2.0]
+        self.assertEqual(list(pareto_front(losses, times)), [True, True, False, True, False, True])
+        self.assertEqual(len(pareto_front([], [])), 0)
+
+    def test_fold_pruner(self):
+        from lale.search.fold_pruning import FoldPruner
+        pruner = FoldPruner(0.9, z=2.0)
+        self.assertFalse(pruner([0.5]))
+        self.assertTrue(pruner([0.5, 0.52]))
+        self.assertFalse(pruner([0.85, 0.95]))
+        self.assertFalse(pruner([0.5, float('nan')]))
+
+    def test_cv_track_trials_without_predict_proba(self):
+        from lale.helpers import cross_val_score_track_trials
+        iris = sklearn.datasets.load_iris()
+        score, logloss, _ = cross_val_score_track_trials(
+            LinearSVC(), iris.data, iris.target, scoring='accuracy', cv=3, n_jobs=-1)
+        self.assertGreater(score, 0.5)
+        self.assertTrue(np.isnan(logloss))
+
+    def test_cv_track_trials_single_inference_pass(self):
+        import lale.operators
+        from lale.helpers import cross_val_score_track_trials
+        class _TransformCountingImpl():
+            n_transforms = 0
+            def __init__(self):
+                pass
+            def fit(self, X, y=None):
+                return self
+            def transform(self, X):
+                _TransformCountingImpl.n_transforms += 1
+                return X
+        schemas = {
+            'properties': {
+                'hyperparams': {'allOf': [{'type': 'object', 'additionalProperties': False, 'properties': {}}]},
+                'input_fit': {'type': 'object', 'required': ['X'], 'properties': {'X': {}, 'y': {}}},
+                'input_transform': {'type': 'object', 'required': ['X'], 'properties': {'X': {}}},
+                'output_transform': {}}}
+        counting = lale.operators.make_operator(_TransformCountingImpl, schemas, name='Counting')
+        trainable = counting() >> LogisticRegression()
+        iris = sklearn.datasets.load_iris()
+        y = (iris.target == 1).astype(int)
+        for scoring in ['accuracy', 'roc_auc', 'neg_log_loss']:
+            _TransformCountingImpl.n_transforms = 0
+            score, logloss, _ = cross_val_score_track_trials(
+                trainable, iris.data, y, scoring=scoring, cv=3)
+            #per fold, one transform during fit and one for both metrics
+            self.assertEqual(_TransformCountingImpl.n_transforms, 6)
+            self.assertFalse(np.isnan(logloss))
+        self.assertAlmostEqual(score, -logloss)
+
+    def test_cv_track_trials_same_as_pipeline(self):
+        from lale.helpers import cross_val_score_track_trials
+        from sklearn.metrics import accuracy_score, log_loss
+        from sklearn.model_selection import StratifiedKFold
+        iris = sklearn.datasets.load_iris()
+        trainable = (PCA(n_components=2) & NoOp) >> ConcatFeatures >> LogisticRegression()
+        score, logloss, _ = cross_val_score_track_trials(
+            trainable, iris.data, iris.target, scoring='accuracy', cv=StratifiedKFold(3))
+        scores, loglosses = [], []
+        for train, test in StratifiedKFold(3).split(iris.data, iris.target):
+            trained = trainable.fit(iris.data[train], iris.target[train])
+            scores.append(accuracy_score(iris.target[test], trained.predict(iris.data[test])))
+            loglosses.append(log_loss(iris.target[test], trained.predict_proba(iris.data[test])))
+        self.assertAlmostEqual(score, np.mean(scores))
+        self.assertAlmostEqual(logloss, np.mean(loglosses))
+
+    def test_cv_track_trials_without_log_loss(self):
+        from lale.helpers import cross_val_score_track_trials
+        iris = sklearn.datasets.load_iris()
+        score, logloss, _ = cross_val_score_track_trials(
+            LogisticRegression(), iris.data, iris.target, scoring='accuracy', cv=3, track_log_loss=False)
+        self.assertGreater(score, 0.5)
+        self.assertTrue(np.isnan(logloss))
+
 class TestHigherOrderOperators(unittest.TestCase):
     def setUp(self):
         from sklearn.datasets import load_iris
@@ -712,6 +1369,32 @@ class TestTopKVotingClassifier(unittest.TestCase):
         final_ensemble = trained._impl._best_estimator
         self.assertLessEqual(len(final_ensemble._impl._sklearn_model.estimators), 3)
 
+    def test_fit_ensemble_selection(self):
+        from lale.lib.lale import TopKVotingClassifier
+        ensemble = TopKVotingClassifier(estimator=(PCA | NoOp) >> (LogisticRegression | KNeighborsClassifier), args_to_optimizer={'max_evals':4, 'cv':3, 'show_progressbar':False}, k=3, ensemble_size=5)
+        trained = ensemble.fit(self.X_train, self.y_train)
+        weights = trained._impl._ensemble_weights
+        self.assertEqual(sum(weights.values()), 5)
+        final_ensemble = trained._impl._best_estimator._impl._sklearn_model
+        self.assertEqual(final_ensemble.voting, 'soft')
+        self.assertEqual(list(final_ensemble.weights), list(weights.values()))
+        self.assertLessEqual(len(final_ensemble.estimators), 3)
+        trained.predict(self.X_test)
+
+    def test_fit_ensemble_selection_unsupported_optimizer(self):
+        from lale.lib.lale import TopKVotingClassifier, GridSearchCV
+        ensemble = TopKVotingClassifier(estimator=LogisticRegression, optimizer=GridSearchCV, args_to_optimizer={'cv':3}, k=3, ensemble_size=5)
+        with self.assertRaisesRegex(ValueError, 'keep_oof_proba'):
+            ensemble.fit(self.X_train, self.y_train)
+
+    def test_fit_n_jobs(self):
+        from lale.lib.lale import TopKVotingClassifier
+        ensemble = TopKVotingClassifier(estimator=PCA() >> LogisticRegression(), args_to_optimizer={'max_evals':2, 'show_progressbar':False}, k=2, n_jobs=2, backend='multiprocessing')
+        self.assertEqual(ensemble._impl.args_to_optimizer['n_jobs'], 2)
+        self.assertEqual(ensemble._impl.args_to_optimizer['backend'], 'multiprocessing')
+        trained = ensemble.fit(self.X_train, self.y_train)
+        trained.predict(self.X_test)
+
     def test_fit_default_args(self):
         from sklearn.datasets import load_iris
         from lale.lib.lale import TopKVotingClassifier
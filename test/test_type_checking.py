@@ -485,3 +485,259 @@ class TestWithScorer(unittest.TestCase):
         out = scorer(trained, X, y)
         self.assertIsInstance(out, float)
         self.assertNotIsInstance(out, NDArrayWithSchema)
+
+class TestSubschemaCache(unittest.TestCase):
+    def setUp(self):
+        from lale.type_checking import clear_subschema_cache
+        clear_subschema_cache()
+
+    def tearDown(self):
+        from lale.type_checking import clear_subschema_cache
+        clear_subschema_cache(maxsize=4096)
+
+    def test_hits_for_equal_schemas(self):
+        from lale.type_checking import is_subschema, subschema_cache_info
+        sub = {'type': 'integer', 'minimum': 0}
+        sup = {'type': 'number'}
+        self.assertTrue(is_subschema(sub, sup))
+        self.assertFalse(is_subschema(sup, sub))
+        reordered = {'minimum': 0, 'type': 'integer'}
+        self.assertTrue(is_subschema(reordered, dict(sup)))
+        info = subschema_cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 2, 2))
+
+    def test_shared_by_validation_and_join(self):
+        from lale.type_checking import join_schemas, subschema_cache_info, validate_schema_or_subschema
+        sub = {'type': 'integer'}
+        sup = {'type': 'number'}
+        validate_schema_or_subschema(sub, sup)
+        self.assertEqual(join_schemas(sub, sup), sup)
+        info = subschema_cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+    def test_bounded(self):
+        from lale.type_checking import clear_subschema_cache, is_subschema, subschema_cache_info
+        clear_subschema_cache(maxsize=2)
+        for i in range(5):
+            self.assertTrue(is_subschema({'type': 'integer', 'minimum': i}, {'type': 'number'}))
+        self.assertEqual(subschema_cache_info().currsize, 2)
+        self.assertTrue(is_subschema({'type': 'integer', 'minimum': 0}, {'type': 'number'}))
+        self.assertEqual(subschema_cache_info().hits, 0)
+
+class TestValidatorCache(unittest.TestCase):
+    def setUp(self):
+        from lale.helpers import clear_validator_cache
+        clear_validator_cache()
+
+    def test_reuses_validator_for_equal_schemas(self):
+        from lale.helpers import get_validator, validator_cache_info
+        schema = {'type': 'object', 'properties': {'C': {'type': 'number', 'minimum': 0}}}
+        validator = get_validator(schema)
+        self.assertIs(get_validator({'properties': {'C': {'minimum': 0, 'type': 'number'}}, 'type': 'object'}), validator)
+        validator.validate({'C': 1.5})
+        with self.assertRaises(jsonschema.ValidationError):
+            validator.validate({'C': -1})
+        info = validator_cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 1, 1))
+
+    def test_invalid_schema(self):
+        from lale.helpers import get_validator, is_schema, validate_is_schema
+        with self.assertRaises(jsonschema.SchemaError):
+            get_validator({'type': 'nonsense'})
+        self.assertFalse(is_schema({'type': 'nonsense'}))
+        self.assertFalse(is_schema({'type': 'nonsense'}))
+        self.assertTrue(is_schema({'type': 'integer'}))
+        with self.assertRaises(jsonschema.ValidationError):
+            validate_is_schema({'type': 'nonsense'})
+
+    def test_configure_uses_cache(self):
+        from lale.helpers import validator_cache_info
+        LogisticRegression(C=0.5)
+        misses = validator_cache_info().misses
+        for c in [0.1, 0.2, 0.3]:
+            LogisticRegression(C=c)
+        self.assertEqual(validator_cache_info().misses, misses)
+        with self.assertRaises(jsonschema.ValidationError):
+            LogisticRegression(C=-1.0)
+
+    def test_generated_code(self):
+        from lale.helpers import clear_validator_cache, fastjsonschema_installed, get_validator
+        clear_validator_cache(generate_code=True)
+        try:
+            validator = get_validator({'type': 'integer', 'minimum': 0})
+            self.assertEqual(validator._generated is not None, fastjsonschema_installed)
+            validator.validate(3)
+            with self.assertRaises(jsonschema.ValidationError):
+                validator.validate(-3)
+            with_default = get_validator({'type': 'object', 'properties': {'C': {'type': 'number', 'default': 1.0}}})
+            hyperparams:dict = {}
+            with_default.validate(hyperparams)
+            self.assertEqual(hyperparams, {})
+            positive = get_validator({'type': 'number', 'minimum': 0, 'exclusiveMinimum': True})
+            positive.validate(0.5)
+            with self.assertRaises(jsonschema.ValidationError):
+                positive.validate(0)
+        finally:
+            clear_validator_cache(generate_code=False)
+
+    def test_json_hash(self):
+        import numpy as np
+        from lale.helpers import json_hash
+        self.assertEqual(json_hash({'a': 1, 'b': [2.5]}), json_hash({'b': [np.float64(2.5)], 'a': np.int64(1)}))
+        self.assertIsNone(json_hash({'default': np.zeros(10000)}))
+        self.assertIsNone(json_hash({'default': LogisticRegression}))
+
+class TestSchemaSimplifierMemo(unittest.TestCase):
+    def test_hash_consing(self):
+        from lale.schema_simplifier import _SimplifierMemo
+        memo = _SimplifierMemo()
+        a = {'type': 'number', 'minimum': 0.0, 'enum': [1, 2]}
+        b = {'type': 'number', 'minimum': 0.0, 'enum': [1, 2]}
+        self.assertEqual(memo.number(a), memo.number(b))
+        self.assertIs(memo.interned[memo.number(b)], a)
+        self.assertNotEqual(memo.number({'minimum': 0}), memo.number({'minimum': 0.0}))
+        self.assertNotEqual(memo.number({'minimum': 1}), memo.number({'minimum': True}))
+        self.assertNotEqual(memo.number({'a': 1, 'b': 2}), memo.number({'b': 2, 'a': 1}))
+
+    def test_simplify_shared_subschemas(self):
+        import lale.schema_simplifier
+        from lale.schema_simplifier import _current_memo, simplify
+        def choice():
+            return {'anyOf': [{'enum': ['a', 'b']}, {'type': 'integer', 'minimum': 1}]}
+        shared = choice()
+        schema = {'allOf': [{'type': 'object', 'properties': {'x': shared, 'y': shared}},
+                            {'type': 'object', 'properties': {'x': choice()}}]}
+        memoized = {floatAny: simplify(schema, floatAny) for floatAny in [True, False]}
+        self.assertIsNone(_current_memo())
+        lale.schema_simplifier.memoize = False
+        try:
+            for floatAny in [True, False]:
+                self.assertEqual(memoized[floatAny], simplify(schema, floatAny))
+        finally:
+            lale.schema_simplifier.memoize = True
+
+    def test_output_not_shared(self):
+        from lale.schema_simplifier import simplify
+        c = {'anyOf': [{'type': 'integer', 'minimum': 1}, {'enum': [None]}]}
+        result = simplify({'type': 'object', 'properties': {'x': c, 'y': c}}, True)
+        branches = [branch['properties']['x'] for branch in result['anyOf']]
+        self.assertEqual(len(branches), 4)
+        self.assertEqual(len({id(branch) for branch in branches}), 4)
+        branches[2]['minimum'] = 2
+        self.assertEqual(branches[3], {'type': 'integer', 'minimum': 1})
+
+    def test_enum_filtering(self):
+        from lale.schema_simplifier import simplify
+        schema = {'allOf': [{'enum': ['a', 'b', 1]}, {'type': 'string'}, {'not': {'enum': ['b']}}]}
+        result = simplify(schema, False)
+        self.assertEqual(result, {'enum': ['a']})
+
+class TestDataToJson(unittest.TestCase):
+    def test_sparse_without_densifying(self):
+        import scipy.sparse
+        from lale.helpers import data_to_json
+        X = scipy.sparse.csr_matrix(([1.0, 2.0], ([0, 10**6], [3, 5])), shape=(10**7, 10**5))
+        json_X = data_to_json(X)
+        self.assertEqual(len(json_X), 10)
+        self.assertEqual(len(json_X[0]), 10**5)
+        self.assertEqual(json_X[0][3], 1.0)
+        json_csc = data_to_json(X[:20].tocsc())
+        self.assertEqual(json_csc, json_X)
+
+    def test_dtypes(self):
+        import numpy as np
+        import pandas as pd
+        from lale.helpers import data_to_json
+        self.assertEqual(data_to_json(np.arange(30, dtype=np.uint8).reshape(15, 2))[-1], [18, 19])
+        self.assertEqual(data_to_json(np.array([[True], [False]])), [[True], [False]])
+        self.assertEqual(data_to_json(np.array([1, 'a', None, np.int64(3)], dtype=object)), [1, 'a', 'None', '3'])
+        df = pd.DataFrame({'a': [1, 2] * 8, 'b': ['x', 'y'] * 8})
+        self.assertEqual(data_to_json(df), [[1, 'x'], [2, 'y']] * 5)
+        self.assertEqual(len(data_to_json(df, subsample_array=False)), 16)
+        with self.assertRaises(ValueError):
+            data_to_json(np.array(['2020-01-01'], dtype='datetime64[D]'))
+
+class TestSparseSchemas(unittest.TestCase):
+    def test_to_schema_csr_and_csc(self):
+        import numpy as np
+        import scipy.sparse
+        from lale.datasets.data_schemas import to_schema
+        X = scipy.sparse.csr_matrix((np.ones(2, dtype=np.float32), ([0, 10], [3, 7])), shape=(10**6, 10**5))
+        expected = {
+            'type': 'array', 'minItems': 10**6, 'maxItems': 10**6,
+            'items': {
+                'type': 'array', 'minItems': 10**5, 'maxItems': 10**5,
+                'items': {'type': 'number'}}}
+        self.assertEqual(to_schema(X), expected)
+        self.assertEqual(to_schema(X.tocsc()), expected)
+
+    def test_add_schema_does_not_copy(self):
+        import numpy as np
+        import scipy.sparse
+        from lale.datasets.data_schemas import add_schema, to_schema
+        X = scipy.sparse.random(100, 20, density=0.1, format='csc')
+        schema = {'type': 'array', 'items': {'type': 'array', 'items': {'type': 'number', 'minimum': 0}}}
+        X_with_schema = add_schema(X, schema)
+        self.assertEqual(X_with_schema.format, 'csc')
+        self.assertTrue(np.shares_memory(X_with_schema.data, X.data))
+        self.assertIs(to_schema(X_with_schema), schema)
+        self.assertIs(add_schema(X_with_schema), X_with_schema)
+
+    def test_append_batch(self):
+        import numpy as np
+        import scipy.sparse
+        from lale.helpers import append_batch
+        X = scipy.sparse.random(10, 5, density=0.3, format='csr')
+        result = append_batch(append_batch(None, X[:4]), X[4:])
+        self.assertTrue(scipy.sparse.issparse(result))
+        self.assertEqual((result != X).nnz, 0)
+        X_y = append_batch((X[:4], np.arange(4)), (X[4:], np.arange(4, 10)))
+        self.assertEqual(X_y[0].shape, (10, 5))
+        self.assertEqual(X_y[1].tolist(), list(range(10)))
+
+class TestSchemaAttachment(unittest.TestCase):
+    def test_pandas_without_copy(self):
+        import numpy as np
+        import pandas as pd
+        from lale.datasets.data_schemas import add_schema, to_schema
+        df = pd.DataFrame({'a': [1, 2, 3], 'b': [0.5, 1.5, 2.5], 'c': [4, 5, 6]})
+        df_with_schema = add_schema(df)
+        self.assertTrue(np.shares_memory(df_with_schema['b'].values, df['b'].values))
+        self.assertIsNone(df_with_schema._json_schema)
+        schema = to_schema(df_with_schema)
+        self.assertIs(df_with_schema.json_schema, schema)
+        self.assertEqual(schema['items']['items'], [
+            {'description': 'a', 'type': 'integer'},
+            {'description': 'b', 'type': 'number'},
+            {'description': 'c', 'type': 'integer'}])
+        series_with_schema = add_schema(df['a'])
+        self.assertTrue(np.shares_memory(series_with_schema.values, df['a'].values))
+        self.assertEqual(series_with_schema.json_schema['items'], {'description': 'a', 'type': 'integer'})
+
+    def test_attachment_defers_inference(self):
+        from unittest import mock
+        import numpy as np
+        import pandas as pd
+        import lale.datasets.data_schemas
+        from lale.datasets.data_schemas import add_schema
+        df = pd.DataFrame(np.zeros((10, 5000)))
+        infer = lale.datasets.data_schemas._dataframe_to_schema
+        with mock.patch('lale.datasets.data_schemas._dataframe_to_schema', wraps=infer) as spy:
+            df_with_schema = add_schema(df)
+            self.assertEqual(spy.call_count, 0)
+            schema = df_with_schema.json_schema
+            self.assertEqual(spy.call_count, 1)
+            self.assertIs(df_with_schema.json_schema, schema)
+            self.assertEqual(spy.call_count, 1)
+        self.assertEqual(schema['items']['minItems'], 5000)
+
+    def test_wide_frame_subschema(self):
+        import numpy as np
+        import pandas as pd
+        from lale.datasets.data_schemas import to_schema
+        from lale.type_checking import is_subschema
+        df = pd.DataFrame(np.zeros((10, 2000)))
+        df['last'] = 'x'
+        numbers = {'type': 'array', 'items': {'type': 'array', 'items': {'type': 'number'}}}
+        self.assertTrue(is_subschema(to_schema(df.iloc[:, :-1]), numbers))
+        self.assertFalse(is_subschema(to_schema(df), numbers))